@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Run the benchmark kernels on the core and compare against a baseline.
+
+Every kernel runs in its own simulation of the core, one after the other
+so the wall clock times do not disturb each other. Cycles, instructions,
+CPI and wall clock time per core variant and kernel are written to a JSON
+file named after the commit. With --compare the cycles are checked against
+an earlier result file and the script fails when a kernel got slower by
+more than the tolerance, cycles are exact so the default tolerance is 0.
+Wall clock times depend on the machine and are only reported.
+"""
+import argparse
+import datetime
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCHMARKS_PATH = Path(__file__).resolve().parent
+REPO_PATH = BENCHMARKS_PATH.parent
+sys.path.insert(0, str(REPO_PATH / "tests" / "cocotb"))
+
+from cocotb.runner import get_results, get_runner  # noqa: E402
+
+import run  # noqa: E402
+
+BUILD_DIR = run.BUILD_DIR
+RESULTS_DIR = BENCHMARKS_PATH / "sim_build"
+
+# variant -> generics of the core
+VARIANTS: Dict[str, Dict[str, str]] = {
+    "sequential": {"PIPELINED": "false"},
+    "pipelined": {"PIPELINED": "true"},
+    "pipelined-btb": {"PIPELINED": "true", "BTB_ENTRIES": "16"},
+    "pipelined-decode": {"PIPELINED": "true", "RESOLVE_IN_DECODE": "true"},
+}
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO_PATH, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def bench(variant: str, kernel: str) -> Optional[dict]:
+    """Result of one kernel on one variant, None when the simulation failed."""
+    parameters = VARIANTS[variant]
+    result_file = RESULTS_DIR / f"{variant}.{kernel}.json"
+    result_file.unlink(missing_ok=True)
+    results_xml = f"bench.{variant}.{kernel}.results.xml"
+
+    start = time.perf_counter()
+    runner = get_runner("ghdl")
+    try:
+        runner.test(hdl_toplevel="core",
+                    hdl_toplevel_lang="vhdl",
+                    test_module="bench_core",
+                    build_dir=BUILD_DIR,
+                    test_args=run.BUILD_ARGS,
+                    parameters=parameters,
+                    extra_env={**{f"GENERIC_{name}": value for name, value in parameters.items()},
+                               "BENCH_KERNEL": kernel, "BENCH_RESULT": str(result_file)},
+                    results_xml=results_xml)
+    except SystemExit:
+        pass
+    process_seconds = time.perf_counter() - start
+
+    results_xml = BUILD_DIR / results_xml
+    if not results_xml.is_file() or get_results(results_xml)[1] or not result_file.is_file():
+        return None
+    result = json.loads(result_file.read_text())
+    result["process_seconds"] = process_seconds
+    return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Kernels with more cycles than in *baseline*, beyond *tolerance*."""
+    regressions = []
+    for variant, kernels in results.items():
+        for kernel, result in kernels.items():
+            before = baseline.get(variant, {}).get(kernel)
+            if before is None or result is None:
+                continue
+            change = result["cycles"] / before["cycles"] - 1
+            print(f"{variant:<14} {kernel:<10} {before['cycles']:>8} -> {result['cycles']:>8} "
+                  f"cycles {change:+7.2%}")
+            if change > tolerance:
+                regressions.append(f"{variant} {kernel}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    manifest = json.loads((BENCHMARKS_PATH / "kernels.json").read_text())
+    parser.add_argument("kernels", nargs="*", default=list(manifest),
+                        help="kernels to run, default all")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS),
+                        help="core variants to run the kernels on, default all")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="result file, default benchmarks/sim_build/<commit>.json")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE",
+                        help="result file of an earlier run to compare the cycles with")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="allowed relative increase of cycles, e.g. 0.02")
+    args = parser.parse_args()
+
+    run.build(["core"])
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+
+    results: Dict[str, Dict[str, dict]] = {}
+    failed = []
+    for variant in args.variants:
+        results[variant] = {}
+        for kernel in args.kernels:
+            result = results[variant][kernel] = bench(variant, kernel)
+            if result is None:
+                failed.append(f"{variant} {kernel}")
+                print(f"{variant:<14} {kernel:<10} failed, see {BUILD_DIR}")
+                continue
+            print(f"{variant:<14} {kernel:<10} {result['cycles']:>8} cycles "
+                  f"{result['instructions']:>7} instructions CPI {result['cpi']:.3f} "
+                  f"{result['wall_seconds']:>6.2f}s")
+
+    commit = _git("rev-parse", "--short", "HEAD") or "unknown"
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.write_text(json.dumps({
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }, indent=2) + "\n")
+    print(f"results in {output}")
+
+    regressions = []
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression} needs more cycles than {baseline['commit']}")
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
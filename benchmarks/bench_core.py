@@ -0,0 +1,61 @@
+"""cocotb module of the benchmark suite, runs one kernel on the core.
+
+The kernel is named by BENCH_KERNEL and runs in lockstep with the
+instruction set simulator, so a benchmark never passes with wrong results.
+The performance report together with the wall clock time of the simulated
+run goes as JSON to the file named by BENCH_RESULT.
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import cocotb
+from cocotb.clock import Clock
+from cocotb.triggers import RisingEdge, Timer
+
+import loader
+from iss import Iss
+from lockstep import Lockstep
+from perf import PerfCollector
+from utility import generic_flag
+
+BENCHMARKS_PATH = Path(__file__).resolve().parent
+PIPELINED = generic_flag("PIPELINED", False)
+
+
+async def _reset(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_enable.value = 1
+    dut.i_reset.value = 1
+    dut.i_instruction.value = 0
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await RisingEdge(dut.i_clock)
+
+
+@cocotb.test()
+async def bench_kernel(dut):
+    name = os.environ["BENCH_KERNEL"]
+    kernel = json.loads((BENCHMARKS_PATH / "kernels.json").read_text())[name]
+    model = Iss(memory_size=1 << 16)
+    with loader.read_image(BENCHMARKS_PATH / kernel["file"]) as image:
+        image.load_into(model)
+    await _reset(dut)
+
+    perf = PerfCollector(phase=None if PIPELINED else dut.active_phase)
+    lockstep = Lockstep(dut, model, perf=perf)
+    perf.start()
+    start = time.perf_counter()
+    await lockstep.run(kernel["instructions"])
+    wall_seconds = time.perf_counter() - start
+    report = perf.stop()
+
+    assert model.halted, f"{name} did not reach ebreak:\n" + "\n".join(lockstep.window())
+    assert model.x[10] == kernel["a0"], f"{name}: a0 {model.x[10]:#x}, expected {kernel['a0']:#x}"
+    dut._log.info("%s\n%s\n%.2fs simulated run", name, report.format(), wall_seconds)
+
+    result = report.to_dict()
+    result["wall_seconds"] = wall_seconds
+    Path(os.environ["BENCH_RESULT"]).write_text(json.dumps(result, indent=2) + "\n")
@@ -0,0 +1,125 @@
+"""cocotb module measuring how many cycles per second a toplevel simulates.
+
+Every test runs THROUGHPUT_CYCLES clock cycles of the toplevel and adds
+the cycles per wall clock second to the JSON file named by
+THROUGHPUT_RESULT. The tests only differ in the Python work per cycle:
+
+* clock: the clock runs, no coroutine wakes up per cycle
+* edges: a coroutine awaits every rising edge and does nothing
+* drive: all inputs are driven with random values every cycle
+* drive_and_read: as drive, and all outputs are read back as the tests do
+
+The stimulus is drawn before the measurement, so the numbers contain the
+simulator and the cocotb scheduler but no random number generation.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cocotb
+import numpy as np
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge, RisingEdge, Timer
+
+CYCLES = int(os.environ.get("THROUGHPUT_CYCLES", "20000"))
+
+# toplevel -> (inputs driven with random values and their width, inputs held at a value)
+STIMULUS: Dict[str, Tuple[List[Tuple[str, int]], Dict[str, int]]] = {
+    "alu": ([("i_op_code", 7), ("i_fun3", 3), ("i_fun7", 7), ("i_data_s1", 32),
+             ("i_data_s2", 32), ("i_data_immediate", 32), ("i_program_counter", 32)],
+            {"i_enable": 1}),
+    "decoder": ([("i_data_instruction", 32)], {"i_enable": 1}),
+    "pc": ([("i_op_code", 2), ("i_data", 32)], {"i_enable": 1}),
+    "register_file": ([("i_datadest", 32), ("i_selecta", 5), ("i_selectb", 5),
+                       ("i_selectdest", 5), ("i_write_enable", 1)], {"i_enable": 1}),
+    "control_unit": ([("i_reset", 1)], {}),
+    # register-immediate instructions, the core never waits for memory
+    "core": ([("i_instruction", 32)], {"i_enable": 1}),
+}
+_OP_IMM = 0x13
+
+_results: Dict[str, dict] = {}
+
+
+def _stimulus(toplevel: str) -> Dict[str, List[int]]:
+    rng = np.random.default_rng(17)
+    driven, _ = STIMULUS[toplevel]
+    values = {name: rng.integers(0, 1 << width, CYCLES, dtype=np.uint64)
+              for name, width in driven}
+    if toplevel == "control_unit":
+        # resets are rare, the phases have to cycle
+        values["i_reset"] = (rng.integers(0, 16, CYCLES) == 0).astype(np.uint64)
+    if toplevel == "core":
+        values["i_instruction"] = values["i_instruction"] & ~np.uint64(0x7f) | np.uint64(_OP_IMM)
+    # python ints, assigning numpy scalars to handles is slower
+    return {name: array.tolist() for name, array in values.items()}
+
+
+async def _start(dut) -> List:
+    """Start the clock and hold the fixed inputs, returns the output handles."""
+    _, held = STIMULUS[dut._name]
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    for name, value in held.items():
+        getattr(dut, name).value = value
+    if dut._name == "core":
+        dut.i_reset.value = 1
+    await Timer(5, units="ns")  # wait a bit
+    if dut._name == "core":
+        dut.i_reset.value = 0
+    await FallingEdge(dut.i_clock)
+    return [handle for handle in dut if handle._name.startswith("o_")]
+
+
+def _record(dut, mode: str, seconds: float):
+    _results[mode] = {"cycles": CYCLES, "seconds": seconds, "cycles_per_second": CYCLES / seconds}
+    dut._log.info("%s %s: %.0f cycles/s", dut._name, mode, CYCLES / seconds)
+    Path(os.environ["THROUGHPUT_RESULT"]).write_text(json.dumps(_results, indent=2) + "\n")
+
+
+@cocotb.test()
+async def clock(dut):
+    await _start(dut)
+    start = time.perf_counter()
+    await Timer(CYCLES, units="ns")
+    _record(dut, "clock", time.perf_counter() - start)
+
+
+@cocotb.test()
+async def edges(dut):
+    await _start(dut)
+    edge = RisingEdge(dut.i_clock)
+    start = time.perf_counter()
+    for _ in range(CYCLES):
+        await edge
+    _record(dut, "edges", time.perf_counter() - start)
+
+
+@cocotb.test()
+async def drive(dut):
+    stimulus = _stimulus(dut._name)
+    await _start(dut)
+    handles = [(getattr(dut, name), values) for name, values in stimulus.items()]
+    edge = FallingEdge(dut.i_clock)
+    start = time.perf_counter()
+    for cycle in range(CYCLES):
+        for handle, values in handles:
+            handle.value = values[cycle]
+        await edge
+    _record(dut, "drive", time.perf_counter() - start)
+
+
+@cocotb.test()
+async def drive_and_read(dut):
+    stimulus = _stimulus(dut._name)
+    outputs = await _start(dut)
+    handles = [(getattr(dut, name), values) for name, values in stimulus.items()]
+    edge = FallingEdge(dut.i_clock)
+    start = time.perf_counter()
+    for cycle in range(CYCLES):
+        for handle, values in handles:
+            handle.value = values[cycle]
+        await edge
+        [output.value for output in outputs]
+    _record(dut, "drive_and_read", time.perf_counter() - start)
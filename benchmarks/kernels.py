@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""Generate the benchmark kernels as Intel hex files.
+
+The kernels are written with the encoders of the cocotb tests, so no cross
+compiler is needed, and checked in together with kernels.json. The manifest
+records for every kernel the value it leaves in a0, the number of retired
+instructions from the instruction set simulator and whether it needs loads
+and stores. Run this script again after changing a kernel.
+"""
+import json
+import random
+import sys
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+BENCHMARKS_PATH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_PATH.parent / "tests" / "cocotb"))
+
+import asm  # noqa: E402
+import loader  # noqa: E402
+from iss import Iss  # noqa: E402
+
+MANIFEST = BENCHMARKS_PATH / "kernels.json"
+MEMORY_SIZE = 1 << 16
+DATA = 0x8000
+STACK = 0xfff0
+
+# ABI register names
+ZERO, RA, SP = 0, 1, 2
+T0, T1, T2, T3, T4, T5, T6 = 5, 6, 7, 28, 29, 30, 31
+S0, S1, S2, S3, S4, S5, S6, S7, S8, S9, S10, S11 = 8, 9, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27
+A0, A1, A2, A3, A4, A5 = 10, 11, 12, 13, 14, 15
+
+
+class Program:
+    """Instruction words with labels, branch and jump targets are resolved by words()."""
+
+    def __init__(self):
+        self.items: List[Union[int, tuple]] = []
+        self.labels: Dict[str, int] = {}
+
+    def __call__(self, *words: Union[int, List[int]]):
+        for word in words:
+            self.items += word if isinstance(word, list) else [word]
+
+    def label(self, name: str):
+        self.labels[name] = 4 * len(self.items)
+
+    def branch(self, encoder: Callable, rs1: int, rs2: int, target: str):
+        self.items.append((encoder, (rs1, rs2), target))
+
+    def jal(self, rd: int, target: str):
+        self.items.append((asm.jal, (rd,), target))
+
+    def words(self) -> List[int]:
+        words = []
+        for index, item in enumerate(self.items):
+            if isinstance(item, tuple):
+                encoder, operands, target = item
+                item = encoder(*operands, self.labels[target] - 4 * index)
+            words.append(item)
+        return words
+
+
+def _xorshift(state: int, count: int) -> List[int]:
+    # the byte stream the crc32 kernel generates in registers
+    values = []
+    for _ in range(count):
+        state ^= (state << 13) & 0xffffffff
+        state ^= state >> 17
+        state ^= (state << 5) & 0xffffffff
+        values.append(state & 0xff)
+    return values
+
+
+def crc32() -> tuple:
+    """Bitwise CRC-32 of 256 pseudo random bytes, no loads or stores."""
+    seed = 0x2545f491
+    p = Program()
+    p(asm.li(A0, -1), asm.li(S0, seed), asm.li(S1, 256), asm.li(T5, 0xedb88320))
+    p.label("byte")
+    p(asm.slli(T0, S0, 13), asm.xor(S0, S0, T0),
+      asm.srli(T0, S0, 17), asm.xor(S0, S0, T0),
+      asm.slli(T0, S0, 5), asm.xor(S0, S0, T0),
+      asm.andi(T0, S0, 0xff), asm.xor(A0, A0, T0), asm.addi(T1, ZERO, 8))
+    p.label("bit")
+    p(asm.andi(T2, A0, 1), asm.srli(A0, A0, 1))
+    p.branch(asm.beq, T2, ZERO, "skip")
+    p(asm.xor(A0, A0, T5))
+    p.label("skip")
+    p(asm.addi(T1, T1, -1))
+    p.branch(asm.bne, T1, ZERO, "bit")
+    p(asm.addi(S1, S1, -1))
+    p.branch(asm.bne, S1, ZERO, "byte")
+    p(asm.xori(A0, A0, -1), asm.ebreak())
+
+    expected = zlib.crc32(bytes(_xorshift(seed, 256)))
+    return [loader.Segment(0, asm.assemble(p.words()))], False, expected
+
+
+def memcpy() -> tuple:
+    """Copy 1 KiB word wise, unrolled four times, then 255 bytes misaligned."""
+    rng = random.Random(16)
+    source = rng.randbytes(0x600)
+    destination = DATA + 0x1000
+
+    p = Program()
+    p(asm.li(A1, DATA), asm.li(A2, destination), asm.addi(A3, A1, 1024))
+    p.label("words")
+    p(asm.lw(T0, A1, 0), asm.lw(T1, A1, 4), asm.lw(T2, A1, 8), asm.lw(T3, A1, 12),
+      asm.sw(T0, A2, 0), asm.sw(T1, A2, 4), asm.sw(T2, A2, 8), asm.sw(T3, A2, 12),
+      asm.addi(A1, A1, 16), asm.addi(A2, A2, 16))
+    p.branch(asm.bne, A1, A3, "words")
+    p(asm.li(A1, DATA + 0x401), asm.li(A2, destination + 0x403), asm.addi(A3, A1, 255))
+    p.label("bytes")
+    p(asm.lbu(T0, A1, 0), asm.sb(T0, A2, 0), asm.addi(A1, A1, 1), asm.addi(A2, A2, 1))
+    p.branch(asm.bne, A1, A3, "bytes")
+    # checksum of the destination, a0 = a0 * 33 + word
+    p(asm.addi(A0, ZERO, 0), asm.li(A1, destination), asm.li(A3, destination + 0x504))
+    p.label("sum")
+    p(asm.lw(T0, A1, 0), asm.slli(T1, A0, 5), asm.add(A0, A0, T1), asm.add(A0, A0, T0),
+      asm.addi(A1, A1, 4))
+    p.branch(asm.bne, A1, A3, "sum")
+    p(asm.ebreak())
+
+    return [loader.Segment(0, asm.assemble(p.words())),
+            loader.Segment(DATA, source)], True, None
+
+
+def coremark() -> tuple:
+    """Loops in the style of CoreMark: matrix multiply, list walk and a state machine."""
+    rng = random.Random(17)
+    size = 6
+    matrix_a = DATA
+    matrix_b = DATA + 4 * size * size
+    nodes = 32
+    list_head = DATA + 0x200
+    list_nodes = DATA + 0x208
+    text = DATA + 0x400
+    text_bytes = 128
+
+    p = Program()
+    p(asm.addi(S11, ZERO, 0))
+
+    # C = A * B, the products with a shift and add subroutine
+    p(asm.li(S5, matrix_a), asm.addi(S2, ZERO, size))
+    p.label("row")
+    p(asm.li(S6, matrix_b), asm.addi(S3, ZERO, size))
+    p.label("column")
+    p(asm.addi(S7, S5, 0), asm.addi(S8, S6, 0), asm.addi(S9, ZERO, 0), asm.addi(S4, ZERO, size))
+    p.label("product")
+    p(asm.lw(A1, S7, 0), asm.lw(A2, S8, 0))
+    p.jal(RA, "multiply")
+    p(asm.add(S9, S9, A0), asm.addi(S7, S7, 4), asm.addi(S8, S8, 4 * size), asm.addi(S4, S4, -1))
+    p.branch(asm.bne, S4, ZERO, "product")
+    p(asm.add(S11, S11, S9), asm.slli(T0, S11, 1), asm.xor(S11, S11, T0),
+      asm.addi(S6, S6, 4), asm.addi(S3, S3, -1))
+    p.branch(asm.bne, S3, ZERO, "column")
+    p(asm.addi(S5, S5, 4 * size), asm.addi(S2, S2, -1))
+    p.branch(asm.bne, S2, ZERO, "row")
+
+    # walk the list four times, every load feeds the next branch
+    p(asm.addi(S10, ZERO, 4))
+    p.label("walk")
+    p(asm.li(T1, list_head), asm.lw(T1, T1, 0))
+    p.label("node")
+    p.branch(asm.beq, T1, ZERO, "walked")
+    p(asm.lw(T2, T1, 4), asm.add(S11, S11, T2), asm.lw(T1, T1, 0))
+    p.jal(ZERO, "node")
+    p.label("walked")
+    p(asm.addi(S10, S10, -1))
+    p.branch(asm.bne, S10, ZERO, "walk")
+
+    # count numbers and words in the text
+    p(asm.li(A1, text), asm.addi(A3, A1, text_bytes), asm.addi(A4, ZERO, 0))
+    p.label("scan")
+    p(asm.lbu(T0, A1, 0), asm.addi(T1, T0, -ord("0")), asm.sltiu(T2, T1, 10))
+    p.branch(asm.bne, T2, ZERO, "digit")
+    p(asm.addi(T1, T0, -ord("a")), asm.sltiu(T2, T1, 26))
+    p.branch(asm.bne, T2, ZERO, "letter")
+    p(asm.addi(A4, ZERO, 0))
+    p.jal(ZERO, "next")
+    p.label("digit")
+    p(asm.addi(T3, ZERO, 1))
+    p.branch(asm.beq, A4, T3, "next")
+    p(asm.addi(A4, ZERO, 1), asm.addi(S11, S11, 1))
+    p.jal(ZERO, "next")
+    p.label("letter")
+    p(asm.addi(T3, ZERO, 2))
+    p.branch(asm.beq, A4, T3, "next")
+    p(asm.addi(A4, ZERO, 2), asm.addi(S11, S11, 3))
+    p.label("next")
+    p(asm.addi(A1, A1, 1))
+    p.branch(asm.bne, A1, A3, "scan")
+    p(asm.addi(A0, S11, 0), asm.ebreak())
+
+    # a0 = a1 * a2
+    p.label("multiply")
+    p(asm.addi(A0, ZERO, 0))
+    p.label("multiply_bit")
+    p.branch(asm.beq, A2, ZERO, "multiplied")
+    p(asm.andi(T0, A2, 1))
+    p.branch(asm.beq, T0, ZERO, "multiply_next")
+    p(asm.add(A0, A0, A1))
+    p.label("multiply_next")
+    p(asm.slli(A1, A1, 1), asm.srli(A2, A2, 1))
+    p.jal(ZERO, "multiply_bit")
+    p.label("multiplied")
+    p(asm.jalr(ZERO, RA, 0))
+
+    matrices = [rng.randrange(256) for _ in range(2 * size * size)]
+    order = list(range(nodes))
+    rng.shuffle(order)
+    links = bytearray(8 * nodes)
+    for position, node in enumerate(order):
+        following = order[position + 1] if position + 1 < nodes else None
+        link = 0 if following is None else list_nodes + 8 * following
+        links[8 * node:8 * node + 8] = asm.assemble([link, rng.randrange(1 << 16)])
+    alphabet = b"0123456789abcdefghijklmnopqrstuvwxyz  ,."
+    characters = bytes(rng.choice(alphabet) for _ in range(text_bytes))
+
+    return [loader.Segment(0, asm.assemble(p.words())),
+            loader.Segment(matrix_a, asm.assemble(matrices)),
+            loader.Segment(list_head, asm.assemble([list_nodes + 8 * order[0]])),
+            loader.Segment(list_nodes, bytes(links)),
+            loader.Segment(text, characters)], True, None
+
+
+def dhrystone() -> tuple:
+    """Record copies, calls with a stack, integer arithmetic and string compares like Dhrystone."""
+    runs = 100
+    record = DATA
+    local = DATA + 0x40
+    string_1 = DATA + 0x80
+    string_2 = DATA + 0xa0
+
+    p = Program()
+    p(asm.li(SP, STACK), asm.addi(S11, ZERO, 0), asm.addi(S0, ZERO, runs))
+    p.label("run")
+    p(asm.addi(A0, S0, 0))
+    p.jal(RA, "procedure_1")
+    p(asm.add(S11, S11, A0))
+    p(asm.addi(A1, ZERO, 2), asm.addi(A2, ZERO, 3))
+    p.jal(RA, "procedure_2")
+    p(asm.add(S11, S11, A0))
+    p(asm.li(A1, string_1), asm.li(A2, string_2))
+    p.jal(RA, "compare_strings")
+    p(asm.add(S11, S11, A0), asm.addi(S0, S0, -1))
+    p.branch(asm.bne, S0, ZERO, "run")
+    p(asm.addi(A0, S11, 0), asm.ebreak())
+
+    # copy the record, update two fields, returns a checksum of the copy
+    p.label("procedure_1")
+    p(asm.addi(SP, SP, -8), asm.sw(RA, SP, 4), asm.li(T0, record), asm.li(T1, local))
+    for field in range(8):
+        p(asm.lw(T2, T0, 4 * field), asm.sw(T2, T1, 4 * field))
+    p(asm.lw(T2, T1, 8), asm.add(T2, T2, A0), asm.sw(T2, T1, 8),
+      asm.lw(T3, T1, 12), asm.xor(T3, T3, T2), asm.sw(T3, T1, 20))
+    p(asm.addi(A1, T1, 0))
+    p.jal(RA, "sum_record")
+    p(asm.lw(RA, SP, 4), asm.addi(SP, SP, 8), asm.jalr(ZERO, RA, 0))
+
+    p.label("sum_record")
+    p(asm.addi(A0, ZERO, 0))
+    for field in range(8):
+        p(asm.lw(T4, A1, 4 * field), asm.add(A0, A0, T4))
+    p(asm.jalr(ZERO, RA, 0))
+
+    # int_3 = 5 * int_1 - int_2, then a few data dependent branches
+    p.label("procedure_2")
+    p(asm.slli(T0, A1, 2), asm.add(T0, T0, A1), asm.sub(A0, T0, A2))
+    p.branch(asm.blt, A0, A2, "procedure_2_less")
+    p(asm.addi(A0, A0, 7))
+    p.jal(ZERO, "procedure_2_done")
+    p.label("procedure_2_less")
+    p(asm.addi(A0, A0, -7))
+    p.label("procedure_2_done")
+    p(asm.andi(T0, A0, 1))
+    p.branch(asm.beq, T0, ZERO, "procedure_2_even")
+    p(asm.xori(A0, A0, 0x55))
+    p.label("procedure_2_even")
+    p(asm.jalr(ZERO, RA, 0))
+
+    # index of the first difference of two zero terminated strings
+    p.label("compare_strings")
+    p(asm.addi(A0, ZERO, 0))
+    p.label("compare_next")
+    p(asm.add(T0, A1, A0), asm.lbu(T1, T0, 0), asm.add(T0, A2, A0), asm.lbu(T2, T0, 0))
+    p.branch(asm.bne, T1, T2, "compared")
+    p.branch(asm.beq, T1, ZERO, "compared")
+    p(asm.addi(A0, A0, 1))
+    p.jal(ZERO, "compare_next")
+    p.label("compared")
+    p(asm.jalr(ZERO, RA, 0))
+
+    fields = asm.assemble([0, 1, 2, 40, 0x1234, 0, 7, 0xdead])
+    return [loader.Segment(0, asm.assemble(p.words())),
+            loader.Segment(record, fields),
+            loader.Segment(string_1, b"DHRYSTONE PROGRAM, 1'ST STRING\0"),
+            loader.Segment(string_2, b"DHRYSTONE PROGRAM, 2'ND STRING\0")], True, None
+
+
+KERNELS = {"crc32": crc32, "memcpy": memcpy, "coremark": coremark, "dhrystone": dhrystone}
+
+
+def main():
+    manifest = {}
+    for name, kernel in KERNELS.items():
+        segments, memory, expected = kernel()
+        model = Iss(memory_size=MEMORY_SIZE)
+        loader.Image(segments).load_into(model)
+        instructions = model.run(10_000_000)
+        assert model.halted, f"{name} did not reach ebreak"
+        if expected is not None:
+            assert model.x[A0] == expected, f"{name}: a0 {model.x[A0]:#x}, expected {expected:#x}"
+
+        loader.write_hex(BENCHMARKS_PATH / f"{name}.hex", segments, entry=0)
+        manifest[name] = {"file": f"{name}.hex", "memory": memory,
+                          "a0": model.x[A0], "instructions": instructions}
+        print(f"{name:<10} {instructions:>7} instructions, a0 = {model.x[A0]:#010x}")
+    MANIFEST.write_text(json.dumps(manifest, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""Measure the simulated cycles per second of the toplevels under GHDL.
+
+Each toplevel runs the tests of bench_throughput.py, which differ in how
+much Python runs per cycle, once per build profile. A profile is a set of
+GHDL options for analysis and elaboration and one of run time options, and
+gets its own build directory. Optimization options only change anything
+with the LLVM and GCC backends, the backend GHDL was built with is part of
+the report. With --compare the script fails when a measurement got slower
+than an earlier result file by more than --slowdown, wall clock numbers
+vary so the default only catches harness changes that cost a multiple.
+"""
+import argparse
+import datetime
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BENCHMARKS_PATH = Path(__file__).resolve().parent
+REPO_PATH = BENCHMARKS_PATH.parent
+sys.path.insert(0, str(REPO_PATH / "tests" / "cocotb"))
+
+from cocotb.runner import get_runner  # noqa: E402
+
+import build_cache  # noqa: E402
+import run  # noqa: E402
+
+RESULTS_DIR = BENCHMARKS_PATH / "sim_build"
+
+# toplevel -> vhdl sources besides constants.vhdl
+TOPLEVELS: Dict[str, List[str]] = {
+    "alu": ["alu.vhdl"],
+    "decoder": ["decoder.vhdl"],
+    "pc": ["pc.vhdl"],
+    "register_file": ["multiport_registerfile.vhdl", "registerfile.vhdl"],
+    "control_unit": ["control_unit.vhdl"],
+    "core": run.TOPLEVELS["core"][1],
+}
+
+# profile -> (analysis and elaboration options, run time options)
+PROFILES: Dict[str, Tuple[List[str], List[str]]] = {
+    "default": ([], []),
+    "O2": (["-O2"], []),
+    "O3-noasserts": (["-O3"], ["--ieee-asserts=disable"]),
+}
+
+
+def backend() -> str:
+    """Code generator of the installed GHDL."""
+    try:
+        version = subprocess.run(["ghdl", "--version"], capture_output=True, text=True).stdout
+    except OSError:
+        return "unknown"
+    for line in version.splitlines():
+        if "code generator" in line or "back-end" in line:
+            return line.strip()
+    return "unknown"
+
+
+def measure(toplevel: str, profile: str, cycles: int) -> Optional[dict]:
+    """Cycles per second of every mode, None when the simulation failed."""
+    options, run_options = PROFILES[profile]
+    build_dir = run.BUILD_DIR / "throughput" / profile
+    build_args = run.BUILD_ARGS + options
+    build_cache.build(
+        vhdl_sources=[run.SRC_PATH / "constants.vhdl"] + [run.SRC_PATH / source
+                                                          for source in TOPLEVELS[toplevel]],
+        hdl_toplevel=toplevel,
+        build_args=build_args,
+        build_dir=build_dir
+    )
+
+    result_file = RESULTS_DIR / f"throughput.{profile}.{toplevel}.json"
+    result_file.unlink(missing_ok=True)
+    runner = get_runner("ghdl")
+    try:
+        runner.test(hdl_toplevel=toplevel,
+                    hdl_toplevel_lang="vhdl",
+                    test_module="bench_throughput",
+                    build_dir=build_dir,
+                    test_args=build_args,
+                    plusargs=run_options,
+                    extra_env={"THROUGHPUT_CYCLES": str(cycles),
+                               "THROUGHPUT_RESULT": str(result_file)},
+                    results_xml=f"throughput.{toplevel}.results.xml")
+    except SystemExit:
+        pass
+    if not result_file.is_file():
+        return None
+    return json.loads(result_file.read_text())
+
+
+def compare(results: dict, baseline: dict, slowdown: float) -> List[str]:
+    """Measurements more than *slowdown* times slower than in *baseline*."""
+    slower = []
+    for profile, toplevels in results.items():
+        for toplevel, modes in toplevels.items():
+            for mode, result in (modes or {}).items():
+                before = baseline.get(profile, {}).get(toplevel, {}) or {}
+                if mode not in before:
+                    continue
+                factor = before[mode]["cycles_per_second"] / result["cycles_per_second"]
+                if factor > slowdown:
+                    slower.append(f"{profile} {toplevel} {mode} {factor:.1f}x slower")
+    return slower
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("toplevels", nargs="*", default=list(TOPLEVELS), choices=list(TOPLEVELS),
+                        help="toplevels to measure, default all")
+    parser.add_argument("--profiles", nargs="+", default=["default"], choices=list(PROFILES),
+                        help="build profiles to measure with, default only the default")
+    parser.add_argument("--cycles", type=int, default=20000,
+                        help="simulated cycles per measurement")
+    parser.add_argument("-o", "--output", type=Path,
+                        help="result file, default benchmarks/sim_build/throughput-<commit>.json")
+    parser.add_argument("--compare", type=Path, metavar="BASELINE",
+                        help="result file of an earlier run to compare with")
+    parser.add_argument("--slowdown", type=float, default=2.0,
+                        help="allowed factor of slowdown against the baseline")
+    args = parser.parse_args()
+
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    generator = backend()
+    print(f"GHDL backend: {generator}")
+
+    results: Dict[str, Dict[str, Optional[dict]]] = {}
+    failed = []
+    start = time.perf_counter()
+    for profile in args.profiles:
+        results[profile] = {}
+        for toplevel in args.toplevels:
+            modes = results[profile][toplevel] = measure(toplevel, profile, args.cycles)
+            if modes is None:
+                failed.append(f"{profile} {toplevel}")
+                print(f"{profile:<14} {toplevel:<14} failed")
+                continue
+            print(f"{profile:<14} {toplevel:<14} " + " ".join(
+                f"{mode} {result['cycles_per_second']:>9.0f}/s" for mode, result in modes.items()))
+    print(f"measured in {time.perf_counter() - start:.1f}s")
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_PATH,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    output = args.output or RESULTS_DIR / f"throughput-{commit}.json"
+    output.write_text(json.dumps({
+        "commit": commit,
+        "backend": generator,
+        "cycles": args.cycles,
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "results": results,
+    }, indent=2) + "\n")
+    print(f"results in {output}")
+
+    slower = []
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        slower = compare(results, baseline["results"], args.slowdown)
+        for line in slower:
+            print(f"slowdown against {baseline['commit']}: {line}")
+    return 1 if failed or slower else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,9 @@ use ieee.numeric_std.all;
 use ieee.std_logic_1164.all;
 use work.constants.all;
 
+-- With SHARED_DATAPATH all op codes share one adder, comparator and shifter
 entity alu is
+    generic ( SHARED_DATAPATH : boolean := false );
     port ( i_clock : in  std_logic;
            i_enable : in  std_logic;
            i_op_code : in  std_logic_vector (6 downto 0);
@@ -187,12 +189,12 @@ end function;
 
 function execute_JAL(
     pc: std_logic_vector(31 downto 0);
-    immediate : std_logic_vector(19 downto 0)
+    immediate : std_logic_vector(20 downto 0)
 ) 
 return std_logic_vector is 
-    variable offset : signed(19 downto 0);
+    variable offset : signed(20 downto 0);
     begin
-        -- Sign extend 20 bit immediate, add to address of jump
+        -- Sign extend 21 bit immediate, add to address of jump
         -- instruction
         -- This returns the branch target
         offset := signed(immediate);
@@ -216,7 +218,7 @@ end function;
 procedure execute_BRANCH(
     signal data_s1 : in std_logic_vector(31 downto 0);
     signal data_s2 : in std_logic_vector(31 downto 0);
-    signal immediate: in std_logic_vector(11 downto 0);
+    signal immediate: in std_logic_vector(12 downto 0);
     signal fun3: in std_logic_vector(2 downto 0);
     signal program_counter : in std_logic_vector(31 downto 0);
     signal target : out std_logic_vector(31 downto 0);
@@ -244,8 +246,19 @@ begin
     end case;
 end procedure;
 
+function reverse(data : std_logic_vector(31 downto 0))
+return std_logic_vector is
+    variable result : std_logic_vector(31 downto 0);
+    begin
+        for i in 0 to 31 loop
+            result(i) := data(31 - i);
+        end loop;
+        return result;
+end function;
+
 
 begin
+    separate: if not SHARED_DATAPATH generate
     process (i_clock)
     begin
         if rising_edge(i_clock) and i_enable = '1' then
@@ -271,7 +284,7 @@ begin
                     o_should_write_result <= '1';
 
                 when OP_JAL =>
-                    o_branch_target <= execute_JAL(i_program_counter, i_data_immediate(19 downto 0));
+                    o_branch_target <= execute_JAL(i_program_counter, i_data_immediate(20 downto 0));
                     o_data_result <= std_logic_vector(signed(i_program_counter) + 4);
                     o_should_branch <= '1';
                     o_should_write_result <= '1';
@@ -284,18 +297,151 @@ begin
                     execute_BRANCH(
                         i_data_s1,
                         i_data_s2,
-                        i_data_immediate(11 downto 0),
+                        i_data_immediate(12 downto 0),
                         i_fun3,
                         i_program_counter,
                         o_branch_target,
                         o_should_branch
                     );
                     o_should_write_result <= '0';
+                when OP_LOAD | OP_STORE =>
+                    o_data_result <= std_logic_vector(signed(i_data_s1) + signed(i_data_immediate(11 downto 0)));
+                    o_should_branch <= '0';
+                    o_should_write_result <= '0';
                 when others =>
                     o_data_result <= ZERO(31 downto 0);
                     o_should_write_result <= '0';
             end case;
         end if;
     end process;
+    end generate;
+
+    shared: if SHARED_DATAPATH generate
+        signal sign_immediate : std_logic_vector(31 downto 0);
+        signal upper_immediate : std_logic_vector(31 downto 0);
+        signal operand_a : std_logic_vector(31 downto 0);
+        signal operand_b : std_logic_vector(31 downto 0);
+        signal subtract : std_logic := '0';
+        signal sum : unsigned(32 downto 0);
+        signal equal : std_logic := '0';
+        signal less : std_logic := '0';
+        signal less_unsigned : std_logic := '0';
+        signal shift_left_op : std_logic := '0';
+        signal arithmetic : std_logic := '0';
+        signal shift_input : std_logic_vector(31 downto 0);
+        signal shifted : std_logic_vector(31 downto 0);
+        signal shift_result : std_logic_vector(31 downto 0);
+        signal logic_result : std_logic_vector(31 downto 0);
+        signal function_result : std_logic_vector(31 downto 0);
+        signal regreg_valid : std_logic := '0';
+        signal target_base : std_logic_vector(31 downto 0);
+        signal target_offset : std_logic_vector(31 downto 0);
+        signal target : std_logic_vector(31 downto 0);
+        signal branch_taken : std_logic := '0';
+    begin
+        sign_immediate <= std_logic_vector(resize(signed(i_data_immediate(11 downto 0)), 32));
+        upper_immediate <= i_data_immediate(19 downto 0) & ZERO(11 downto 0);
+
+        operand_a <= i_program_counter when i_op_code = OP_AUIPC or i_op_code = OP_JAL
+                     or i_op_code = OP_JALR else i_data_s1;
+        operand_b <= i_data_s2 when i_op_code = OP_REGREG or i_op_code = OP_BRANCH else
+                     upper_immediate when i_op_code = OP_AUIPC else
+                     std_logic_vector(to_unsigned(4, 32)) when i_op_code = OP_JAL or i_op_code = OP_JALR else
+                     sign_immediate;
+        subtract <= '1' when i_op_code = OP_BRANCH
+                    or ((i_op_code = OP_REGREG or i_op_code = OP_IMM)
+                        and (i_fun3 = F3_OP_SLT or i_fun3 = F3_OP_SLTU))
+                    or (i_op_code = OP_REGREG and i_fun7 & i_fun3 = F7_OP_SUB & F3_OP_SUB) else '0';
+        sum <= unsigned('0' & operand_a)
+               + unsigned('0' & (operand_b xor subtract))
+               + unsigned(ZERO & subtract);
+
+        equal <= '1' when operand_a = operand_b else '0';
+        less_unsigned <= not sum(32);
+        less <= operand_a(31) when operand_a(31) /= operand_b(31) else sum(31);
+
+        shift_left_op <= '1' when i_fun3 = F3_OP_SLL else '0';
+        arithmetic <= '0' when i_fun7 = F7_OP_SRL or shift_left_op = '1' else '1';
+        shift_input <= reverse(i_data_s1) when shift_left_op = '1' else i_data_s1;
+        shifted <= std_logic_vector(shift_right(signed((i_data_s1(31) and arithmetic) & shift_input),
+                                                to_integer(unsigned(operand_b(4 downto 0)))))(31 downto 0);
+        shift_result <= reverse(shifted) when shift_left_op = '1' else shifted;
+
+        with i_fun3 select logic_result <=
+            operand_a xor operand_b when F3_OP_XOR,
+            operand_a or operand_b when F3_OP_OR,
+            operand_a and operand_b when others;
+
+        with i_fun3 select function_result <=
+            std_logic_vector(sum(31 downto 0)) when F3_OP_ADD,
+            ZERO(31 downto 1) & less when F3_OP_SLT,
+            ZERO(31 downto 1) & less_unsigned when F3_OP_SLTU,
+            shift_result when F3_OP_SLL | F3_OP_SRL,
+            logic_result when others;
+
+        regreg_valid <= '1' when i_fun7 = F7_OP_ADD
+                        or i_fun7 & i_fun3 = F7_OP_SUB & F3_OP_SUB
+                        or i_fun7 & i_fun3 = F7_OP_SRA & F3_OP_SRA else '0';
+
+        target_base <= i_data_s1 when i_op_code = OP_JALR else i_program_counter;
+        target_offset <= std_logic_vector(resize(signed(i_data_immediate(20 downto 0)), 32))
+                         when i_op_code = OP_JAL else
+                         std_logic_vector(resize(signed(i_data_immediate(12 downto 0)), 32))
+                         when i_op_code = OP_BRANCH else sign_immediate;
+        target <= std_logic_vector(unsigned(target_base) + unsigned(target_offset));
+
+        with i_fun3 select branch_taken <=
+            equal when F3_BRANCH_BEQ,
+            not equal when F3_BRANCH_BNE,
+            less when F3_BRANCH_BLT,
+            not less when F3_BRANCH_BGE,
+            less_unsigned when F3_BRANCH_BLTU,
+            not less_unsigned when F3_BRANCH_BGEU,
+            '0' when others;
+
+        process (i_clock)
+        begin
+            if rising_edge(i_clock) and i_enable = '1' then
+                case i_op_code is
+                    when OP_IMM | OP_REGREG =>
+                        if i_op_code = OP_REGREG and regreg_valid = '0' then
+                            o_data_result <= ZERO;
+                        else
+                            o_data_result <= function_result;
+                        end if;
+                        o_should_branch <= '0';
+                        o_should_write_result <= '1';
+                    when OP_LUI =>
+                        o_data_result <= upper_immediate;
+                        o_should_branch <= '0';
+                        o_should_write_result <= '1';
+                    when OP_AUIPC =>
+                        o_data_result <= std_logic_vector(sum(31 downto 0));
+                        o_should_branch <= '0';
+                        o_should_write_result <= '1';
+                    when OP_JAL | OP_JALR =>
+                        if i_op_code = OP_JALR then
+                            o_branch_target <= target(31 downto 1) & '0';
+                        else
+                            o_branch_target <= target;
+                        end if;
+                        o_data_result <= std_logic_vector(sum(31 downto 0));
+                        o_should_branch <= '1';
+                        o_should_write_result <= '1';
+                    when OP_BRANCH =>
+                        o_branch_target <= target;
+                        o_should_branch <= branch_taken;
+                        o_should_write_result <= '0';
+                    when OP_LOAD | OP_STORE =>
+                        o_data_result <= std_logic_vector(sum(31 downto 0));
+                        o_should_branch <= '0';
+                        o_should_write_result <= '0';
+                    when others =>
+                        o_data_result <= ZERO;
+                        o_should_write_result <= '0';
+                end case;
+            end if;
+        end process;
+    end generate;
 
 end behavioral;
@@ -0,0 +1,27 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Static prediction, jumps and backward branches are taken
+entity branch_predictor is
+    port ( i_op_code : in  std_logic_vector (6 downto 0);
+           i_data_immediate : in std_logic_vector(31 downto 0);
+           i_program_counter : in std_logic_vector(31 downto 0);
+           o_predict_taken: out std_logic;
+           o_predicted_target: out std_logic_vector(31 downto 0)
+       );
+end branch_predictor;
+
+architecture behavioral of branch_predictor is
+    signal offset : signed(31 downto 0);
+begin
+    offset <= resize(signed(i_data_immediate(20 downto 0)), 32) when i_op_code = OP_JAL else
+              resize(signed(i_data_immediate(12 downto 0)), 32);
+
+    o_predict_taken <= '1' when i_op_code = OP_JAL else
+                       i_data_immediate(12) when i_op_code = OP_BRANCH else
+                       '0';
+    o_predicted_target <= std_logic_vector(signed(i_program_counter) + offset);
+end behavioral;
@@ -0,0 +1,81 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Direct mapped branch target buffer with 2 bit saturating counters
+entity branch_target_buffer is
+    generic ( ENTRIES : positive := 16;
+              COMPRESSED : boolean := false );
+    port ( i_clock : in  std_logic;
+           i_enable : in  std_logic;
+           i_reset : in  std_logic;
+           i_fetch_pc : in std_logic_vector(31 downto 0);
+           o_predict_taken : out std_logic;
+           o_predicted_target : out std_logic_vector(31 downto 0);
+           i_update : in std_logic;
+           i_update_pc : in std_logic_vector(31 downto 0);
+           i_update_taken : in std_logic;
+           i_update_target : in std_logic_vector(31 downto 0)
+       );
+end branch_target_buffer;
+
+architecture behavioral of branch_target_buffer is
+    constant INDEX_BITS : natural := log2(ENTRIES);
+    constant OFFSET_BITS : natural := 2 - boolean'pos(COMPRESSED);
+    constant WEAKLY_TAKEN : unsigned(1 downto 0) := "10";
+
+    subtype tag_t is std_logic_vector(31 downto OFFSET_BITS + INDEX_BITS);
+    type tags_t is array (0 to 2**INDEX_BITS - 1) of tag_t;
+    type targets_t is array (0 to 2**INDEX_BITS - 1) of std_logic_vector(31 downto 0);
+    type counters_t is array (0 to 2**INDEX_BITS - 1) of unsigned(1 downto 0);
+
+    signal valid : std_logic_vector(0 to 2**INDEX_BITS - 1) := (others => '0');
+    signal tags : tags_t := (others => (others => '0'));
+    signal targets : targets_t := (others => (others => '0'));
+    signal counters : counters_t := (others => WEAKLY_TAKEN);
+
+    function index(pc : std_logic_vector(31 downto 0)) return natural is
+    begin
+        if INDEX_BITS = 0 then
+            return 0;
+        end if;
+        return to_integer(unsigned(pc(OFFSET_BITS + INDEX_BITS - 1 downto OFFSET_BITS)));
+    end function;
+
+    signal fetch_index : natural range 0 to 2**INDEX_BITS - 1;
+begin
+    fetch_index <= index(i_fetch_pc);
+    o_predict_taken <= '1' when valid(fetch_index) = '1'
+                       and tags(fetch_index) = i_fetch_pc(tag_t'range)
+                       and counters(fetch_index)(1) = '1' else '0';
+    o_predicted_target <= targets(fetch_index);
+
+    process (i_clock)
+        variable i : natural range 0 to 2**INDEX_BITS - 1;
+    begin
+        if rising_edge(i_clock) and i_enable = '1' then
+            i := index(i_update_pc);
+            if i_reset = '1' then
+                valid <= (others => '0');
+            elsif i_update = '1' then
+                if valid(i) = '1' and tags(i) = i_update_pc(tag_t'range) then
+                    if i_update_taken = '1' then
+                        if counters(i) /= 3 then
+                            counters(i) <= counters(i) + 1;
+                        end if;
+                        targets(i) <= i_update_target;
+                    elsif counters(i) /= 0 then
+                        counters(i) <= counters(i) - 1;
+                    end if;
+                elsif i_update_taken = '1' then
+                    valid(i) <= '1';
+                    tags(i) <= i_update_pc(tag_t'range);
+                    targets(i) <= i_update_target;
+                    counters(i) <= WEAKLY_TAKEN;
+                end if;
+            end if;
+        end if;
+    end process;
+end behavioral;
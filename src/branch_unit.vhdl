@@ -0,0 +1,52 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Resolves jumps and branches in decode, next to the register file reads
+entity branch_unit is
+    port ( i_op_code : in  std_logic_vector (6 downto 0);
+           i_fun3 : in std_logic_vector(2 downto 0);
+           i_data_s1 : in std_logic_vector(31 downto 0);
+           i_data_s2 : in std_logic_vector(31 downto 0);
+           i_data_immediate : in std_logic_vector(31 downto 0);
+           i_program_counter : in std_logic_vector(31 downto 0);
+           o_should_branch: out std_logic;
+           o_branch_target: out std_logic_vector(31 downto 0)
+       );
+end branch_unit;
+
+architecture behavioral of branch_unit is
+    signal base : unsigned(31 downto 0);
+    signal offset : signed(31 downto 0);
+    signal target : std_logic_vector(31 downto 0);
+    signal equal : std_logic := '0';
+    signal less : std_logic := '0';
+    signal less_unsigned : std_logic := '0';
+    signal condition : std_logic := '0';
+begin
+    base <= unsigned(i_data_s1) when i_op_code = OP_JALR else unsigned(i_program_counter);
+    offset <= resize(signed(i_data_immediate(20 downto 0)), 32) when i_op_code = OP_JAL else
+              resize(signed(i_data_immediate(11 downto 0)), 32) when i_op_code = OP_JALR else
+              resize(signed(i_data_immediate(12 downto 0)), 32);
+    target <= std_logic_vector(base + unsigned(offset));
+
+    equal <= '1' when i_data_s1 = i_data_s2 else '0';
+    less <= '1' when signed(i_data_s1) < signed(i_data_s2) else '0';
+    less_unsigned <= '1' when unsigned(i_data_s1) < unsigned(i_data_s2) else '0';
+
+    with i_fun3 select condition <=
+        equal when F3_BRANCH_BEQ,
+        not equal when F3_BRANCH_BNE,
+        less when F3_BRANCH_BLT,
+        not less when F3_BRANCH_BGE,
+        less_unsigned when F3_BRANCH_BLTU,
+        not less_unsigned when F3_BRANCH_BGEU,
+        '0' when others;
+
+    o_should_branch <= '1' when i_op_code = OP_JAL or i_op_code = OP_JALR else
+                       condition when i_op_code = OP_BRANCH else
+                       '0';
+    o_branch_target <= target(31 downto 1) & '0' when i_op_code = OP_JALR else target;
+end behavioral;
@@ -0,0 +1,199 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Expands RV32C instructions to the 32 bit instructions they stand for
+entity compressed_expander is
+    port ( i_instruction : in  std_logic_vector(31 downto 0);
+           o_instruction : out std_logic_vector(31 downto 0);
+           o_compressed : out std_logic
+       );
+end compressed_expander;
+
+architecture behavioral of compressed_expander is
+    constant SP : std_logic_vector(4 downto 0) := "00010";
+    constant RA : std_logic_vector(4 downto 0) := "00001";
+    constant X0 : std_logic_vector(4 downto 0) := "00000";
+
+    function sign_extend(value : std_logic_vector; bits : positive)
+    return std_logic_vector is
+    begin
+        return std_logic_vector(resize(signed(value), bits));
+    end function;
+
+    function i_type(imm : std_logic_vector(11 downto 0); rs1 : std_logic_vector(4 downto 0);
+                    fun3 : std_logic_vector(2 downto 0); rd : std_logic_vector(4 downto 0);
+                    op_code : std_logic_vector(6 downto 0))
+    return std_logic_vector is
+    begin
+        return imm & rs1 & fun3 & rd & op_code;
+    end function;
+
+    function s_type(imm : std_logic_vector(11 downto 0); rs2 : std_logic_vector(4 downto 0);
+                    rs1 : std_logic_vector(4 downto 0))
+    return std_logic_vector is
+    begin
+        return imm(11 downto 5) & rs2 & rs1 & F3_STORE_SW & imm(4 downto 0) & OP_STORE;
+    end function;
+
+    function r_type(fun7 : std_logic_vector(6 downto 0); rs2 : std_logic_vector(4 downto 0);
+                    rs1 : std_logic_vector(4 downto 0); fun3 : std_logic_vector(2 downto 0);
+                    rd : std_logic_vector(4 downto 0); op_code : std_logic_vector(6 downto 0))
+    return std_logic_vector is
+    begin
+        return fun7 & rs2 & rs1 & fun3 & rd & op_code;
+    end function;
+
+    function b_type(imm : std_logic_vector(12 downto 0); rs1 : std_logic_vector(4 downto 0);
+                    fun3 : std_logic_vector(2 downto 0))
+    return std_logic_vector is
+    begin
+        return imm(12) & imm(10 downto 5) & X0 & rs1 & fun3 & imm(4 downto 1) & imm(11) & OP_BRANCH;
+    end function;
+
+    function j_type(imm : std_logic_vector(20 downto 0); rd : std_logic_vector(4 downto 0))
+    return std_logic_vector is
+    begin
+        return imm(20) & imm(10 downto 1) & imm(11) & imm(19 downto 12) & rd & OP_JAL;
+    end function;
+begin
+    process (i_instruction)
+        variable c : std_logic_vector(15 downto 0);
+        variable selector : std_logic_vector(4 downto 0);
+        variable rd : std_logic_vector(4 downto 0);
+        variable rs2 : std_logic_vector(4 downto 0);
+        variable rd_short : std_logic_vector(4 downto 0);
+        variable rs1_short : std_logic_vector(4 downto 0);
+        variable imm6 : std_logic_vector(5 downto 0);
+        variable imm_lw : std_logic_vector(11 downto 0);
+        variable imm_jump : std_logic_vector(20 downto 0);
+        variable imm_branch : std_logic_vector(12 downto 0);
+        variable imm_addi4spn : std_logic_vector(11 downto 0);
+        variable imm_addi16sp : std_logic_vector(11 downto 0);
+        variable expanded : std_logic_vector(31 downto 0);
+    begin
+        c := i_instruction(15 downto 0);
+        selector := c(1 downto 0) & c(15 downto 13);
+        rd := c(11 downto 7);
+        rs2 := c(6 downto 2);
+        rd_short := "01" & c(4 downto 2);
+        rs1_short := "01" & c(9 downto 7);
+        imm6 := c(12) & c(6 downto 2);
+        imm_lw := "00000" & c(5) & c(12 downto 10) & c(6) & "00";
+        imm_jump := sign_extend(c(12) & c(8) & c(10 downto 9) & c(6) & c(7) & c(2) & c(11)
+                                & c(5 downto 3) & '0', 21);
+        imm_branch := sign_extend(c(12) & c(6 downto 5) & c(2) & c(11 downto 10)
+                                  & c(4 downto 3) & '0', 13);
+        imm_addi4spn := "00" & c(10 downto 7) & c(12 downto 11) & c(5) & c(6) & "00";
+        imm_addi16sp := sign_extend(c(12) & c(4 downto 3) & c(5) & c(2) & c(6) & "0000", 12);
+
+        expanded := (others => '0');
+        case selector is
+            -- quadrant 0
+            when "00000" => -- c.addi4spn
+                if imm_addi4spn /= ZERO(11 downto 0) then
+                    expanded := i_type(imm_addi4spn, SP, F3_OPIMM_ADDI, rd_short, OP_IMM);
+                end if;
+            when "00010" => -- c.lw
+                expanded := i_type(imm_lw, rs1_short, F3_LOAD_LW, rd_short, OP_LOAD);
+            when "00110" => -- c.sw
+                expanded := s_type(imm_lw, rd_short, rs1_short);
+
+            -- quadrant 1
+            when "01000" => -- c.addi, c.nop
+                expanded := i_type(sign_extend(imm6, 12), rd, F3_OPIMM_ADDI, rd, OP_IMM);
+            when "01001" => -- c.jal
+                expanded := j_type(imm_jump, RA);
+            when "01101" => -- c.j
+                expanded := j_type(imm_jump, X0);
+            when "01010" => -- c.li
+                expanded := i_type(sign_extend(imm6, 12), X0, F3_OPIMM_ADDI, rd, OP_IMM);
+            when "01011" =>
+                if rd = SP then -- c.addi16sp
+                    if imm_addi16sp /= ZERO(11 downto 0) then
+                        expanded := i_type(imm_addi16sp, SP, F3_OPIMM_ADDI, SP, OP_IMM);
+                    end if;
+                elsif imm6 /= "000000" then -- c.lui
+                    expanded := sign_extend(imm6, 20) & rd & OP_LUI;
+                end if;
+            when "01100" =>
+                case c(11 downto 10) is
+                    when "00" => -- c.srli
+                        if c(12) = '0' then
+                            expanded := r_type(F7_OPIMM_SRLI, rs2, rs1_short, F3_OPIMM_SRLI,
+                                               rs1_short, OP_IMM);
+                        end if;
+                    when "01" => -- c.srai
+                        if c(12) = '0' then
+                            expanded := r_type(F7_OPIMM_SRAI, rs2, rs1_short, F3_OPIMM_SRAI,
+                                               rs1_short, OP_IMM);
+                        end if;
+                    when "10" => -- c.andi
+                        expanded := i_type(sign_extend(imm6, 12), rs1_short, F3_OPIMM_ANDI,
+                                           rs1_short, OP_IMM);
+                    when others =>
+                        -- c.subw and c.addw of RV64 with bit 12 set
+                        if c(12) = '0' then
+                            case c(6 downto 5) is
+                                when "00" => -- c.sub
+                                    expanded := r_type(F7_OP_SUB, rd_short, rs1_short, F3_OP_SUB,
+                                                       rs1_short, OP_REGREG);
+                                when "01" => -- c.xor
+                                    expanded := r_type(F7_OP_XOR, rd_short, rs1_short, F3_OP_XOR,
+                                                       rs1_short, OP_REGREG);
+                                when "10" => -- c.or
+                                    expanded := r_type(F7_OP_OR, rd_short, rs1_short, F3_OP_OR,
+                                                       rs1_short, OP_REGREG);
+                                when others => -- c.and
+                                    expanded := r_type(F7_OP_AND, rd_short, rs1_short, F3_OP_AND,
+                                                       rs1_short, OP_REGREG);
+                            end case;
+                        end if;
+                end case;
+            when "01110" => -- c.beqz
+                expanded := b_type(imm_branch, rs1_short, F3_BRANCH_BEQ);
+            when "01111" => -- c.bnez
+                expanded := b_type(imm_branch, rs1_short, F3_BRANCH_BNE);
+
+            -- quadrant 2
+            when "10000" => -- c.slli
+                if c(12) = '0' then
+                    expanded := r_type(F7_OPIMM_SLLI, rs2, rd, F3_OPIMM_SLLI, rd, OP_IMM);
+                end if;
+            when "10010" => -- c.lwsp
+                if rd /= X0 then
+                    expanded := i_type("0000" & c(3 downto 2) & c(12) & c(6 downto 4) & "00",
+                                       SP, F3_LOAD_LW, rd, OP_LOAD);
+                end if;
+            when "10110" => -- c.swsp
+                expanded := s_type("0000" & c(8 downto 7) & c(12 downto 9) & "00", rs2, SP);
+            when "10100" =>
+                if c(12) = '0' then
+                    if rs2 /= X0 then -- c.mv
+                        expanded := r_type(F7_OP_ADD, rs2, X0, F3_OP_ADD, rd, OP_REGREG);
+                    elsif rd /= X0 then -- c.jr
+                        expanded := i_type(ZERO(11 downto 0), rd, F3_JALR, X0, OP_JALR);
+                    end if;
+                else
+                    if rs2 /= X0 then -- c.add
+                        expanded := r_type(F7_OP_ADD, rs2, rd, F3_OP_ADD, rd, OP_REGREG);
+                    elsif rd /= X0 then -- c.jalr
+                        expanded := i_type(ZERO(11 downto 0), rd, F3_JALR, RA, OP_JALR);
+                    else -- c.ebreak
+                        expanded := i_type(x"001", X0, F3_ENV_PRIV, X0, OP_ENV);
+                    end if;
+                end if;
+            when others =>
+        end case;
+
+        if i_instruction(1 downto 0) = "11" then
+            o_instruction <= i_instruction;
+            o_compressed <= '0';
+        else
+            o_instruction <= expanded;
+            o_compressed <= '1';
+        end if;
+    end process;
+end behavioral;
@@ -123,9 +123,47 @@ package constants is
 	constant F3_OP_AND: std_logic_vector(2 downto 0) := "111";
 	constant F7_OP_AND: std_logic_vector(6 downto 0) := "0000000";
 
+	-- M extension, register-register with F7_OP_MULDIV
+	constant F7_OP_MULDIV: std_logic_vector(6 downto 0) := "0000001";
+	constant F3_MULDIV_MUL: std_logic_vector(2 downto 0) := "000";
+	constant F3_MULDIV_MULH: std_logic_vector(2 downto 0) := "001";
+	constant F3_MULDIV_MULHSU: std_logic_vector(2 downto 0) := "010";
+	constant F3_MULDIV_MULHU: std_logic_vector(2 downto 0) := "011";
+	constant F3_MULDIV_DIV: std_logic_vector(2 downto 0) := "100";
+	constant F3_MULDIV_DIVU: std_logic_vector(2 downto 0) := "101";
+	constant F3_MULDIV_REM: std_logic_vector(2 downto 0) := "110";
+	constant F3_MULDIV_REMU: std_logic_vector(2 downto 0) := "111";
+
+	constant F3_ENV_PRIV: std_logic_vector(2 downto 0) := "000";
+	constant F3_CSR_RW: std_logic_vector(2 downto 0) := "001";
+	constant F3_CSR_RS: std_logic_vector(2 downto 0) := "010";
+	constant F3_CSR_RC: std_logic_vector(2 downto 0) := "011";
+	constant F3_CSR_RWI: std_logic_vector(2 downto 0) := "101";
+	constant F3_CSR_RSI: std_logic_vector(2 downto 0) := "110";
+	constant F3_CSR_RCI: std_logic_vector(2 downto 0) := "111";
+    -- Counter CSRs, bits 11 to 8 select the bank and bit 7 the upper half
+    constant CSR_BANK_COUNTERS : std_logic_vector(3 downto 0) := "1100";
+    constant CSR_BANK_MCOUNTERS : std_logic_vector(3 downto 0) := "1011";
+    constant CSR_CYCLE : natural := 0;
+    constant CSR_TIME : natural := 1;
+    constant CSR_INSTRET : natural := 2;
+    constant CSR_HPM_TAKEN_BRANCHES : natural := 3;
+    constant CSR_HPM_MISPREDICTS : natural := 4;
+    constant CSR_HPM_STALLS : natural := 5;
+    constant CSR_HPM_CACHE_MISSES : natural := 6;
     constant ZERO : std_logic_vector(31 downto 0) := (others => '0');
+
+    -- Number of address bits to select one of value entries, rounded up
+    function log2(value : positive) return natural;
 end constants;
 
 package body constants is
- 
+    function log2(value : positive) return natural is
+        variable bits : natural := 0;
+    begin
+        while 2**bits < value loop
+            bits := bits + 1;
+        end loop;
+        return bits;
+    end function;
 end constants;
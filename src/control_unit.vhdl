@@ -5,9 +5,11 @@ use ieee.numeric_std.all;
 use ieee.std_logic_1164.all;
 use work.constants.all;
 
+-- Phases of the sequential core, held while i_stall is set
 entity control_unit is
     port ( i_clock : in  std_logic;
            i_reset : in  std_logic;
+           i_stall : in  std_logic := '0';
            o_active_phase : out std_logic_vector(5 downto 0)
         );
 end control_unit;
@@ -17,7 +19,7 @@ architecture behavioral of control_unit is
 begin 
     process(i_clock)
     begin
-        if rising_edge(i_clock) and i_reset = '0' then
+        if rising_edge(i_clock) and i_reset = '0' and i_stall = '0' then
             case active_phase is
             when CU_RESET =>
                 active_phase <= CU_FETCH;
@@ -5,13 +5,42 @@ use ieee.std_logic_1164.all;
 use work.constants.all;
 
 entity core is
+    generic ( PIPELINED : boolean := false;
+              STATIC_PREDICTION : boolean := true;
+              BTB_ENTRIES : natural := 0;
+              DCACHE_LINE_WORDS : positive := 4;
+              DCACHE_SETS : positive := 16;
+              STORE_BUFFER_ENTRIES : positive := 4;
+              SHARED_ALU : boolean := false;
+              RESOLVE_IN_DECODE : boolean := false;
+              SINGLE_CYCLE_DIVIDE : boolean := false;
+              COMPRESSED : boolean := false;
+              ICACHE_LINE_WORDS : positive := 4;
+              ICACHE_SETS : natural := 0;
+              ICACHE_WAYS : positive := 1 );
     port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
            i_enable : in  std_logic;
-           o_data_result : out std_logic_vector(31 downto 0)
+           i_instruction : in std_logic_vector(31 downto 0);
+           i_instruction_ready : in std_logic := '1';
+           o_instruction_address : out std_logic_vector(31 downto 0);
+           o_instruction_mem_request : out std_logic;
+           o_instruction_mem_address : out std_logic_vector(31 downto 0);
+           i_instruction_mem_valid : in std_logic := '0';
+           i_instruction_mem_data : in std_logic_vector(31 downto 0) := (others => '0');
+           o_data_result : out std_logic_vector(31 downto 0);
+           o_data_mem_request : out std_logic;
+           o_data_mem_write : out std_logic;
+           o_data_mem_address : out std_logic_vector(31 downto 0);
+           o_data_mem_data : out std_logic_vector(31 downto 0);
+           i_data_mem_valid : in std_logic := '0';
+           i_data_mem_data : in std_logic_vector(31 downto 0) := (others => '0')
        );
 end core;
 
 architecture behavioral of core is
+    constant ZERO : std_logic_vector(31 downto 0) := (others => '0');
+
     -- Registerfile and Data related
     signal address_s1 : std_logic_vector(4 downto 0) := (others => '0');
     signal address_s2 : std_logic_vector(4 downto 0) := (others => '0');
@@ -20,91 +49,646 @@ architecture behavioral of core is
     signal data_s2 : std_logic_vector(31 downto 0) := (others => '0');
     signal data_dest : std_logic_vector(31 downto 0) := (others => '0');
     signal data_immediate : std_logic_vector(31 downto 0) := (others => '0');
+    signal alu_s1 : std_logic_vector(31 downto 0) := (others => '0');
+    signal alu_s2 : std_logic_vector(31 downto 0) := (others => '0');
+    signal alu_immediate : std_logic_vector(31 downto 0) := (others => '0');
+    signal fetch_instruction : std_logic_vector(31 downto 0) := (others => '0');
+    signal instruction : std_logic_vector(31 downto 0) := (others => '0');
+    signal instruction_compressed : std_logic := '0';
+    signal write_dest : std_logic_vector(4 downto 0) := (others => '0');
+    signal write_data : std_logic_vector(31 downto 0) := (others => '0');
 
     -- OP Codes and ALU functions
-    signal instruction : std_logic_vector(6 downto 0);
     signal alu_op : std_logic_vector(6 downto 0);
     signal function3 : std_logic_vector(2 downto 0);
     signal function7 : std_logic_vector(6 downto 0);
-    signal pc_op : std_logic_vector(2 downto 0);
-    
+    signal should_write_result : std_logic := '0';
+    signal alu_result : std_logic_vector(31 downto 0) := (others => '0');
+    signal compressed_link : std_logic := '0';
+
+    signal is_muldiv : std_logic := '0';
+    signal muldiv_request : std_logic := '0';
+    signal muldiv_ready : std_logic := '0';
+    signal muldiv_stall : std_logic := '0';
+    signal muldiv_result : std_logic_vector(31 downto 0) := (others => '0');
+    signal muldiv_select : std_logic := '0';
+
     -- Control Unit related
-    signal pipeline_enable : std_logic_vector(PIPELINE_LENGTH downto 0)  := (others => '0');
     signal register_file_enable : std_logic := '0';
     signal register_file_write_enable : std_logic := '0';
     signal decoder_enable : std_logic := '0';
-    signal memory_enable : std_logic := '0';
     signal alu_enable : std_logic := '0';
-    signal pc_enable : std_logic := '0';
-    signal control_unit_enable : std_logic := '0';
 
     -- Program Counter
     signal program_counter : std_logic_vector(31 downto 0) := (others => '0');
     signal should_branch: std_logic := '0';
     signal branch_target : std_logic_vector(31 downto 0) := (others => '0');
 
+    signal lsu_request : std_logic := '0';
+    signal lsu_store : std_logic := '0';
+    signal lsu_fun3 : std_logic_vector(2 downto 0) := (others => '0');
+    signal lsu_address : std_logic_vector(31 downto 0) := (others => '0');
+    signal lsu_store_data : std_logic_vector(31 downto 0) := (others => '0');
+    signal lsu_ready : std_logic := '0';
+    signal lsu_data : std_logic_vector(31 downto 0) := (others => '0');
+    signal cache_miss : std_logic := '0';
+    signal cache_accesses : std_logic_vector(31 downto 0) := (others => '0');
+    signal cache_misses : std_logic_vector(31 downto 0) := (others => '0');
+    signal cache_writebacks : std_logic_vector(31 downto 0) := (others => '0');
+
+    signal retire_valid : std_logic := '0';
+    signal retire_pc : std_logic_vector(31 downto 0) := (others => '0');
+
+    signal active_phase : std_logic_vector(5 downto 0) := CU_RESET;
+
+    signal csr_access : std_logic := '0';
+    signal csr_address : std_logic_vector(11 downto 0) := (others => '0');
+    signal csr_fun3 : std_logic_vector(2 downto 0) := (others => '0');
+    signal csr_source : std_logic_vector(31 downto 0) := (others => '0');
+    signal csr_data : std_logic_vector(31 downto 0) := (others => '0');
+    signal event_retire : std_logic := '0';
+    signal event_taken_branch : std_logic := '0';
+    signal event_mispredict : std_logic := '0';
+    signal event_stall : std_logic := '0';
+    signal event_cache_miss : std_logic := '0';
+
     begin
 	register_file:	entity	work.register_file
+	generic map (BYPASS => PIPELINED)
 	port map (
 			 i_clock=>i_clock,
 			 i_enable=>register_file_enable,
-			 i_datadest=>data_dest,
+			 i_datadest=>write_data,
 			 o_dataa=>data_s1,
 			 o_datab=>data_s2,
 			 i_selecta=>address_s1,
 			 i_selectb=>address_s2,
-			 i_selectdest=>address_dest,
+			 i_selectdest=>write_dest,
 			 i_write_enable=>register_file_write_enable
 		    );
 
     alu: entity work.alu
-    port map ( 
+    generic map (SHARED_DATAPATH => SHARED_ALU)
+    port map (
            i_clock => i_clock,
-           i_enable => register_file_write_enable,
+           i_enable => alu_enable,
            i_op_code => alu_op,
            i_fun3 => function3,
            i_fun7 => function7,
-           i_data_s1 => data_s1,
-           i_data_s2 => data_s2,
-           i_data_immediate => data_immediate,
+           i_data_s1 => alu_s1,
+           i_data_s2 => alu_s2,
+           i_data_immediate => alu_immediate,
            i_program_counter => program_counter,
-           o_data_result => data_result,
+           o_data_result => alu_result,
+           o_should_write_result => should_write_result,
            o_should_branch => should_branch,
            o_branch_target => branch_target
        );
 
+    multiply_divide_unit: entity work.multiply_divide_unit
+    generic map (SINGLE_CYCLE_DIVIDE => SINGLE_CYCLE_DIVIDE)
+    port map (
+           i_clock => i_clock,
+           i_reset => i_reset,
+           i_enable => alu_enable,
+           i_request => muldiv_request,
+           i_fun3 => function3,
+           i_data_s1 => alu_s1,
+           i_data_s2 => alu_s2,
+           o_ready => muldiv_ready,
+           o_data_result => muldiv_result
+       );
+
     decoder: entity work.decoder
-    port map ( 
+    port map (
            i_clock => i_clock,
            i_data_instruction => instruction,
            i_enable => decoder_enable,
-           o_selecta => address_s1,
-           o_selectb => address_s2,
+           o_selecta => open,
+           o_selectb => open,
            o_selectdest => address_dest,
            o_data_imm => data_immediate,
-           o_write_enable => o_write_enable,
-           o_opcode => o_opcode,
-           o_fun3 => o_fun3,
-           o_fun7 => o_fun7
+           o_opcode => alu_op,
+           o_fun3 => function3,
+           o_fun7 => function7
        );
 
-    pc: entity work.pc
-    port map ( 
+    csr_unit: entity work.csr_unit
+    port map (
            i_clock => i_clock,
+           i_reset => i_reset,
            i_enable => i_enable,
-           i_op_code => i_op_code,
-           i_data => i_data,
-           o_pc => o_pc
-        );
+           i_access => csr_access,
+           i_address => csr_address,
+           i_fun3 => csr_fun3,
+           i_source => csr_source,
+           o_data => csr_data,
+           i_retire => event_retire,
+           i_taken_branch => event_taken_branch,
+           i_mispredict => event_mispredict,
+           i_stall => event_stall,
+           i_cache_miss => event_cache_miss
+       );
 
-    control_unit: entity work.control_unit
+    load_store_unit: entity work.load_store_unit
+    generic map (
+           STORE_BUFFER_ENTRIES => STORE_BUFFER_ENTRIES,
+           LINE_WORDS => DCACHE_LINE_WORDS,
+           SETS => DCACHE_SETS
+       )
     port map (
            i_clock => i_clock,
            i_reset => i_reset,
-           o_active_phase => o_active_phase,
-        );
+           i_request => lsu_request,
+           i_store => lsu_store,
+           i_fun3 => lsu_fun3,
+           i_address => lsu_address,
+           i_data => lsu_store_data,
+           o_data => lsu_data,
+           o_ready => lsu_ready,
+           o_mem_request => o_data_mem_request,
+           o_mem_write => o_data_mem_write,
+           o_mem_address => o_data_mem_address,
+           o_mem_data => o_data_mem_data,
+           i_mem_valid => i_data_mem_valid,
+           i_mem_data => i_data_mem_data,
+           o_cache_miss => cache_miss,
+           o_cache_accesses => cache_accesses,
+           o_cache_misses => cache_misses,
+           o_cache_writebacks => cache_writebacks
+       );
+
+    expander: if PIPELINED and COMPRESSED generate
+        compressed_expander: entity work.compressed_expander
+        port map (
+               i_instruction => fetch_instruction,
+               o_instruction => instruction,
+               o_compressed => instruction_compressed
+           );
+    end generate;
+
+    no_expander: if not (PIPELINED and COMPRESSED) generate
+        instruction <= fetch_instruction;
+        instruction_compressed <= '0';
+    end generate;
+
+    alu_immediate <= ZERO(31 downto 20) & data_immediate(31 downto 12)
+                     when alu_op = OP_LUI or alu_op = OP_AUIPC else data_immediate;
+
+    is_muldiv <= '1' when alu_op = OP_REGREG and function7 = F7_OP_MULDIV else '0';
+    muldiv_stall <= muldiv_request and not muldiv_ready;
+    data_dest <= muldiv_result when muldiv_select = '1' else
+                 std_logic_vector(unsigned(alu_result) - 2) when compressed_link = '1' else
+                 alu_result;
+
+    o_data_result <= data_dest;
+
+    -- One instruction at a time, one phase of the control unit per cycle
+    sequential: if not PIPELINED generate
+        signal control_unit_reset : std_logic := '1';
+        signal pc_enable : std_logic := '0';
+        signal pc_op : std_logic_vector(1 downto 0);
+        signal next_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal take_branch: std_logic := '0';
+        signal is_csr : std_logic := '0';
+        signal is_load : std_logic := '0';
+        signal lsu_stall : std_logic := '0';
+        signal stall : std_logic := '0';
+    begin
+        pc: entity work.pc
+        port map (
+               i_clock => i_clock,
+               i_enable => pc_enable,
+               i_op_code => pc_op,
+               i_data => next_pc,
+               o_pc => program_counter
+            );
+
+        control_unit: entity work.control_unit
+        port map (
+               i_clock => i_clock,
+               i_reset => control_unit_reset,
+               i_stall => stall,
+               o_active_phase => active_phase
+            );
+
+        control_unit_reset <= i_reset or not i_enable;
+
+        o_instruction_address <= program_counter;
+        fetch_instruction <= i_instruction;
+        address_s1 <= instruction(R1_START downto R1_END);
+        address_s2 <= instruction(R2_START downto R2_END);
+        alu_s1 <= data_s1;
+        alu_s2 <= data_s2;
+
+        pc_enable <= '1' when active_phase = CU_RESET or active_phase = CU_FETCH
+                     or (active_phase = CU_PC and lsu_stall = '0') else '0';
+        pc_op <= PCU_OP_RESET when active_phase = CU_RESET else
+                 PCU_OP_ASSIGN when active_phase = CU_PC else
+                 PCU_OP_NOP;
+
+        decoder_enable <= '1' when active_phase = CU_DECODE else '0';
+        alu_enable <= '1' when active_phase = CU_EXECUTE else '0';
+        muldiv_request <= is_muldiv when active_phase = CU_EXECUTE else '0';
+        muldiv_select <= is_muldiv;
+        compressed_link <= '0';
+        register_file_enable <= '1' when active_phase = CU_DECODE
+                                or (active_phase = CU_PC and lsu_stall = '0') else '0';
+        register_file_write_enable <= should_write_result or is_csr or is_load
+                                      when active_phase = CU_PC and lsu_stall = '0' else '0';
+        write_dest <= address_dest;
+        write_data <= csr_data when is_csr = '1' else
+                      lsu_data when is_load = '1' else
+                      data_dest;
+
+        is_load <= '1' when alu_op = OP_LOAD else '0';
+        lsu_request <= '1' when (alu_op = OP_LOAD or alu_op = OP_STORE)
+                       and active_phase = CU_PC and i_enable = '1' else '0';
+        lsu_store <= '1' when alu_op = OP_STORE else '0';
+        lsu_fun3 <= function3;
+        lsu_address <= alu_result;
+        lsu_store_data <= data_s2;
+        lsu_stall <= lsu_request and not lsu_ready;
+        stall <= muldiv_stall or lsu_stall;
+
+        is_csr <= '1' when alu_op = OP_ENV and function3 /= F3_ENV_PRIV else '0';
+        csr_access <= is_csr when active_phase = CU_PC else '0';
+        csr_address <= data_immediate(11 downto 0);
+        csr_fun3 <= function3;
+        csr_source <= ZERO(31 downto 5) & address_s1 when function3(2) = '1' else data_s1;
+
+        take_branch <= should_branch when alu_op = OP_JAL or alu_op = OP_JALR
+                       or alu_op = OP_BRANCH else '0';
+        next_pc <= branch_target when take_branch = '1' else
+                   std_logic_vector(unsigned(program_counter) + 4);
+
+        retire_valid <= '1' when active_phase = CU_PC and lsu_stall = '0' else '0';
+        retire_pc <= program_counter;
+
+        event_retire <= retire_valid;
+        event_taken_branch <= take_branch when active_phase = CU_PC else '0';
+        event_mispredict <= '0';
+        event_stall <= stall;
+        event_cache_miss <= cache_miss;
+
+        o_instruction_mem_request <= '0';
+        o_instruction_mem_address <= (others => '0');
+    end generate;
+
+    -- Five stages, fetch, decode, execute, memory and write back
+    pipelined: if PIPELINED generate
+        signal fetch_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal fetch_next_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal fetch_half : std_logic_vector(15 downto 0) := (others => '0');
+        signal fetch_half_valid : std_logic := '0';
+        signal fetch_complete : std_logic := '1';
+        signal fetch_address : std_logic_vector(31 downto 0) := (others => '0');
+        signal fetch_word : std_logic_vector(31 downto 0) := (others => '0');
+        signal fetch_ready : std_logic := '0';
+
+        signal decode_valid : std_logic := '0';
+        signal decode_s1 : std_logic_vector(4 downto 0) := (others => '0');
+        signal decode_s2 : std_logic_vector(4 downto 0) := (others => '0');
+        signal decode_predicted : std_logic := '0';
+        signal decode_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal decode_compressed : std_logic := '0';
+
+        signal execute_valid : std_logic := '0';
+        signal execute_dest : std_logic_vector(4 downto 0) := (others => '0');
+        signal execute_op : std_logic_vector(6 downto 0) := (others => '0');
+        signal execute_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal execute_write : std_logic := '0';
+        signal execute_predicted : std_logic := '0';
+        signal execute_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal execute_fun3 : std_logic_vector(2 downto 0) := (others => '0');
+        signal execute_store_data : std_logic_vector(31 downto 0) := (others => '0');
+        signal execute_csr_address : std_logic_vector(11 downto 0) := (others => '0');
+        signal execute_csr_source : std_logic_vector(31 downto 0) := (others => '0');
+        signal execute_muldiv : std_logic := '0';
+        signal execute_compressed : std_logic := '0';
+        signal execute_late : std_logic := '0';
+
+        signal memory_valid : std_logic := '0';
+        signal memory_dest : std_logic_vector(4 downto 0) := (others => '0');
+        signal memory_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal memory_write : std_logic := '0';
+        signal memory_data : std_logic_vector(31 downto 0) := (others => '0');
+        signal memory_access : std_logic := '0';
+        signal memory_store : std_logic := '0';
+        signal memory_fun3 : std_logic_vector(2 downto 0) := (others => '0');
+        signal memory_store_data : std_logic_vector(31 downto 0) := (others => '0');
+        signal memory_csr : std_logic := '0';
+        signal memory_csr_address : std_logic_vector(11 downto 0) := (others => '0');
+        signal memory_csr_source : std_logic_vector(31 downto 0) := (others => '0');
+        signal memory_result : std_logic_vector(31 downto 0) := (others => '0');
+
+        signal writeback_valid : std_logic := '0';
+        signal writeback_dest : std_logic_vector(4 downto 0) := (others => '0');
+        signal writeback_pc : std_logic_vector(31 downto 0) := (others => '0');
+        signal writeback_write : std_logic := '0';
+        signal writeback_data : std_logic_vector(31 downto 0) := (others => '0');
+
+        signal predict_taken : std_logic := '0';
+        signal predicted_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal btb_taken : std_logic := '0';
+        signal btb_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal is_branch : std_logic := '0';
+        signal btb_update : std_logic := '0';
+        signal taken : std_logic := '0';
+        signal flush : std_logic := '0';
+        signal flush_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal resolved_taken : std_logic := '0';
+        signal resolved_target : std_logic_vector(31 downto 0) := (others => '0');
+        signal redirect : std_logic := '0';
+
+        signal memory_stall : std_logic := '0';
+        signal load_use : std_logic := '0';
+        signal decode_stall : std_logic := '0';
+
+        function in_flight(
+            reg : std_logic_vector(4 downto 0);
+            valid : std_logic;
+            write : std_logic;
+            dest : std_logic_vector(4 downto 0)
+        ) return boolean is
+        begin
+            return valid = '1' and write = '1' and dest = reg and unsigned(reg) /= 0;
+        end function;
+
+        function sequential_pc(
+            pc : std_logic_vector(31 downto 0);
+            compressed : std_logic
+        ) return std_logic_vector is
+        begin
+            if compressed = '1' then
+                return std_logic_vector(unsigned(pc) + 2);
+            end if;
+            return std_logic_vector(unsigned(pc) + 4);
+        end function;
+    begin
+        branch_predictor: entity work.branch_predictor
+        port map (
+               i_op_code => alu_op,
+               i_data_immediate => data_immediate,
+               i_program_counter => program_counter,
+               o_predict_taken => predict_taken,
+               o_predicted_target => predicted_target
+           );
+
+        branch_unit: entity work.branch_unit
+        port map (
+               i_op_code => alu_op,
+               i_fun3 => function3,
+               i_data_s1 => alu_s1,
+               i_data_s2 => alu_s2,
+               i_data_immediate => data_immediate,
+               i_program_counter => program_counter,
+               o_should_branch => resolved_taken,
+               o_branch_target => resolved_target
+           );
+
+        btb: if BTB_ENTRIES > 0 generate
+            branch_target_buffer: entity work.branch_target_buffer
+            generic map (ENTRIES => BTB_ENTRIES, COMPRESSED => COMPRESSED)
+            port map (
+                   i_clock => i_clock,
+                   i_enable => i_enable,
+                   i_reset => i_reset,
+                   i_fetch_pc => fetch_pc,
+                   o_predict_taken => btb_taken,
+                   o_predicted_target => btb_target,
+                   i_update => btb_update,
+                   i_update_pc => execute_pc,
+                   i_update_taken => taken,
+                   i_update_target => flush_target
+               );
+        end generate;
+
+        icache: if ICACHE_SETS > 0 generate
+            instruction_cache: entity work.instruction_cache
+            generic map (LINE_WORDS => ICACHE_LINE_WORDS, SETS => ICACHE_SETS, WAYS => ICACHE_WAYS)
+            port map (
+                   i_clock => i_clock,
+                   i_reset => i_reset,
+                   i_request => i_enable,
+                   i_address => fetch_address,
+                   o_instruction => fetch_word,
+                   o_ready => fetch_ready,
+                   o_mem_request => o_instruction_mem_request,
+                   o_mem_address => o_instruction_mem_address,
+                   i_mem_valid => i_instruction_mem_valid,
+                   i_mem_data => i_instruction_mem_data
+               );
+        end generate;
+
+        no_icache: if ICACHE_SETS = 0 generate
+            fetch_word <= i_instruction;
+            fetch_ready <= i_instruction_ready;
+            o_instruction_mem_request <= '0';
+            o_instruction_mem_address <= (others => '0');
+        end generate;
+
+        o_instruction_address <= fetch_address;
+
+        aligned_fetch: if COMPRESSED generate
+            fetch_address <= std_logic_vector(unsigned(fetch_pc(31 downto 2) & "00") + 4)
+                             when fetch_pc(1) = '1' and fetch_half_valid = '1' else
+                             fetch_pc(31 downto 2) & "00";
+            fetch_instruction <= fetch_word when fetch_pc(1) = '0' else
+                                 fetch_word(15 downto 0) & fetch_half when fetch_half_valid = '1' else
+                                 ZERO(15 downto 0) & fetch_word(31 downto 16);
+            fetch_complete <= '0' when fetch_pc(1) = '1' and fetch_half_valid = '0'
+                              and instruction_compressed = '0' else '1';
+        end generate;
+
+        word_fetch: if not COMPRESSED generate
+            fetch_address <= fetch_pc;
+            fetch_instruction <= fetch_word;
+            fetch_complete <= '1';
+        end generate;
+
+        fetch_next_pc <= sequential_pc(fetch_pc, instruction_compressed);
+
+        address_s1 <= decode_s1 when decode_stall = '1' else instruction(R1_START downto R1_END);
+        address_s2 <= decode_s2 when decode_stall = '1' else instruction(R2_START downto R2_END);
+
+        execute_write <= execute_valid and should_write_result;
+        execute_late <= '1' when execute_valid = '1' and (execute_op = OP_LOAD
+                        or (execute_op = OP_ENV and execute_fun3 /= F3_ENV_PRIV)) else '0';
+
+        lsu_request <= memory_valid and memory_access and i_enable;
+        lsu_store <= memory_store;
+        lsu_fun3 <= memory_fun3;
+        lsu_address <= memory_data;
+        lsu_store_data <= memory_store_data;
+        memory_stall <= lsu_request and not lsu_ready;
+        memory_result <= lsu_data when memory_access = '1' and memory_store = '0' else
+                         csr_data when memory_csr = '1' else
+                         memory_data;
+
+        csr_access <= memory_valid and memory_csr and not memory_stall;
+        csr_address <= memory_csr_address;
+        csr_fun3 <= memory_fun3;
+        csr_source <= memory_csr_source;
+
+        load_use <= '1' when decode_valid = '1' and (in_flight(decode_s1, execute_valid, execute_late, execute_dest)
+                    or in_flight(decode_s2, execute_valid, execute_late, execute_dest)) else '0';
+        muldiv_request <= decode_valid and is_muldiv and not load_use and not flush;
+        muldiv_select <= execute_muldiv;
+        compressed_link <= execute_compressed when execute_op = OP_JAL or execute_op = OP_JALR else '0';
+        decode_stall <= memory_stall or load_use or muldiv_stall;
+
+        alu_s1 <= data_dest when in_flight(decode_s1, execute_valid, execute_write, execute_dest) else
+                  memory_result when in_flight(decode_s1, memory_valid, memory_write, memory_dest) else
+                  writeback_data when in_flight(decode_s1, writeback_valid, writeback_write, writeback_dest) else
+                  data_s1;
+        alu_s2 <= data_dest when in_flight(decode_s2, execute_valid, execute_write, execute_dest) else
+                  memory_result when in_flight(decode_s2, memory_valid, memory_write, memory_dest) else
+                  writeback_data when in_flight(decode_s2, writeback_valid, writeback_write, writeback_dest) else
+                  data_s2;
+
+        is_branch <= '1' when execute_op = OP_JAL or execute_op = OP_JALR
+                     or execute_op = OP_BRANCH else '0';
+        btb_update <= execute_valid and is_branch and not memory_stall;
+        taken <= execute_predicted when RESOLVE_IN_DECODE else should_branch and is_branch;
+        flush <= '1' when not RESOLVE_IN_DECODE and execute_valid = '1' and (taken /= execute_predicted
+                 or (taken = '1' and branch_target /= execute_target)) else '0';
+        flush_target <= execute_target when RESOLVE_IN_DECODE and taken = '1' else
+                        branch_target when taken = '1' else
+                        sequential_pc(execute_pc, execute_compressed);
+
+        redirect <= '1' when RESOLVE_IN_DECODE and decode_valid = '1' and load_use = '0'
+                    and (resolved_taken /= decode_predicted
+                         or (resolved_taken = '1' and resolved_target /= decode_target)) else '0';
+
+        decoder_enable <= i_enable and not decode_stall;
+        alu_enable <= i_enable and not memory_stall;
+        register_file_enable <= i_enable;
+        register_file_write_enable <= writeback_valid and writeback_write;
+        write_dest <= writeback_dest;
+        write_data <= writeback_data;
+
+        retire_valid <= writeback_valid;
+        retire_pc <= writeback_pc;
+
+        event_retire <= memory_valid and not memory_stall;
+        event_taken_branch <= btb_update and taken;
+        event_mispredict <= (flush or redirect) and not memory_stall;
+        event_stall <= decode_stall;
+        event_cache_miss <= cache_miss;
 
         process (i_clock)
-            begin
+        begin
+            if rising_edge(i_clock) and i_enable = '1' then
+                if memory_stall = '1' then
+                    writeback_valid <= '0';
+                else
+                    -- write back
+                    writeback_valid <= memory_valid;
+                    writeback_dest <= memory_dest;
+                    writeback_pc <= memory_pc;
+                    writeback_write <= memory_write;
+                    writeback_data <= memory_result;
+
+                    -- memory
+                    memory_valid <= execute_valid;
+                    memory_dest <= execute_dest;
+                    memory_pc <= execute_pc;
+                    memory_write <= execute_write or execute_late;
+                    memory_data <= data_dest;
+                    memory_access <= '0';
+                    if execute_op = OP_LOAD or execute_op = OP_STORE then
+                        memory_access <= '1';
+                    end if;
+                    memory_store <= '0';
+                    if execute_op = OP_STORE then
+                        memory_store <= '1';
+                    end if;
+                    memory_fun3 <= execute_fun3;
+                    memory_store_data <= execute_store_data;
+                    memory_csr <= '0';
+                    if execute_op = OP_ENV and execute_fun3 /= F3_ENV_PRIV then
+                        memory_csr <= '1';
+                    end if;
+                    memory_csr_address <= execute_csr_address;
+                    memory_csr_source <= execute_csr_source;
+
+                    -- execute
+                    execute_valid <= decode_valid and not flush and not load_use and not muldiv_stall;
+                    execute_dest <= address_dest;
+                    execute_op <= alu_op;
+                    execute_pc <= program_counter;
+                    execute_predicted <= decode_predicted;
+                    execute_target <= decode_target;
+                    execute_fun3 <= function3;
+                    execute_muldiv <= is_muldiv;
+                    execute_compressed <= decode_compressed;
+                    execute_store_data <= alu_s2;
+                    execute_csr_address <= data_immediate(11 downto 0);
+                    if function3(2) = '1' then
+                        execute_csr_source <= ZERO(31 downto 5) & decode_s1;
+                    else
+                        execute_csr_source <= alu_s1;
+                    end if;
+
+                    -- fetch and decode
+                    if flush = '1' then
+                        decode_valid <= '0';
+                        fetch_pc <= flush_target;
+                        fetch_half_valid <= '0';
+                    elsif load_use = '1' or muldiv_stall = '1' then
+                        null;
+                    elsif redirect = '1' then
+                        execute_predicted <= resolved_taken;
+                        execute_target <= resolved_target;
+                        decode_valid <= '0';
+                        fetch_half_valid <= '0';
+                        if resolved_taken = '1' then
+                            fetch_pc <= resolved_target;
+                        else
+                            fetch_pc <= sequential_pc(program_counter, decode_compressed);
+                        end if;
+                    elsif STATIC_PREDICTION and not RESOLVE_IN_DECODE and decode_valid = '1'
+                            and decode_predicted = '0' and predict_taken = '1' then
+                        execute_predicted <= '1';
+                        execute_target <= predicted_target;
+                        decode_valid <= '0';
+                        fetch_pc <= predicted_target;
+                        fetch_half_valid <= '0';
+                    elsif fetch_ready = '0' or fetch_complete = '0' then
+                        decode_valid <= '0';
+                        if fetch_ready = '1' then
+                            fetch_half <= fetch_word(31 downto 16);
+                            fetch_half_valid <= '1';
+                        end if;
+                    else
+                        decode_valid <= '1';
+                        decode_s1 <= instruction(R1_START downto R1_END);
+                        decode_s2 <= instruction(R2_START downto R2_END);
+                        decode_predicted <= btb_taken;
+                        decode_target <= btb_target;
+                        decode_compressed <= instruction_compressed;
+                        program_counter <= fetch_pc;
+                        fetch_half <= fetch_word(31 downto 16);
+                        fetch_half_valid <= fetch_pc(1) xor instruction_compressed;
+                        if btb_taken = '1' then
+                            fetch_pc <= btb_target;
+                            fetch_half_valid <= '0';
+                        else
+                            fetch_pc <= fetch_next_pc;
+                        end if;
+                    end if;
+                end if;
+
+                if i_reset = '1' then
+                    decode_valid <= '0';
+                    execute_valid <= '0';
+                    memory_valid <= '0';
+                    writeback_valid <= '0';
+                    fetch_pc <= (others => '0');
+                    fetch_half_valid <= '0';
+                end if;
+            end if;
         end process;
+    end generate;
 end behavioral;
@@ -0,0 +1,102 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Zicntr and hardware performance counters, 64 bit each
+entity csr_unit is
+    generic ( TIME_DIVIDER : positive := 1 );
+    port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
+           i_enable : in  std_logic;
+           i_access : in std_logic;
+           i_address : in std_logic_vector(11 downto 0);
+           i_fun3 : in std_logic_vector(2 downto 0);
+           i_source : in std_logic_vector(31 downto 0);
+           o_data : out std_logic_vector(31 downto 0);
+           i_retire : in std_logic;
+           i_taken_branch : in std_logic;
+           i_mispredict : in std_logic;
+           i_stall : in std_logic;
+           i_cache_miss : in std_logic
+       );
+end csr_unit;
+
+architecture behavioral of csr_unit is
+    constant COUNTERS : positive := CSR_HPM_CACHE_MISSES + 1;
+
+    type counters_t is array (0 to COUNTERS - 1) of unsigned(63 downto 0);
+
+    signal counters : counters_t := (others => (others => '0'));
+    signal events : std_logic_vector(0 to COUNTERS - 1);
+    signal tick : natural range 0 to TIME_DIVIDER - 1 := 0;
+    signal time_event : std_logic := '0';
+
+    signal index : natural range 0 to 31;
+    signal known : std_logic := '0';
+    signal writable : std_logic := '0';
+    signal current : std_logic_vector(31 downto 0);
+    signal written : std_logic_vector(31 downto 0);
+    signal modify : std_logic := '0';
+begin
+    time_event <= '1' when tick = TIME_DIVIDER - 1 else '0';
+    events <= '1' & time_event & i_retire & i_taken_branch & i_mispredict & i_stall & i_cache_miss;
+
+    index <= to_integer(unsigned(i_address(4 downto 0)));
+    known <= '1' when i_address(6 downto 5) = "00" and index < COUNTERS
+             and (i_address(11 downto 8) = CSR_BANK_COUNTERS
+                  or (i_address(11 downto 8) = CSR_BANK_MCOUNTERS and index /= CSR_TIME)) else '0';
+    writable <= known when i_address(11 downto 8) = CSR_BANK_MCOUNTERS else '0';
+
+    process (known, index, i_address, counters)
+    begin
+        current <= ZERO;
+        if known = '1' then
+            if i_address(7) = '1' then
+                current <= std_logic_vector(counters(index)(63 downto 32));
+            else
+                current <= std_logic_vector(counters(index)(31 downto 0));
+            end if;
+        end if;
+    end process;
+
+    o_data <= current;
+
+    with i_fun3(1 downto 0) select written <=
+        i_source when "01",
+        current or i_source when "10",
+        current and not i_source when "11",
+        current when others;
+
+    modify <= '1' when i_access = '1' and writable = '1'
+              and (i_fun3(1 downto 0) = "01" or i_source /= ZERO) else '0';
+
+    process (i_clock)
+    begin
+        if rising_edge(i_clock) then
+            if i_reset = '1' then
+                counters <= (others => (others => '0'));
+                tick <= 0;
+            elsif i_enable = '1' then
+                if time_event = '1' then
+                    tick <= 0;
+                else
+                    tick <= tick + 1;
+                end if;
+                for counter in 0 to COUNTERS - 1 loop
+                    if events(counter) = '1' then
+                        counters(counter) <= counters(counter) + 1;
+                    end if;
+                end loop;
+                if modify = '1' then
+                    if i_address(7) = '1' then
+                        counters(index)(63 downto 32) <= unsigned(written);
+                    else
+                        counters(index)(31 downto 0) <= unsigned(written);
+                    end if;
+                end if;
+            end if;
+        end if;
+    end process;
+end behavioral;
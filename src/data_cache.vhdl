@@ -0,0 +1,159 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Direct mapped write back data cache with burst refill
+entity data_cache is
+    generic ( LINE_WORDS : positive := 4;
+              SETS : positive := 16 );
+    port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
+           i_request : in std_logic;
+           i_write : in std_logic;
+           i_byte_enable : in std_logic_vector(3 downto 0);
+           i_address : in std_logic_vector(31 downto 0);
+           i_data : in std_logic_vector(31 downto 0);
+           o_data : out std_logic_vector(31 downto 0);
+           o_ready : out std_logic;
+           o_mem_request : out std_logic;
+           o_mem_write : out std_logic;
+           o_mem_address : out std_logic_vector(31 downto 0);
+           o_mem_data : out std_logic_vector(31 downto 0);
+           i_mem_valid : in std_logic;
+           i_mem_data : in std_logic_vector(31 downto 0);
+           o_miss : out std_logic;
+           o_accesses : out std_logic_vector(31 downto 0);
+           o_misses : out std_logic_vector(31 downto 0);
+           o_writebacks : out std_logic_vector(31 downto 0)
+       );
+end data_cache;
+
+architecture behavioral of data_cache is
+    constant OFFSET_BITS : natural := log2(LINE_WORDS);
+    constant INDEX_BITS : natural := log2(SETS);
+    constant WORDS : positive := 2**OFFSET_BITS;
+    constant LINES : positive := 2**INDEX_BITS;
+
+    subtype tag_t is std_logic_vector(31 downto 2 + OFFSET_BITS + INDEX_BITS);
+    type tags_t is array (0 to LINES - 1) of tag_t;
+    type data_t is array (0 to LINES * WORDS - 1) of std_logic_vector(31 downto 0);
+    type state_t is (IDLE, WRITEBACK, REFILL);
+
+    signal valid : std_logic_vector(0 to LINES - 1) := (others => '0');
+    signal dirty : std_logic_vector(0 to LINES - 1) := (others => '0');
+    signal tags : tags_t := (others => (others => '0'));
+    signal data : data_t := (others => (others => '0'));
+
+    signal line : natural range 0 to LINES - 1;
+    signal word : natural range 0 to WORDS - 1;
+    signal hit : std_logic := '0';
+
+    signal state : state_t := IDLE;
+    signal burst_word : natural range 0 to WORDS - 1;
+    signal refill_address : std_logic_vector(31 downto 0) := (others => '0');
+    signal writeback_address : std_logic_vector(31 downto 0) := (others => '0');
+
+    signal accesses : unsigned(31 downto 0) := (others => '0');
+    signal misses : unsigned(31 downto 0) := (others => '0');
+    signal writebacks : unsigned(31 downto 0) := (others => '0');
+
+    function field(
+        address : std_logic_vector(31 downto 0);
+        low : natural;
+        bits : natural
+    ) return natural is
+    begin
+        if bits = 0 then
+            return 0;
+        end if;
+        return to_integer(unsigned(address(low + bits - 1 downto low)));
+    end function;
+begin
+    line <= field(i_address, 2 + OFFSET_BITS, INDEX_BITS);
+    word <= field(i_address, 2, OFFSET_BITS);
+    hit <= '1' when state = IDLE and valid(line) = '1' and tags(line) = i_address(tag_t'range) else '0';
+
+    o_ready <= hit;
+    o_miss <= '1' when state = IDLE and i_request = '1' and hit = '0' else '0';
+    o_data <= data(line * WORDS + word);
+
+    o_mem_request <= '0' when state = IDLE else '1';
+    o_mem_write <= '1' when state = WRITEBACK else '0';
+    o_mem_address <= writeback_address when state = WRITEBACK else refill_address;
+    o_mem_data <= data(field(refill_address, 2 + OFFSET_BITS, INDEX_BITS) * WORDS + burst_word);
+
+    o_accesses <= std_logic_vector(accesses);
+    o_misses <= std_logic_vector(misses);
+    o_writebacks <= std_logic_vector(writebacks);
+
+    process (i_clock)
+        variable index : natural range 0 to LINES * WORDS - 1;
+    begin
+        if rising_edge(i_clock) then
+            if i_reset = '1' then
+                valid <= (others => '0');
+                dirty <= (others => '0');
+                state <= IDLE;
+                accesses <= (others => '0');
+                misses <= (others => '0');
+                writebacks <= (others => '0');
+            else
+                case state is
+                when IDLE =>
+                    if i_request = '1' and hit = '1' then
+                        accesses <= accesses + 1;
+                        if i_write = '1' then
+                            index := line * WORDS + word;
+                            for byte in 0 to 3 loop
+                                if i_byte_enable(byte) = '1' then
+                                    data(index)(8*byte + 7 downto 8*byte) <= i_data(8*byte + 7 downto 8*byte);
+                                end if;
+                            end loop;
+                            dirty(line) <= '1';
+                        end if;
+                    elsif i_request = '1' then
+                        misses <= misses + 1;
+                        burst_word <= 0;
+                        refill_address <= i_address(31 downto 2 + OFFSET_BITS) & ZERO(1 + OFFSET_BITS downto 0);
+                        writeback_address <= tags(line) & i_address(1 + OFFSET_BITS + INDEX_BITS downto 2 + OFFSET_BITS)
+                                             & ZERO(1 + OFFSET_BITS downto 0);
+                        if valid(line) = '1' and dirty(line) = '1' then
+                            writebacks <= writebacks + 1;
+                            state <= WRITEBACK;
+                        else
+                            state <= REFILL;
+                        end if;
+                        valid(line) <= '0';
+                    end if;
+
+                when WRITEBACK =>
+                    if i_mem_valid = '1' then
+                        if burst_word = WORDS - 1 then
+                            burst_word <= 0;
+                            state <= REFILL;
+                        else
+                            burst_word <= burst_word + 1;
+                        end if;
+                    end if;
+
+                when REFILL =>
+                    if i_mem_valid = '1' then
+                        index := field(refill_address, 2 + OFFSET_BITS, INDEX_BITS) * WORDS + burst_word;
+                        data(index) <= i_mem_data;
+                        if burst_word = WORDS - 1 then
+                            index := field(refill_address, 2 + OFFSET_BITS, INDEX_BITS);
+                            valid(index) <= '1';
+                            dirty(index) <= '0';
+                            tags(index) <= refill_address(tag_t'range);
+                            state <= IDLE;
+                        else
+                            burst_word <= burst_word + 1;
+                        end if;
+                    end if;
+                end case;
+            end if;
+        end if;
+    end process;
+end behavioral;
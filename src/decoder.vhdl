@@ -47,7 +47,7 @@ begin
                                   i_data_instruction(30 downto 21) &
                                   ZERO(0);
 
-                when OP_JALR | OP_LOAD => 
+                when OP_JALR | OP_LOAD | OP_ENV => 
                     o_data_imm <= ZERO(31 downto 12) &
                                   i_data_instruction(31 downto 20);
 
@@ -0,0 +1,131 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Read only instruction cache with burst refill
+entity instruction_cache is
+    generic ( LINE_WORDS : positive := 4;
+              SETS : positive := 16;
+              WAYS : positive := 1 );
+    port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
+           i_request : in std_logic;
+           i_address : in std_logic_vector(31 downto 0);
+           o_instruction : out std_logic_vector(31 downto 0);
+           o_ready : out std_logic;
+           o_mem_request : out std_logic;
+           o_mem_address : out std_logic_vector(31 downto 0);
+           i_mem_valid : in std_logic;
+           i_mem_data : in std_logic_vector(31 downto 0)
+       );
+end instruction_cache;
+
+architecture behavioral of instruction_cache is
+    constant OFFSET_BITS : natural := log2(LINE_WORDS);
+    constant INDEX_BITS : natural := log2(SETS);
+    constant WORDS : positive := 2**OFFSET_BITS;
+    constant LINES : positive := WAYS * 2**INDEX_BITS;
+
+    subtype tag_t is std_logic_vector(31 downto 2 + OFFSET_BITS + INDEX_BITS);
+    type tags_t is array (0 to LINES - 1) of tag_t;
+    type data_t is array (0 to LINES * WORDS - 1) of std_logic_vector(31 downto 0);
+
+    signal valid : std_logic_vector(0 to LINES - 1) := (others => '0');
+    signal tags : tags_t := (others => (others => '0'));
+    signal data : data_t := (others => (others => '0'));
+    signal lru : std_logic_vector(0 to 2**INDEX_BITS - 1) := (others => '0');
+
+    signal set : natural range 0 to 2**INDEX_BITS - 1;
+    signal word : natural range 0 to WORDS - 1;
+    signal hit : std_logic := '0';
+    signal hit_line : natural range 0 to LINES - 1;
+
+    signal refill : std_logic := '0';
+    signal refill_line : natural range 0 to LINES - 1;
+    signal refill_word : natural range 0 to WORDS - 1;
+    signal refill_tag : tag_t := (others => '0');
+    signal refill_address : std_logic_vector(31 downto 0) := (others => '0');
+
+    function field(
+        address : std_logic_vector(31 downto 0);
+        low : natural;
+        bits : natural
+    ) return natural is
+    begin
+        if bits = 0 then
+            return 0;
+        end if;
+        return to_integer(unsigned(address(low + bits - 1 downto low)));
+    end function;
+begin
+    assert WAYS = 1 or WAYS = 2 report "instruction_cache supports 1 or 2 ways" severity failure;
+
+    set <= field(i_address, 2 + OFFSET_BITS, INDEX_BITS);
+    word <= field(i_address, 2, OFFSET_BITS);
+
+    process (set, i_address, valid, tags)
+    begin
+        hit <= '0';
+        hit_line <= set;
+        for way in 0 to WAYS - 1 loop
+            if valid(way * 2**INDEX_BITS + set) = '1'
+                    and tags(way * 2**INDEX_BITS + set) = i_address(tag_t'range) then
+                hit <= '1';
+                hit_line <= way * 2**INDEX_BITS + set;
+            end if;
+        end loop;
+    end process;
+
+    o_ready <= hit;
+    o_instruction <= data(hit_line * WORDS + word);
+    o_mem_request <= refill;
+    o_mem_address <= refill_address;
+
+    process (i_clock)
+        variable victim : natural range 0 to LINES - 1;
+    begin
+        if rising_edge(i_clock) then
+            if i_reset = '1' then
+                valid <= (others => '0');
+                refill <= '0';
+            elsif refill = '0' then
+                if hit = '1' and i_request = '1' and WAYS > 1 then
+                    if hit_line = set then
+                        lru(set) <= '1';
+                    else
+                        lru(set) <= '0';
+                    end if;
+                elsif hit = '0' and i_request = '1' then
+                    victim := set;
+                    if WAYS > 1 and lru(set) = '1' then
+                        victim := 2**INDEX_BITS + set;
+                    end if;
+                    valid(victim) <= '0';
+                    refill <= '1';
+                    refill_line <= victim;
+                    refill_word <= 0;
+                    refill_tag <= i_address(tag_t'range);
+                    refill_address <= i_address(31 downto 2 + OFFSET_BITS) & ZERO(1 + OFFSET_BITS downto 0);
+                end if;
+            elsif i_mem_valid = '1' then
+                data(refill_line * WORDS + refill_word) <= i_mem_data;
+                if refill_word = WORDS - 1 then
+                    refill <= '0';
+                    valid(refill_line) <= '1';
+                    tags(refill_line) <= refill_tag;
+                    if WAYS > 1 then
+                        if refill_line < 2**INDEX_BITS then
+                            lru(refill_line mod 2**INDEX_BITS) <= '1';
+                        else
+                            lru(refill_line mod 2**INDEX_BITS) <= '0';
+                        end if;
+                    end if;
+                else
+                    refill_word <= refill_word + 1;
+                end if;
+            end if;
+        end if;
+    end process;
+end behavioral;
@@ -0,0 +1,181 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Byte, half word and word accesses with a store buffer in front of the data cache
+entity load_store_unit is
+    generic ( STORE_BUFFER_ENTRIES : positive := 4;
+              LINE_WORDS : positive := 4;
+              SETS : positive := 16 );
+    port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
+           i_request : in std_logic;
+           i_store : in std_logic;
+           i_fun3 : in std_logic_vector(2 downto 0);
+           i_address : in std_logic_vector(31 downto 0);
+           i_data : in std_logic_vector(31 downto 0);
+           o_data : out std_logic_vector(31 downto 0);
+           o_ready : out std_logic;
+           o_mem_request : out std_logic;
+           o_mem_write : out std_logic;
+           o_mem_address : out std_logic_vector(31 downto 0);
+           o_mem_data : out std_logic_vector(31 downto 0);
+           i_mem_valid : in std_logic;
+           i_mem_data : in std_logic_vector(31 downto 0);
+           o_cache_miss : out std_logic;
+           o_cache_accesses : out std_logic_vector(31 downto 0);
+           o_cache_misses : out std_logic_vector(31 downto 0);
+           o_cache_writebacks : out std_logic_vector(31 downto 0)
+       );
+end load_store_unit;
+
+architecture behavioral of load_store_unit is
+    subtype word_address_t is std_logic_vector(31 downto 2);
+    type addresses_t is array (0 to STORE_BUFFER_ENTRIES - 1) of word_address_t;
+    type words_t is array (0 to STORE_BUFFER_ENTRIES - 1) of std_logic_vector(31 downto 0);
+    type enables_t is array (0 to STORE_BUFFER_ENTRIES - 1) of std_logic_vector(3 downto 0);
+
+    signal buffer_addresses : addresses_t := (others => (others => '0'));
+    signal buffer_data : words_t := (others => (others => '0'));
+    signal buffer_enables : enables_t := (others => (others => '0'));
+    signal head : natural range 0 to STORE_BUFFER_ENTRIES - 1 := 0;
+    signal tail : natural range 0 to STORE_BUFFER_ENTRIES - 1 := 0;
+    signal count : natural range 0 to STORE_BUFFER_ENTRIES := 0;
+
+    signal byte_enable : std_logic_vector(3 downto 0);
+    signal store_data : std_logic_vector(31 downto 0);
+    signal load_data : std_logic_vector(31 downto 0);
+    signal pending : std_logic := '0';
+    signal load : std_logic := '0';
+    signal push : std_logic := '0';
+    signal pop : std_logic := '0';
+
+    signal cache_request : std_logic := '0';
+    signal cache_write : std_logic := '0';
+    signal cache_byte_enable : std_logic_vector(3 downto 0);
+    signal cache_address : std_logic_vector(31 downto 0);
+    signal cache_data : std_logic_vector(31 downto 0);
+    signal cache_ready : std_logic := '0';
+
+    function next_entry(entry : natural) return natural is
+    begin
+        if entry = STORE_BUFFER_ENTRIES - 1 then
+            return 0;
+        end if;
+        return entry + 1;
+    end function;
+begin
+    data_cache: entity work.data_cache
+    generic map (LINE_WORDS => LINE_WORDS, SETS => SETS)
+    port map (
+           i_clock => i_clock,
+           i_reset => i_reset,
+           i_request => cache_request,
+           i_write => cache_write,
+           i_byte_enable => cache_byte_enable,
+           i_address => cache_address,
+           i_data => cache_data,
+           o_data => load_data,
+           o_ready => cache_ready,
+           o_mem_request => o_mem_request,
+           o_mem_write => o_mem_write,
+           o_mem_address => o_mem_address,
+           o_mem_data => o_mem_data,
+           i_mem_valid => i_mem_valid,
+           i_mem_data => i_mem_data,
+           o_miss => o_cache_miss,
+           o_accesses => o_cache_accesses,
+           o_misses => o_cache_misses,
+           o_writebacks => o_cache_writebacks
+       );
+
+    process (i_fun3, i_address, i_data)
+        variable offset : natural range 0 to 3;
+    begin
+        offset := to_integer(unsigned(i_address(1 downto 0)));
+        case i_fun3(1 downto 0) is
+            when F2_MEM_LS_SIZE_B =>
+                byte_enable <= std_logic_vector(shift_left(to_unsigned(1, 4), offset));
+                store_data <= i_data(7 downto 0) & i_data(7 downto 0) & i_data(7 downto 0) & i_data(7 downto 0);
+            when F2_MEM_LS_SIZE_H =>
+                byte_enable <= std_logic_vector(shift_left(to_unsigned(3, 4), offset - offset mod 2));
+                store_data <= i_data(15 downto 0) & i_data(15 downto 0);
+            when others =>
+                byte_enable <= "1111";
+                store_data <= i_data;
+        end case;
+    end process;
+
+    process (i_fun3, i_address, load_data)
+        variable byte : std_logic_vector(7 downto 0);
+        variable half : std_logic_vector(15 downto 0);
+    begin
+        byte := load_data(8*to_integer(unsigned(i_address(1 downto 0))) + 7 downto
+                          8*to_integer(unsigned(i_address(1 downto 0))));
+        if i_address(1) = '1' then
+            half := load_data(31 downto 16);
+        else
+            half := load_data(15 downto 0);
+        end if;
+        case i_fun3 is
+            when F3_LOAD_LB => o_data <= std_logic_vector(resize(signed(byte), 32));
+            when F3_LOAD_LH => o_data <= std_logic_vector(resize(signed(half), 32));
+            when F3_LOAD_LBU => o_data <= std_logic_vector(resize(unsigned(byte), 32));
+            when F3_LOAD_LHU => o_data <= std_logic_vector(resize(unsigned(half), 32));
+            when others => o_data <= load_data;
+        end case;
+    end process;
+
+    process (i_address, buffer_addresses, head, count)
+        variable entry : natural range 0 to STORE_BUFFER_ENTRIES - 1;
+    begin
+        pending <= '0';
+        entry := head;
+        for i in 0 to STORE_BUFFER_ENTRIES - 1 loop
+            if i < count and buffer_addresses(entry) = i_address(31 downto 2) then
+                pending <= '1';
+            end if;
+            entry := next_entry(entry);
+        end loop;
+    end process;
+
+    load <= i_request and not i_store and not pending;
+    push <= '1' when i_request = '1' and i_store = '1' and count < STORE_BUFFER_ENTRIES else '0';
+    pop <= '1' when load = '0' and count > 0 and cache_ready = '1' else '0';
+
+    cache_request <= '1' when load = '1' or count > 0 else '0';
+    cache_write <= not load;
+    cache_address <= i_address when load = '1' else buffer_addresses(head) & "00";
+    cache_byte_enable <= buffer_enables(head);
+    cache_data <= buffer_data(head);
+
+    o_ready <= push or (load and cache_ready);
+
+    process (i_clock)
+    begin
+        if rising_edge(i_clock) then
+            if i_reset = '1' then
+                head <= 0;
+                tail <= 0;
+                count <= 0;
+            else
+                if push = '1' then
+                    buffer_addresses(tail) <= i_address(31 downto 2);
+                    buffer_enables(tail) <= byte_enable;
+                    buffer_data(tail) <= store_data;
+                    tail <= next_entry(tail);
+                end if;
+                if pop = '1' then
+                    head <= next_entry(head);
+                end if;
+                if push = '1' and pop = '0' then
+                    count <= count + 1;
+                elsif push = '0' and pop = '1' then
+                    count <= count - 1;
+                end if;
+            end if;
+        end if;
+    end process;
+end behavioral;
@@ -0,0 +1,164 @@
+library ieee;
+library work;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+use work.constants.all;
+
+-- Multiplications and divisions of the M extension
+entity multiply_divide_unit is
+    generic ( SINGLE_CYCLE_DIVIDE : boolean := false );
+    port ( i_clock : in  std_logic;
+           i_reset : in  std_logic;
+           i_enable : in  std_logic;
+           i_request : in std_logic;
+           i_fun3 : in std_logic_vector(2 downto 0);
+           i_data_s1 : in std_logic_vector(31 downto 0);
+           i_data_s2 : in std_logic_vector(31 downto 0);
+           o_ready : out std_logic;
+           o_data_result : out std_logic_vector(31 downto 0)
+       );
+end multiply_divide_unit;
+
+architecture behavioral of multiply_divide_unit is
+    type state_t is (IDLE, DIVIDE, DONE);
+
+    function negate(value : unsigned(31 downto 0); condition : std_logic)
+    return unsigned is
+    begin
+        if condition = '1' then
+            return (not value) + 1;
+        end if;
+        return value;
+    end function;
+
+    signal multiplicand : signed(32 downto 0);
+    signal multiplier : signed(32 downto 0);
+    signal product : signed(65 downto 0);
+    signal multiply_result : std_logic_vector(31 downto 0);
+
+    signal signed_divide : std_logic := '0';
+    signal dividend_negative : std_logic := '0';
+    signal divisor_zero : std_logic := '0';
+    signal dividend_magnitude : unsigned(31 downto 0);
+    signal divisor_magnitude : unsigned(31 downto 0);
+    signal negate_quotient : std_logic := '0';
+    signal divide_result : std_logic_vector(31 downto 0);
+    signal ready : std_logic := '0';
+begin
+    multiplicand <= signed(i_data_s1(31) & i_data_s1)
+                    when i_fun3 = F3_MULDIV_MULH or i_fun3 = F3_MULDIV_MULHSU else
+                    signed('0' & i_data_s1);
+    multiplier <= signed(i_data_s2(31) & i_data_s2) when i_fun3 = F3_MULDIV_MULH else
+                  signed('0' & i_data_s2);
+    product <= multiplicand * multiplier;
+    multiply_result <= std_logic_vector(product(31 downto 0)) when i_fun3 = F3_MULDIV_MUL else
+                       std_logic_vector(product(63 downto 32));
+
+    signed_divide <= not i_fun3(0);
+    dividend_negative <= signed_divide and i_data_s1(31);
+    divisor_zero <= '1' when i_data_s2 = ZERO else '0';
+    dividend_magnitude <= negate(unsigned(i_data_s1), dividend_negative);
+    divisor_magnitude <= negate(unsigned(i_data_s2), signed_divide and i_data_s2(31));
+    negate_quotient <= signed_divide and (i_data_s1(31) xor i_data_s2(31)) and not divisor_zero;
+
+    o_ready <= ready;
+
+    single_cycle: if SINGLE_CYCLE_DIVIDE generate
+        signal quotient : unsigned(31 downto 0);
+        signal remainder : unsigned(31 downto 0);
+    begin
+        quotient <= (others => '1') when divisor_zero = '1' else
+                    dividend_magnitude / divisor_magnitude;
+        remainder <= dividend_magnitude when divisor_zero = '1' else
+                     dividend_magnitude rem divisor_magnitude;
+        divide_result <= std_logic_vector(negate(remainder, dividend_negative)) when i_fun3(1) = '1' else
+                         std_logic_vector(negate(quotient, negate_quotient));
+        ready <= '1';
+    end generate;
+
+    iterative: if not SINGLE_CYCLE_DIVIDE generate
+        signal state : state_t := IDLE;
+        signal step : natural range 0 to 15 := 0;
+        signal quotient : unsigned(31 downto 0) := (others => '0');
+        signal remainder : unsigned(31 downto 0) := (others => '0');
+        signal divisor : unsigned(31 downto 0) := (others => '0');
+        signal want_remainder : std_logic := '0';
+        signal remainder_negative : std_logic := '0';
+        signal quotient_negative : std_logic := '0';
+        signal negate_result : std_logic := '0';
+        signal partial : unsigned(33 downto 0);
+        signal divisor_1 : unsigned(33 downto 0);
+        signal divisor_2 : unsigned(33 downto 0);
+        signal divisor_3 : unsigned(33 downto 0);
+        signal next_remainder : unsigned(33 downto 0);
+        signal digit : unsigned(1 downto 0);
+    begin
+        partial <= remainder & quotient(31 downto 30);
+        divisor_1 <= "00" & divisor;
+        divisor_2 <= '0' & divisor & '0';
+        divisor_3 <= divisor_1 + divisor_2;
+        digit <= "11" when partial >= divisor_3 else
+                 "10" when partial >= divisor_2 else
+                 "01" when partial >= divisor_1 else
+                 "00";
+        with digit select next_remainder <=
+            partial - divisor_3 when "11",
+            partial - divisor_2 when "10",
+            partial - divisor_1 when "01",
+            partial when others;
+
+        negate_result <= remainder_negative when want_remainder = '1' else quotient_negative;
+        divide_result <= std_logic_vector(negate(remainder, negate_result)) when want_remainder = '1' else
+                         std_logic_vector(negate(quotient, negate_result));
+        ready <= '1' when i_fun3(2) = '0' or state = DONE else '0';
+
+        process (i_clock)
+        begin
+            if rising_edge(i_clock) then
+                if i_reset = '1' then
+                    state <= IDLE;
+                elsif i_enable = '1' then
+                    case state is
+                        when IDLE =>
+                            if i_request = '1' and ready = '0' then
+                                quotient <= dividend_magnitude;
+                                remainder <= (others => '0');
+                                divisor <= divisor_magnitude;
+                                want_remainder <= i_fun3(1);
+                                remainder_negative <= dividend_negative;
+                                quotient_negative <= negate_quotient;
+                                step <= 0;
+                                state <= DIVIDE;
+                            end if;
+                        when DIVIDE =>
+                            quotient <= quotient(29 downto 0) & digit;
+                            remainder <= next_remainder(31 downto 0);
+                            if step = 15 then
+                                state <= DONE;
+                            else
+                                step <= step + 1;
+                            end if;
+                            if i_request = '0' then
+                                state <= IDLE;
+                            end if;
+                        when DONE =>
+                            state <= IDLE;
+                    end case;
+                end if;
+            end if;
+        end process;
+    end generate;
+
+    process (i_clock)
+    begin
+        if rising_edge(i_clock) and i_enable = '1' then
+            if i_request = '1' and ready = '1' then
+                if i_fun3(2) = '0' then
+                    o_data_result <= multiply_result;
+                else
+                    o_data_result <= divide_result;
+                end if;
+            end if;
+        end if;
+    end process;
+end behavioral;
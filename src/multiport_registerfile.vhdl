@@ -0,0 +1,87 @@
+library ieee;
+use ieee.numeric_std.all;
+use ieee.std_logic_1164.all;
+
+-- Register file with several read and write ports and a live value table
+entity multiport_register_file is
+    generic ( READ_PORTS : positive := 2;
+              WRITE_PORTS : positive := 1;
+              BYPASS : boolean := false );
+    port ( i_clock : in  std_logic;
+           i_enable : in  std_logic;
+           i_select : in  std_logic_vector(5*READ_PORTS - 1 downto 0);
+           o_data : out  std_logic_vector(32*READ_PORTS - 1 downto 0);
+           i_selectdest : in  std_logic_vector(5*WRITE_PORTS - 1 downto 0);
+           i_datadest : in  std_logic_vector(32*WRITE_PORTS - 1 downto 0);
+           i_write_enable : in  std_logic_vector(WRITE_PORTS - 1 downto 0)
+       );
+end multiport_register_file;
+
+architecture behavioral of multiport_register_file is
+    subtype word_t is std_logic_vector(31 downto 0);
+    subtype address_t is std_logic_vector(4 downto 0);
+    subtype write_port_t is natural range 0 to WRITE_PORTS - 1;
+    type store_t is array (0 to 31) of word_t;
+    type live_t is array (0 to 31) of write_port_t;
+    type addresses_t is array (natural range <>) of address_t;
+    type words_t is array (natural range <>) of word_t;
+    type write_ports_t is array (natural range <>) of write_port_t;
+
+    signal read_address : addresses_t(0 to READ_PORTS - 1);
+    signal write_address : addresses_t(0 to WRITE_PORTS - 1);
+    signal write_data : words_t(0 to WRITE_PORTS - 1);
+    signal write : std_logic_vector(WRITE_PORTS - 1 downto 0);
+
+    signal live : live_t := (others => 0);
+    signal bank_data : words_t(0 to WRITE_PORTS*READ_PORTS - 1);
+    signal read_live : write_ports_t(0 to READ_PORTS - 1) := (others => 0);
+    signal bypassed : std_logic_vector(READ_PORTS - 1 downto 0) := (others => '0');
+    signal bypass_data : words_t(0 to READ_PORTS - 1) := (others => (others => '0'));
+begin
+    read_ports: for r in 0 to READ_PORTS - 1 generate
+        read_address(r) <= i_select(5*r + 4 downto 5*r);
+        o_data(32*r + 31 downto 32*r) <= bypass_data(r) when bypassed(r) = '1' else
+                                         bank_data(read_live(r)*READ_PORTS + r);
+    end generate;
+
+    write_ports: for w in 0 to WRITE_PORTS - 1 generate
+        write_address(w) <= i_selectdest(5*w + 4 downto 5*w);
+        write_data(w) <= i_datadest(32*w + 31 downto 32*w);
+        write(w) <= i_write_enable(w) when write_address(w) /= "00000" else '0';
+
+        banks: for r in 0 to READ_PORTS - 1 generate
+            signal bank : store_t := (others => (others => '0'));
+        begin
+            process(i_clock)
+            begin
+                if rising_edge(i_clock) and i_enable = '1' then
+                    if write(w) = '1' then
+                        bank(to_integer(unsigned(write_address(w)))) <= write_data(w);
+                    end if;
+                    bank_data(w*READ_PORTS + r) <= bank(to_integer(unsigned(read_address(r))));
+                end if;
+            end process;
+        end generate;
+    end generate;
+
+    process(i_clock)
+    begin
+        if rising_edge(i_clock) and i_enable = '1' then
+            for r in 0 to READ_PORTS - 1 loop
+                read_live(r) <= live(to_integer(unsigned(read_address(r))));
+                bypassed(r) <= '0';
+                for w in 0 to WRITE_PORTS - 1 loop
+                    if BYPASS and write(w) = '1' and write_address(w) = read_address(r) then
+                        bypassed(r) <= '1';
+                        bypass_data(r) <= write_data(w);
+                    end if;
+                end loop;
+            end loop;
+            for w in 0 to WRITE_PORTS - 1 loop
+                if write(w) = '1' then
+                    live(to_integer(unsigned(write_address(w)))) <= w;
+                end if;
+            end loop;
+        end if;
+    end process;
+end behavioral;
@@ -3,6 +3,7 @@ use ieee.numeric_std.all;
 use ieee.std_logic_1164.all;
 
 entity register_file is
+generic ( BYPASS : boolean := false );
 port ( i_clock : in  std_logic;
        i_enable : in  std_logic;
        i_datadest : in  std_logic_vector (31 downto 0);
@@ -15,17 +16,18 @@ port ( i_clock : in  std_logic;
 end register_file;
 
 architecture behavioral of register_file is
-	type store_t is array (0 to 31) of std_logic_vector(31 downto 0);
-	signal registers: store_t := (others => x"00000000");
 begin
-	process(i_clock)
-	begin
-		if rising_edge(i_clock) and i_enable = '1' then
-			o_dataa <= registers(to_integer(unsigned(i_selecta)));
-			o_datab <= registers(to_integer(unsigned(i_selectb)));
-			if (i_write_enable = '1') and (unsigned(i_selectdest) > 0) then
-				registers(to_integer(unsigned(i_selectdest))) <= i_datadest;
-			end if;
-		end if;
-	end process;
+	-- two read ports and one write port of the multiport register file
+	registers: entity work.multiport_register_file
+	generic map (READ_PORTS => 2, WRITE_PORTS => 1, BYPASS => BYPASS)
+	port map (
+			 i_clock => i_clock,
+			 i_enable => i_enable,
+			 i_select => i_selectb & i_selecta,
+			 o_data(31 downto 0) => o_dataa,
+			 o_data(63 downto 32) => o_datab,
+			 i_selectdest => i_selectdest,
+			 i_datadest => i_datadest,
+			 i_write_enable(0) => i_write_enable
+		 );
 end;
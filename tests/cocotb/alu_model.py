@@ -0,0 +1,241 @@
+from typing import NamedTuple
+import numpy as np
+
+# OP Codes, mirrors src/constants.vhdl
+OP_LUI = 0b0110111
+OP_AUIPC = 0b0010111
+OP_JAL = 0b1101111
+OP_JALR = 0b1100111
+OP_BRANCH = 0b1100011
+OP_LOAD = 0b0000011
+OP_STORE = 0b0100011
+OP_IMM = 0b0010011
+OP_REGREG = 0b0110011
+OP_FENCE = 0b0001111
+OP_ENV = 0b1110011
+
+F3_BRANCH_BEQ = 0b000
+F3_BRANCH_BNE = 0b001
+F3_BRANCH_BLT = 0b100
+F3_BRANCH_BGE = 0b101
+F3_BRANCH_BLTU = 0b110
+F3_BRANCH_BGEU = 0b111
+
+F3_OPIMM_ADDI = 0b000
+F3_OPIMM_SLTI = 0b010
+F3_OPIMM_SLTIU = 0b011
+F3_OPIMM_XORI = 0b100
+F3_OPIMM_ORI = 0b110
+F3_OPIMM_ANDI = 0b111
+F3_OPIMM_SLLI = 0b001
+F3_OPIMM_SRLI = 0b101
+F3_OPIMM_SRAI = 0b101
+F7_OPIMM_SRLI = 0b0000000
+F7_OPIMM_SRAI = 0b0100000
+
+F3_OP_ADD = 0b000
+F3_OP_SUB = 0b000
+F3_OP_SLL = 0b001
+F3_OP_SLT = 0b010
+F3_OP_SLTU = 0b011
+F3_OP_XOR = 0b100
+F3_OP_SRL = 0b101
+F3_OP_SRA = 0b101
+F3_OP_OR = 0b110
+F3_OP_AND = 0b111
+F7_OP_BASE = 0b0000000
+F7_OP_ALT = 0b0100000
+
+# M extension, computed by the multiply divide unit
+F7_OP_MULDIV = 0b0000001
+F3_MULDIV_MUL = 0b000
+F3_MULDIV_MULH = 0b001
+F3_MULDIV_MULHSU = 0b010
+F3_MULDIV_MULHU = 0b011
+F3_MULDIV_DIV = 0b100
+F3_MULDIV_DIVU = 0b101
+F3_MULDIV_REM = 0b110
+F3_MULDIV_REMU = 0b111
+
+
+class AluResult(NamedTuple):
+    """Expected ALU outputs, one row per stimulus.
+
+    The ALU is clocked and only assigns some outputs for a given op code,
+    the others keep the value of the previous operation. The *_valid masks
+    mark the rows in which the corresponding output is defined.
+    """
+    data_result: np.ndarray
+    should_write_result: np.ndarray
+    should_branch: np.ndarray
+    branch_target: np.ndarray
+    data_result_valid: np.ndarray
+    should_branch_valid: np.ndarray
+    branch_target_valid: np.ndarray
+
+
+def to_uint32(values) -> np.ndarray:
+    return (np.asarray(values, dtype=np.int64) & 0xffffffff).astype(np.uint32)
+
+
+def sign_extend(values: np.ndarray, bits: int) -> np.ndarray:
+    # sign extend the lower bits of a uint32 array, wraps around in uint32
+    sign = np.uint32(1 << (bits-1))
+    return ((values & np.uint32((1 << bits)-1)) ^ sign) - sign
+
+
+def _flag(condition: np.ndarray) -> np.ndarray:
+    return condition.astype(np.uint32)
+
+
+def _execute_IMM(data, immediate, fun3, fun7):
+    ext_imm = sign_extend(immediate, 12)
+    shift = immediate & np.uint32(0x1f)
+    return np.select(
+        [fun3 == F3_OPIMM_ADDI,
+         fun3 == F3_OPIMM_SLTI,
+         fun3 == F3_OPIMM_SLTIU,
+         fun3 == F3_OPIMM_XORI,
+         fun3 == F3_OPIMM_ORI,
+         fun3 == F3_OPIMM_ANDI,
+         fun3 == F3_OPIMM_SLLI,
+         (fun3 == F3_OPIMM_SRLI) & (fun7 == F7_OPIMM_SRLI)],
+        [data + ext_imm,
+         _flag(data.view(np.int32) < ext_imm.view(np.int32)),
+         _flag(data < ext_imm),
+         data ^ ext_imm,
+         data | ext_imm,
+         data & ext_imm,
+         data << shift,
+         data >> shift],
+        # SRAI, every other fun7 also shifts arithmetically
+        (data.view(np.int32) >> shift.astype(np.int32)).view(np.uint32))
+
+
+def _execute_REGREG(data_s1, data_s2, fun3, fun7):
+    fun = (fun7 << 3) | fun3
+    shift = data_s2 & np.uint32(0x1f)
+    return np.select(
+        [fun == (F7_OP_BASE << 3) | F3_OP_ADD,
+         fun == (F7_OP_ALT << 3) | F3_OP_SUB,
+         fun == (F7_OP_BASE << 3) | F3_OP_SLT,
+         fun == (F7_OP_BASE << 3) | F3_OP_SLTU,
+         fun == (F7_OP_BASE << 3) | F3_OP_OR,
+         fun == (F7_OP_BASE << 3) | F3_OP_AND,
+         fun == (F7_OP_BASE << 3) | F3_OP_XOR,
+         fun == (F7_OP_BASE << 3) | F3_OP_SLL,
+         fun == (F7_OP_BASE << 3) | F3_OP_SRL,
+         fun == (F7_OP_ALT << 3) | F3_OP_SRA],
+        [data_s1 + data_s2,
+         data_s1 - data_s2,
+         _flag(data_s1.view(np.int32) < data_s2.view(np.int32)),
+         _flag(data_s1 < data_s2),
+         data_s1 | data_s2,
+         data_s1 & data_s2,
+         data_s1 ^ data_s2,
+         data_s1 << shift,
+         data_s1 >> shift,
+         (data_s1.view(np.int32) >> shift.astype(np.int32)).view(np.uint32)],
+        np.uint32(0))
+
+
+def _execute_BRANCH(data_s1, data_s2, fun3):
+    signed_s1 = data_s1.view(np.int32)
+    signed_s2 = data_s2.view(np.int32)
+    return np.select(
+        [fun3 == F3_BRANCH_BEQ,
+         fun3 == F3_BRANCH_BNE,
+         fun3 == F3_BRANCH_BLT,
+         fun3 == F3_BRANCH_BGE,
+         fun3 == F3_BRANCH_BLTU,
+         fun3 == F3_BRANCH_BGEU],
+        [data_s1 == data_s2,
+         data_s1 != data_s2,
+         signed_s1 < signed_s2,
+         signed_s1 >= signed_s2,
+         data_s1 < data_s2,
+         data_s1 >= data_s2],
+        False)
+
+
+def evaluate(op_code, fun3=0, fun7=0, s1=0, s2=0, imm=0, pc=0) -> AluResult:
+    """Compute the ALU outputs for whole arrays of stimuli at once.
+
+    Scalars are broadcast against the arrays, signed python ints are
+    interpreted as two's complement like a write to the dut handle.
+    """
+    op_code, fun3, fun7, s1, s2, imm, pc = np.broadcast_arrays(
+        *(np.atleast_1d(to_uint32(value))
+          for value in (op_code, fun3, fun7, s1, s2, imm, pc)))
+
+    is_imm = op_code == OP_IMM
+    is_lui = op_code == OP_LUI
+    is_auipc = op_code == OP_AUIPC
+    is_regreg = op_code == OP_REGREG
+    is_jal = op_code == OP_JAL
+    is_jalr = op_code == OP_JALR
+    is_branch = op_code == OP_BRANCH
+    is_memory = (op_code == OP_LOAD) | (op_code == OP_STORE)
+    is_jump = is_jal | is_jalr
+
+    upper_imm = (imm & np.uint32(0xfffff)) << np.uint32(12)
+    link = pc + np.uint32(4)
+
+    data_result = np.select(
+        [is_imm, is_lui, is_auipc, is_regreg, is_jump, is_memory],
+        [_execute_IMM(s1, imm, fun3, fun7),
+         upper_imm,
+         pc + upper_imm,
+         _execute_REGREG(s1, s2, fun3, fun7),
+         link,
+         s1 + sign_extend(imm, 12)],
+        np.uint32(0))
+
+    # the decoder zero extends, the sign is the msb of the encoded offset
+    branch_target = np.select(
+        [is_jal, is_jalr],
+        [pc + sign_extend(imm, 21),
+         (s1 + sign_extend(imm, 12)) & np.uint32(0xfffffffe)],
+        # BRANCH
+        pc + sign_extend(imm, 13))
+
+    should_branch = is_jump | (is_branch & _execute_BRANCH(s1, s2, fun3))
+    should_write_result = is_imm | is_lui | is_auipc | is_regreg | is_jump
+
+    return AluResult(
+        data_result=data_result,
+        should_write_result=should_write_result,
+        should_branch=should_branch,
+        branch_target=branch_target,
+        data_result_valid=~is_branch,
+        should_branch_valid=should_write_result | is_branch | is_memory,
+        branch_target_valid=is_jump | is_branch)
+
+
+def _hold(values: np.ndarray, assigned: np.ndarray):
+    index = np.where(assigned, np.arange(len(values)), -1)
+    np.maximum.accumulate(index, out=index)
+    return values[np.maximum(index, 0)], index >= 0
+
+
+def hold(result: AluResult) -> AluResult:
+    """Expected outputs when the rows are applied back to back.
+
+    Outputs that are not assigned by a row keep the value of the last
+    row that assigned them; the *_valid masks then mark rows for which
+    any earlier row defined the output.
+    """
+    data_result, data_result_valid = _hold(
+        result.data_result, result.data_result_valid)
+    should_branch, should_branch_valid = _hold(
+        result.should_branch, result.should_branch_valid)
+    branch_target, branch_target_valid = _hold(
+        result.branch_target, result.branch_target_valid)
+    return AluResult(
+        data_result=data_result,
+        should_write_result=result.should_write_result,
+        should_branch=should_branch,
+        branch_target=branch_target,
+        data_result_valid=data_result_valid,
+        should_branch_valid=should_branch_valid,
+        branch_target_valid=branch_target_valid)
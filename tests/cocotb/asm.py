@@ -0,0 +1,222 @@
+"""Encoders for RV32IMC instructions, enough to write test programs in python."""
+import struct
+from typing import Iterable
+
+import alu_model as isa
+import iss
+
+
+def _r(opcode: int, fun3: int, fun7: int, rd: int, rs1: int, rs2: int) -> int:
+    return (fun7 << 25) | (rs2 << 20) | (rs1 << 15) | (fun3 << 12) | (rd << 7) | opcode
+
+
+def _i(opcode: int, fun3: int, rd: int, rs1: int, imm: int) -> int:
+    return ((imm & 0xfff) << 20) | (rs1 << 15) | (fun3 << 12) | (rd << 7) | opcode
+
+
+def _s(opcode: int, fun3: int, rs1: int, rs2: int, imm: int) -> int:
+    imm &= 0xfff
+    return ((imm >> 5) << 25) | (rs2 << 20) | (rs1 << 15) | (fun3 << 12) | ((imm & 0x1f) << 7) | opcode
+
+
+def _b(fun3: int, rs1: int, rs2: int, offset: int) -> int:
+    imm = offset & 0x1fff
+    return (((imm >> 12) & 0x1) << 31 | ((imm >> 5) & 0x3f) << 25 | rs2 << 20 | rs1 << 15 |
+            fun3 << 12 | ((imm >> 1) & 0xf) << 8 | ((imm >> 11) & 0x1) << 7 | isa.OP_BRANCH)
+
+
+def _u(opcode: int, rd: int, imm: int) -> int:
+    return ((imm & 0xfffff) << 12) | (rd << 7) | opcode
+
+
+def lui(rd, imm): return _u(isa.OP_LUI, rd, imm)
+def auipc(rd, imm): return _u(isa.OP_AUIPC, rd, imm)
+
+
+def jal(rd, offset):
+    imm = offset & 0x1fffff
+    return (((imm >> 20) & 0x1) << 31 | ((imm >> 1) & 0x3ff) << 21 | ((imm >> 11) & 0x1) << 20 |
+            ((imm >> 12) & 0xff) << 12 | rd << 7 | isa.OP_JAL)
+
+
+def jalr(rd, rs1, imm): return _i(isa.OP_JALR, iss.F3_JALR, rd, rs1, imm)
+
+def beq(rs1, rs2, offset): return _b(isa.F3_BRANCH_BEQ, rs1, rs2, offset)
+def bne(rs1, rs2, offset): return _b(isa.F3_BRANCH_BNE, rs1, rs2, offset)
+def blt(rs1, rs2, offset): return _b(isa.F3_BRANCH_BLT, rs1, rs2, offset)
+def bge(rs1, rs2, offset): return _b(isa.F3_BRANCH_BGE, rs1, rs2, offset)
+def bltu(rs1, rs2, offset): return _b(isa.F3_BRANCH_BLTU, rs1, rs2, offset)
+def bgeu(rs1, rs2, offset): return _b(isa.F3_BRANCH_BGEU, rs1, rs2, offset)
+
+def lb(rd, rs1, imm): return _i(isa.OP_LOAD, iss.F3_LOAD_LB, rd, rs1, imm)
+def lh(rd, rs1, imm): return _i(isa.OP_LOAD, iss.F3_LOAD_LH, rd, rs1, imm)
+def lw(rd, rs1, imm): return _i(isa.OP_LOAD, iss.F3_LOAD_LW, rd, rs1, imm)
+def lbu(rd, rs1, imm): return _i(isa.OP_LOAD, iss.F3_LOAD_LBU, rd, rs1, imm)
+def lhu(rd, rs1, imm): return _i(isa.OP_LOAD, iss.F3_LOAD_LHU, rd, rs1, imm)
+
+def sb(rs2, rs1, imm): return _s(isa.OP_STORE, iss.F3_STORE_SB, rs1, rs2, imm)
+def sh(rs2, rs1, imm): return _s(isa.OP_STORE, iss.F3_STORE_SH, rs1, rs2, imm)
+def sw(rs2, rs1, imm): return _s(isa.OP_STORE, iss.F3_STORE_SW, rs1, rs2, imm)
+
+def addi(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_ADDI, rd, rs1, imm)
+def slti(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_SLTI, rd, rs1, imm)
+def sltiu(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_SLTIU, rd, rs1, imm)
+def xori(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_XORI, rd, rs1, imm)
+def ori(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_ORI, rd, rs1, imm)
+def andi(rd, rs1, imm): return _i(isa.OP_IMM, isa.F3_OPIMM_ANDI, rd, rs1, imm)
+def slli(rd, rs1, shift): return _r(isa.OP_IMM, isa.F3_OPIMM_SLLI, isa.F7_OP_BASE, rd, rs1, shift)
+def srli(rd, rs1, shift): return _r(isa.OP_IMM, isa.F3_OPIMM_SRLI, isa.F7_OPIMM_SRLI, rd, rs1, shift)
+def srai(rd, rs1, shift): return _r(isa.OP_IMM, isa.F3_OPIMM_SRAI, isa.F7_OPIMM_SRAI, rd, rs1, shift)
+
+def add(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_ADD, isa.F7_OP_BASE, rd, rs1, rs2)
+def sub(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SUB, isa.F7_OP_ALT, rd, rs1, rs2)
+def sll(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SLL, isa.F7_OP_BASE, rd, rs1, rs2)
+def slt(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SLT, isa.F7_OP_BASE, rd, rs1, rs2)
+def sltu(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SLTU, isa.F7_OP_BASE, rd, rs1, rs2)
+def xor(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_XOR, isa.F7_OP_BASE, rd, rs1, rs2)
+def srl(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SRL, isa.F7_OP_BASE, rd, rs1, rs2)
+def sra(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_SRA, isa.F7_OP_ALT, rd, rs1, rs2)
+def or_(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_OR, isa.F7_OP_BASE, rd, rs1, rs2)
+def and_(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_OP_AND, isa.F7_OP_BASE, rd, rs1, rs2)
+
+def mul(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_MUL, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def mulh(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_MULH, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def mulhsu(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_MULHSU, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def mulhu(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_MULHU, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def div(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_DIV, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def divu(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_DIVU, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def rem(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_REM, isa.F7_OP_MULDIV, rd, rs1, rs2)
+def remu(rd, rs1, rs2): return _r(isa.OP_REGREG, isa.F3_MULDIV_REMU, isa.F7_OP_MULDIV, rd, rs1, rs2)
+
+def csrrw(rd, csr, rs1): return _i(isa.OP_ENV, iss.F3_CSR_RW, rd, rs1, csr)
+def csrrs(rd, csr, rs1): return _i(isa.OP_ENV, iss.F3_CSR_RS, rd, rs1, csr)
+def csrrc(rd, csr, rs1): return _i(isa.OP_ENV, iss.F3_CSR_RC, rd, rs1, csr)
+def csrrwi(rd, csr, zimm): return _i(isa.OP_ENV, iss.F3_CSR_RWI, rd, zimm, csr)
+def csrrsi(rd, csr, zimm): return _i(isa.OP_ENV, iss.F3_CSR_RSI, rd, zimm, csr)
+def csrrci(rd, csr, zimm): return _i(isa.OP_ENV, iss.F3_CSR_RCI, rd, zimm, csr)
+def csrr(rd, csr): return csrrs(rd, csr, 0)
+
+def nop(): return addi(0, 0, 0)
+def ecall(): return iss.ECALL
+def ebreak(): return iss.EBREAK
+
+
+class Compressed(int):
+    """16 bit instruction of the C extension, assemble packs it into two bytes."""
+
+
+def _bit(value: int, bit: int, to: int) -> int:
+    return ((value >> bit) & 0x1) << to
+
+
+def _short(register: int) -> int:
+    # the three bit register fields only reach x8 to x15
+    assert 8 <= register < 16, f"x{register} has no compressed encoding"
+    return register - 8
+
+
+def _ci(fun3: int, rd: int, imm: int, quadrant: int) -> Compressed:
+    return Compressed(fun3 << 13 | _bit(imm, 5, 12) | rd << 7 | (imm & 0x1f) << 2 | quadrant)
+
+
+def _cl(fun3: int, rd: int, rs1: int, offset: int) -> Compressed:
+    # c.lw and c.sw, the word offset scatters around the registers
+    return Compressed(fun3 << 13 | ((offset >> 3) & 0x7) << 10 | _short(rs1) << 7 |
+                      _bit(offset, 2, 6) | _bit(offset, 6, 5) | _short(rd) << 2)
+
+
+def _ca(fun2: int, rd: int, rs2: int) -> Compressed:
+    return Compressed(0b100011 << 10 | _short(rd) << 7 | fun2 << 5 | _short(rs2) << 2 | 0b01)
+
+
+def _cb(fun2: int, rd: int, imm: int) -> Compressed:
+    # c.srli, c.srai and c.andi
+    return Compressed(0b100 << 13 | _bit(imm, 5, 12) | fun2 << 10 | _short(rd) << 7 |
+                      (imm & 0x1f) << 2 | 0b01)
+
+
+def _cj(fun3: int, offset: int) -> Compressed:
+    return Compressed(fun3 << 13 | _bit(offset, 11, 12) | _bit(offset, 4, 11) |
+                      ((offset >> 8) & 0x3) << 9 | _bit(offset, 10, 8) | _bit(offset, 6, 7) |
+                      _bit(offset, 7, 6) | ((offset >> 1) & 0x7) << 3 | _bit(offset, 5, 2) | 0b01)
+
+
+def _cbranch(fun3: int, rs1: int, offset: int) -> Compressed:
+    return Compressed(fun3 << 13 | _bit(offset, 8, 12) | ((offset >> 3) & 0x3) << 10 |
+                      _short(rs1) << 7 | ((offset >> 6) & 0x3) << 5 | ((offset >> 1) & 0x3) << 3 |
+                      _bit(offset, 5, 2) | 0b01)
+
+
+def _cr(fun4: int, rd: int, rs2: int) -> Compressed:
+    return Compressed(fun4 << 12 | rd << 7 | rs2 << 2 | 0b10)
+
+
+def c_addi4spn(rd, imm):
+    return Compressed(((imm >> 4) & 0x3) << 11 | ((imm >> 6) & 0xf) << 7 | _bit(imm, 2, 6) |
+                      _bit(imm, 3, 5) | _short(rd) << 2)
+
+
+def c_lw(rd, rs1, offset): return _cl(0b010, rd, rs1, offset)
+def c_sw(rs2, rs1, offset): return _cl(0b110, rs2, rs1, offset)
+
+def c_nop(): return _ci(0b000, 0, 0, 0b01)
+def c_addi(rd, imm): return _ci(0b000, rd, imm, 0b01)
+def c_jal(offset): return _cj(0b001, offset)
+def c_li(rd, imm): return _ci(0b010, rd, imm, 0b01)
+def c_lui(rd, imm): return _ci(0b011, rd, imm, 0b01)
+
+
+def c_addi16sp(imm):
+    return Compressed(0b011 << 13 | _bit(imm, 9, 12) | 2 << 7 | _bit(imm, 4, 6) | _bit(imm, 6, 5) |
+                      ((imm >> 7) & 0x3) << 3 | _bit(imm, 5, 2) | 0b01)
+
+
+def c_srli(rd, shift): return _cb(0b00, rd, shift)
+def c_srai(rd, shift): return _cb(0b01, rd, shift)
+def c_andi(rd, imm): return _cb(0b10, rd, imm)
+def c_sub(rd, rs2): return _ca(0b00, rd, rs2)
+def c_xor(rd, rs2): return _ca(0b01, rd, rs2)
+def c_or(rd, rs2): return _ca(0b10, rd, rs2)
+def c_and(rd, rs2): return _ca(0b11, rd, rs2)
+def c_j(offset): return _cj(0b101, offset)
+def c_beqz(rs1, offset): return _cbranch(0b110, rs1, offset)
+def c_bnez(rs1, offset): return _cbranch(0b111, rs1, offset)
+
+def c_slli(rd, shift): return _ci(0b000, rd, shift, 0b10)
+
+
+def c_lwsp(rd, offset):
+    return Compressed(0b010 << 13 | _bit(offset, 5, 12) | rd << 7 | ((offset >> 2) & 0x7) << 4 |
+                      ((offset >> 6) & 0x3) << 2 | 0b10)
+
+
+def c_swsp(rs2, offset):
+    return Compressed(0b110 << 13 | ((offset >> 2) & 0xf) << 9 | ((offset >> 6) & 0x3) << 7 |
+                      rs2 << 2 | 0b10)
+
+
+def c_jr(rs1): return _cr(0b1000, rs1, 0)
+def c_mv(rd, rs2): return _cr(0b1000, rd, rs2)
+def c_ebreak(): return _cr(0b1001, 0, 0)
+def c_jalr(rs1): return _cr(0b1001, rs1, 0)
+def c_add(rd, rs2): return _cr(0b1001, rd, rs2)
+
+
+def li(rd, value):
+    """Load a 32 bit constant, one or two instructions."""
+    value &= 0xffffffff
+    low = iss.sign_extend(value, 12)
+    if low == iss.sign_extend(value, 32):
+        return [addi(rd, 0, low)]
+    upper = ((value - low) >> 12) & 0xfffff
+    return [lui(rd, upper)] + ([addi(rd, rd, low)] if low else [])
+
+
+def assemble(words: Iterable[int]) -> bytes:
+    """Little endian image of the instruction words.
+
+    Compressed instructions take two bytes, everything else four.
+    """
+    words = list(words)
+    layout = "".join("H" if isinstance(word, Compressed) else "I" for word in words)
+    return struct.pack(f"<{layout}", *words)
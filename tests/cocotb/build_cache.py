@@ -0,0 +1,125 @@
+"""Incremental GHDL builds keyed on the hashes of the VHDL sources.
+
+All toplevels share one work library in BUILD_DIR. A toplevel is only
+rebuilt when a source file it depends on, the build arguments or the
+toplevel itself changed. The re-analysis is left to ``ghdl -m``, which
+only analyzes modified files and the units depending on them.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Sequence, Set
+
+from cocotb.runner import get_runner, get_abs_paths
+
+PROJ_PATH = Path(__file__).resolve().parent
+BUILD_DIR = PROJ_PATH / "sim_build"
+MANIFEST = "build_cache.json"
+
+_UNIT = re.compile(r"^\s*(?:entity|package)\s+(\w+)\s+is\b", re.IGNORECASE | re.MULTILINE)
+_WORK_REFERENCE = re.compile(r"\bwork\.(\w+)", re.IGNORECASE)
+_COMMENT = re.compile(r"--.*$", re.MULTILINE)
+
+
+def _hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def _units(sources: Sequence[Path]) -> Dict[Path, tuple]:
+    # file -> (units it declares, units of work it references)
+    units = {}
+    for source in sources:
+        text = _COMMENT.sub("", source.read_text()).lower()
+        declared = set(_UNIT.findall(text))
+        referenced = set(_WORK_REFERENCE.findall(text)) - declared
+        units[source] = (declared, referenced)
+    return units
+
+
+def dependencies(toplevel: str, sources: Sequence[Path]) -> List[Path]:
+    """Files the *toplevel* entity transitively depends on, including its own."""
+    units = _units(sources)
+    declared_in = {unit: source
+                   for source, (declared, _) in units.items() for unit in declared}
+
+    pending = [toplevel.lower()]
+    needed: Set[Path] = set()
+    while pending:
+        source = declared_in.get(pending.pop())
+        if source is None or source in needed:
+            continue
+        needed.add(source)
+        pending += units[source][1]
+
+    # unknown toplevel or references, depend on everything to stay safe
+    if not needed:
+        return list(sources)
+    return [source for source in sources if source in needed]
+
+
+def dependents(changed: Sequence[Path], sources: Sequence[Path]) -> List[Path]:
+    """Files that have to be re-analyzed when the *changed* files are modified."""
+    units = _units(sources)
+    stale = set(changed)
+    grown = True
+    while grown:
+        stale_units = set().union(*(units[source][0] for source in stale))
+        grown = False
+        for source, (_, referenced) in units.items():
+            if source not in stale and referenced & stale_units:
+                stale.add(source)
+                grown = True
+    return [source for source in sources if source in stale]
+
+
+def _load_manifest(build_dir: Path) -> dict:
+    try:
+        return json.loads((build_dir / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def build(vhdl_sources: Sequence, hdl_toplevel: str,
+          build_args: Sequence[str] = ("--std=08",), build_dir: Path = BUILD_DIR):
+    """Build *hdl_toplevel* unless the previous build is still up to date.
+
+    Returns the runner, ready for ``runner.test``.
+    """
+    build_dir = Path(build_dir)
+    sources = get_abs_paths(vhdl_sources)
+    needed = dependencies(hdl_toplevel, sources)
+    hashes = {str(source): _hash(source) for source in needed}
+    entry = {"build_args": list(build_args), "sources": hashes}
+
+    manifest = _load_manifest(build_dir)
+    previous = manifest.get(hdl_toplevel)
+
+    runner = get_runner("ghdl")
+    if previous == entry and any(build_dir.glob("*.cf")):
+        print(f"INFO: {hdl_toplevel} is up to date in {build_dir}")
+        # what runner.build would have set for runner.test
+        runner.build_dir = build_dir
+        runner.vhdl_sources = sources
+        runner.verilog_sources = []
+        return runner
+
+    if previous is not None and previous.get("build_args") == entry["build_args"]:
+        changed = [source for source in needed
+                   if previous["sources"].get(str(source)) != hashes[str(source)]]
+        stale = dependents(changed, needed)
+        print(f"INFO: rebuilding {hdl_toplevel}, re-analyzing "
+              + ", ".join(source.name for source in stale))
+
+    runner.build(
+        vhdl_sources=sources,
+        hdl_toplevel=hdl_toplevel,
+        build_dir=build_dir,
+        build_args=list(build_args)
+    )
+
+    # re-read, another toplevel may have been built in the meantime
+    manifest = _load_manifest(build_dir)
+    manifest[hdl_toplevel] = entry
+    (build_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return runner
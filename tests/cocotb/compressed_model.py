@@ -0,0 +1,108 @@
+"""RV32C expansion, mirrors src/compressed_expander.vhdl.
+
+Every 16 bit instruction is translated to the 32 bit instruction it
+stands for. Reserved encodings, the RV64 only ones and the floating
+point loads and stores expand to 0, which is illegal as well.
+"""
+import asm
+import iss
+
+ILLEGAL = 0
+
+
+def _bits(parcel: int, high: int, low: int) -> int:
+    return (parcel >> low) & ((1 << (high - low + 1)) - 1)
+
+
+def _scatter(parcel: int, layout) -> int:
+    """Immediate from (parcel bit, immediate bit) pairs."""
+    return sum(((parcel >> source) & 1) << target for source, target in layout)
+
+
+# (parcel bit, immediate bit) of the scattered immediates
+_ADDI4SPN = [(12, 5), (11, 4), (10, 9), (9, 8), (8, 7), (7, 6), (6, 2), (5, 3)]
+_LW = [(12, 5), (11, 4), (10, 3), (6, 2), (5, 6)]
+_JAL = [(12, 11), (11, 4), (10, 9), (9, 8), (8, 10), (7, 6), (6, 7), (5, 3), (4, 2), (3, 1), (2, 5)]
+_ADDI16SP = [(12, 9), (6, 4), (5, 6), (4, 8), (3, 7), (2, 5)]
+_BRANCH = [(12, 8), (11, 4), (10, 3), (6, 7), (5, 6), (4, 2), (3, 1), (2, 5)]
+_LWSP = [(12, 5), (6, 4), (5, 3), (4, 2), (3, 7), (2, 6)]
+_SWSP = [(12, 5), (11, 4), (10, 3), (9, 2), (8, 7), (7, 6)]
+
+
+def is_compressed(parcel: int) -> bool:
+    return parcel & 0x3 != 0x3
+
+
+def expand(parcel: int) -> int:
+    """32 bit equivalent of the 16 bit *parcel*, ILLEGAL if there is none."""
+    quadrant = parcel & 0x3
+    fun3 = _bits(parcel, 15, 13)
+    rd = _bits(parcel, 11, 7)
+    rs2 = _bits(parcel, 6, 2)
+    # the registers x8 to x15 of the three bit fields
+    rd_short = 8 + _bits(parcel, 4, 2)
+    rs1_short = 8 + _bits(parcel, 9, 7)
+    imm6 = iss.sign_extend(_bits(parcel, 12, 12) << 5 | rs2, 6)
+    shift = rs2
+
+    if quadrant == 0b00:
+        if fun3 == 0b000:
+            imm = _scatter(parcel, _ADDI4SPN)
+            return asm.addi(rd_short, 2, imm) if imm else ILLEGAL
+        if fun3 == 0b010:
+            return asm.lw(rd_short, rs1_short, _scatter(parcel, _LW))
+        if fun3 == 0b110:
+            return asm.sw(rd_short, rs1_short, _scatter(parcel, _LW))
+        return ILLEGAL
+
+    if quadrant == 0b01:
+        if fun3 == 0b000:
+            return asm.addi(rd, rd, imm6)
+        if fun3 in (0b001, 0b101):
+            # c.jal links to ra, c.j does not link
+            return asm.jal(1 if fun3 == 0b001 else 0, iss.sign_extend(_scatter(parcel, _JAL), 12))
+        if fun3 == 0b010:
+            return asm.addi(rd, 0, imm6)
+        if fun3 == 0b011:
+            if rd == 2:
+                imm = iss.sign_extend(_scatter(parcel, _ADDI16SP), 10)
+                return asm.addi(2, 2, imm) if imm else ILLEGAL
+            return asm.lui(rd, imm6) if imm6 else ILLEGAL
+        if fun3 == 0b100:
+            operation = _bits(parcel, 11, 10)
+            rd = rs1_short
+            if operation == 0b00:
+                return asm.srli(rd, rd, shift) if not _bits(parcel, 12, 12) else ILLEGAL
+            if operation == 0b01:
+                return asm.srai(rd, rd, shift) if not _bits(parcel, 12, 12) else ILLEGAL
+            if operation == 0b10:
+                return asm.andi(rd, rd, imm6)
+            if _bits(parcel, 12, 12):
+                # c.subw and c.addw of RV64
+                return ILLEGAL
+            regreg = [asm.sub, asm.xor, asm.or_, asm.and_][_bits(parcel, 6, 5)]
+            return regreg(rd, rd, rd_short)
+        # c.beqz and c.bnez
+        offset = iss.sign_extend(_scatter(parcel, _BRANCH), 9)
+        branch = asm.beq if fun3 == 0b110 else asm.bne
+        return branch(rs1_short, 0, offset)
+
+    if quadrant == 0b10:
+        if fun3 == 0b000:
+            return asm.slli(rd, rd, shift) if not _bits(parcel, 12, 12) else ILLEGAL
+        if fun3 == 0b010:
+            return asm.lw(rd, 2, _scatter(parcel, _LWSP)) if rd else ILLEGAL
+        if fun3 == 0b110:
+            return asm.sw(rs2, 2, _scatter(parcel, _SWSP))
+        if fun3 == 0b100:
+            if not _bits(parcel, 12, 12):
+                if rs2:
+                    return asm.add(rd, 0, rs2)
+                return asm.jalr(0, rd, 0) if rd else ILLEGAL
+            if rs2:
+                return asm.add(rd, rd, rs2)
+            return asm.jalr(1, rd, 0) if rd else iss.EBREAK
+        return ILLEGAL
+
+    # not compressed
+    return ILLEGAL
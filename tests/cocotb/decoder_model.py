@@ -0,0 +1,77 @@
+from typing import NamedTuple
+import numpy as np
+from alu_model import (OP_LUI, OP_AUIPC, OP_JAL, OP_JALR, OP_BRANCH, OP_LOAD,
+                       OP_STORE, OP_IMM, OP_FENCE, OP_ENV, to_uint32)
+
+
+class DecoderResult(NamedTuple):
+    """Expected decoder outputs, one row per instruction.
+
+    FENCE does not assign the immediate, it keeps the value of the
+    previous instruction. data_imm_valid marks the rows that define it.
+    """
+    opcode: np.ndarray
+    selectdest: np.ndarray
+    selecta: np.ndarray
+    selectb: np.ndarray
+    fun3: np.ndarray
+    fun7: np.ndarray
+    data_imm: np.ndarray
+    data_imm_valid: np.ndarray
+
+
+def _bits(instructions: np.ndarray, high: int, low: int) -> np.ndarray:
+    return (instructions >> np.uint32(low)) & np.uint32((1 << (high - low + 1)) - 1)
+
+
+def decode(instructions) -> DecoderResult:
+    """Extract the fields of whole arrays of instructions at once.
+
+    The immediates are not sign extended, the decoder fills the upper
+    bits with zeros and the ALU extends them.
+    """
+    instructions = np.atleast_1d(to_uint32(instructions))
+    opcode = _bits(instructions, 6, 0)
+
+    upper = instructions & np.uint32(0xfffff000)
+    jal = (_bits(instructions, 31, 31) << np.uint32(20)
+           | _bits(instructions, 19, 12) << np.uint32(12)
+           | _bits(instructions, 20, 20) << np.uint32(11)
+           | _bits(instructions, 30, 21) << np.uint32(1))
+    itype = _bits(instructions, 31, 20)
+    branch = (_bits(instructions, 31, 31) << np.uint32(12)
+              | _bits(instructions, 7, 7) << np.uint32(11)
+              | _bits(instructions, 30, 25) << np.uint32(5)
+              | _bits(instructions, 11, 8) << np.uint32(1))
+    store = _bits(instructions, 31, 25) << np.uint32(5) | _bits(instructions, 11, 7)
+
+    data_imm = np.select(
+        [(opcode == OP_LUI) | (opcode == OP_AUIPC),
+         opcode == OP_JAL,
+         (opcode == OP_JALR) | (opcode == OP_LOAD) | (opcode == OP_ENV) | (opcode == OP_IMM),
+         opcode == OP_BRANCH,
+         opcode == OP_STORE],
+        [upper, jal, itype, branch, store],
+        np.uint32(0))
+
+    return DecoderResult(
+        opcode=opcode,
+        selectdest=_bits(instructions, 11, 7),
+        selecta=_bits(instructions, 19, 15),
+        selectb=_bits(instructions, 24, 20),
+        fun3=_bits(instructions, 14, 12),
+        fun7=_bits(instructions, 31, 25),
+        data_imm=data_imm,
+        data_imm_valid=opcode != OP_FENCE)
+
+
+def hold(result: DecoderResult) -> DecoderResult:
+    """Expected outputs when the instructions are decoded back to back.
+
+    A FENCE keeps the immediate of the last instruction before it, rows
+    without any defining instruction before them are marked invalid.
+    """
+    index = np.where(result.data_imm_valid, np.arange(len(result.data_imm)), -1)
+    np.maximum.accumulate(index, out=index)
+    return result._replace(data_imm=result.data_imm[np.maximum(index, 0)],
+                           data_imm_valid=index >= 0)
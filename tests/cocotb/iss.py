@@ -0,0 +1,484 @@
+"""Instruction set simulator for RV32IM, the reference model of the core.
+
+With the C extension enabled 16 bit instructions are expanded to their 32
+bit equivalents and instructions only have to be aligned to two bytes.
+Instructions are decoded once into closures and cached by instruction
+word and by pc, stores invalidate the pc cache so self modifying code
+works. The register file is an array of uint32 and memory a bytearray.
+``run`` executes without creating any per instruction objects, ``step``
+executes a single instruction and returns its retire record.
+"""
+import struct
+from array import array
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import alu_model as isa
+import compressed_model
+
+MASK = 0xffffffff
+SIGN = 0x80000000
+
+# writes to x0 go to this scratch register, so no instruction has to check rd
+_X0_SINK = 32
+
+_S8 = struct.Struct("<b")
+_S16 = struct.Struct("<h")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
+F3_STORE_SB = 0b000
+F3_STORE_SH = 0b001
+F3_STORE_SW = 0b010
+F3_LOAD_LB = 0b000
+F3_LOAD_LH = 0b001
+F3_LOAD_LW = 0b010
+F3_LOAD_LBU = 0b100
+F3_LOAD_LHU = 0b101
+
+F3_JALR = 0b000
+
+ECALL = 0x00000073
+EBREAK = 0x00100073
+
+F3_CSR_RW = 0b001
+F3_CSR_RS = 0b010
+F3_CSR_RC = 0b011
+F3_CSR_RWI = 0b101
+F3_CSR_RSI = 0b110
+F3_CSR_RCI = 0b111
+
+# counter CSRs, user bank read only, machine bank read write
+CSR_CYCLE = 0xc00
+CSR_TIME = 0xc01
+CSR_INSTRET = 0xc02
+CSR_HPMCOUNTER3 = 0xc03
+CSR_CYCLEH = 0xc80
+CSR_TIMEH = 0xc81
+CSR_INSTRETH = 0xc82
+CSR_MCYCLE = 0xb00
+CSR_MINSTRET = 0xb02
+CSR_MHPMCOUNTER3 = 0xb03
+CSR_MCYCLEH = 0xb80
+CSR_MINSTRETH = 0xb82
+# hpm counters of the core
+HPM_TAKEN_BRANCHES = 3
+HPM_MISPREDICTS = 4
+HPM_STALLS = 5
+HPM_CACHE_MISSES = 6
+
+
+class IssError(Exception):
+    pass
+
+
+class Retire(NamedTuple):
+    """One retired instruction, rd is 0 for instructions without a write.
+
+    Compressed instructions are recorded expanded, with a size of 2.
+    """
+    pc: int
+    instruction: int
+    rd: int
+    rd_value: int
+    next_pc: int
+    size: int = 4
+
+
+# execute(pc) -> next pc, None halts the simulation
+Execute = Callable[[int], Optional[int]]
+
+
+def sign_extend(value: int, bits: int) -> int:
+    sign = 1 << (bits-1)
+    return ((value & ((1 << bits)-1)) ^ sign) - sign
+
+
+def imm_i(instruction: int) -> int:
+    return sign_extend(instruction >> 20, 12)
+
+
+def imm_s(instruction: int) -> int:
+    return sign_extend(((instruction >> 25) << 5) | ((instruction >> 7) & 0x1f), 12)
+
+
+def imm_b(instruction: int) -> int:
+    return sign_extend(((instruction >> 31) & 0x1) << 12 |
+                       ((instruction >> 7) & 0x1) << 11 |
+                       ((instruction >> 25) & 0x3f) << 5 |
+                       ((instruction >> 8) & 0xf) << 1, 13)
+
+
+def imm_u(instruction: int) -> int:
+    return instruction & 0xfffff000
+
+
+def imm_j(instruction: int) -> int:
+    return sign_extend(((instruction >> 31) & 0x1) << 20 |
+                       ((instruction >> 12) & 0xff) << 12 |
+                       ((instruction >> 20) & 0x1) << 11 |
+                       ((instruction >> 21) & 0x3ff) << 1, 21)
+
+
+def _signed_lt(a: int, b: int) -> bool:
+    return (a ^ SIGN) < (b ^ SIGN)
+
+
+_BRANCH: Dict[int, Callable[[int, int], bool]] = {
+    isa.F3_BRANCH_BEQ: lambda a, b: a == b,
+    isa.F3_BRANCH_BNE: lambda a, b: a != b,
+    isa.F3_BRANCH_BLT: _signed_lt,
+    isa.F3_BRANCH_BGE: lambda a, b: not _signed_lt(a, b),
+    isa.F3_BRANCH_BLTU: lambda a, b: a < b,
+    isa.F3_BRANCH_BGEU: lambda a, b: a >= b,
+}
+
+def _div(a: int, b: int) -> int:
+    # rounds towards zero, -1 for a zero divisor, the overflow wraps
+    a, b = sign_extend(a, 32), sign_extend(b, 32)
+    if b == 0:
+        return MASK
+    quotient = abs(a) // abs(b)
+    return (-quotient if (a < 0) != (b < 0) else quotient) & MASK
+
+
+def _rem(a: int, b: int) -> int:
+    # the sign of the dividend, the dividend for a zero divisor
+    if b == 0:
+        return a
+    return (sign_extend(a, 32) - sign_extend(_div(a, b), 32) * sign_extend(b, 32)) & MASK
+
+
+# (fun7, fun3) -> operation on two uint32
+_REGREG: Dict[Tuple[int, int], Callable[[int, int], int]] = {
+    (isa.F7_OP_BASE, isa.F3_OP_ADD): lambda a, b: (a + b) & MASK,
+    (isa.F7_OP_ALT, isa.F3_OP_SUB): lambda a, b: (a - b) & MASK,
+    (isa.F7_OP_BASE, isa.F3_OP_SLL): lambda a, b: (a << (b & 0x1f)) & MASK,
+    (isa.F7_OP_BASE, isa.F3_OP_SLT): lambda a, b: int(_signed_lt(a, b)),
+    (isa.F7_OP_BASE, isa.F3_OP_SLTU): lambda a, b: int(a < b),
+    (isa.F7_OP_BASE, isa.F3_OP_XOR): lambda a, b: a ^ b,
+    (isa.F7_OP_BASE, isa.F3_OP_SRL): lambda a, b: a >> (b & 0x1f),
+    (isa.F7_OP_ALT, isa.F3_OP_SRA): lambda a, b: (sign_extend(a, 32) >> (b & 0x1f)) & MASK,
+    (isa.F7_OP_BASE, isa.F3_OP_OR): lambda a, b: a | b,
+    (isa.F7_OP_BASE, isa.F3_OP_AND): lambda a, b: a & b,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_MUL): lambda a, b: (a * b) & MASK,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_MULH): lambda a, b: ((sign_extend(a, 32) * sign_extend(b, 32)) >> 32) & MASK,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_MULHSU): lambda a, b: ((sign_extend(a, 32) * b) >> 32) & MASK,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_MULHU): lambda a, b: (a * b) >> 32,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_DIV): _div,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_DIVU): lambda a, b: a // b if b else MASK,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_REM): _rem,
+    (isa.F7_OP_MULDIV, isa.F3_MULDIV_REMU): lambda a, b: a % b if b else a,
+}
+
+# fun3 -> operation on uint32 data and the sign extended immediate
+_IMM: Dict[int, Callable[[int, int], int]] = {
+    isa.F3_OPIMM_ADDI: lambda a, imm: (a + imm) & MASK,
+    isa.F3_OPIMM_SLTI: lambda a, imm: int(_signed_lt(a, imm & MASK)),
+    isa.F3_OPIMM_SLTIU: lambda a, imm: int(a < (imm & MASK)),
+    isa.F3_OPIMM_XORI: lambda a, imm: a ^ (imm & MASK),
+    isa.F3_OPIMM_ORI: lambda a, imm: a | (imm & MASK),
+    isa.F3_OPIMM_ANDI: lambda a, imm: a & imm & MASK,
+}
+
+# (fun7, fun3) -> shift of uint32 data by a 5 bit amount
+_SHIFT_IMM: Dict[Tuple[int, int], Callable[[int, int], int]] = {
+    (isa.F7_OP_BASE, isa.F3_OPIMM_SLLI): lambda a, shift: (a << shift) & MASK,
+    (isa.F7_OPIMM_SRLI, isa.F3_OPIMM_SRLI): lambda a, shift: a >> shift,
+    (isa.F7_OPIMM_SRAI, isa.F3_OPIMM_SRAI): lambda a, shift: (sign_extend(a, 32) >> shift) & MASK,
+}
+
+
+class Iss:
+    """RV32IM hart with a flat memory of *memory_size* bytes at *base*.
+
+    *compressed* adds the C extension.
+    """
+
+    def __init__(self, memory_size: int = 1 << 20, base: int = 0, reset_pc: Optional[int] = None,
+                 compressed: bool = False):
+        self.base = base
+        self.memory = bytearray(memory_size)
+        self.registers = array("I", [0] * 33)
+        self.pc = base if reset_pc is None else reset_pc
+        self.instret = 0
+        self.halted = False
+        self.compressed = compressed
+        self._alignment = 2 if compressed else 4
+        # csr number -> value, replaced by harnesses that know the counters
+        self.csr_read: Callable[[int], int] = self.read_counter
+        # instruction word or compressed parcel -> (instruction, execute, rd, size),
+        # pc -> the same
+        self._decoded: Dict[int, Tuple[int, Execute, int, int]] = {}
+        self._fetched: Dict[int, Tuple[int, Execute, int, int]] = {}
+
+    # memory access
+
+    def _offset(self, address: int, width: int) -> int:
+        offset = address - self.base
+        if not 0 <= offset <= len(self.memory) - width:
+            raise IssError(f"access of {width} bytes at {address:#010x} outside of memory")
+        return offset
+
+    def load(self, image: bytes, address: Optional[int] = None):
+        """Copy *image* into memory at *address*, the memory base by default."""
+        offset = self._offset(self.base if address is None else address, len(image))
+        memoryview(self.memory)[offset:offset+len(image)] = image
+        self._fetched.clear()
+
+    def read_word(self, address: int) -> int:
+        return _U32.unpack_from(self.memory, self._offset(address, 4))[0]
+
+    def write_word(self, address: int, value: int):
+        _U32.pack_into(self.memory, self._offset(address, 4), value & MASK)
+        self._invalidate(address, 4)
+
+    def _invalidate(self, address: int, width: int):
+        # forget fetched instructions overlapping a written range
+        fetched = self._fetched
+        alignment = self._alignment
+        for pc in range((address + alignment - 4) & -alignment, address + width, alignment):
+            fetched.pop(pc, None)
+
+    # counters
+
+    def read_counter(self, csr: int) -> int:
+        """Counter CSRs of an ideal hart, one cycle per instruction.
+
+        instret is only exact for ``step``, ``run`` updates it at its end.
+        Writes to the counters are ignored, hpm counters read as zero.
+        """
+        if csr & ~0x80 in (CSR_CYCLE, CSR_TIME, CSR_INSTRET, CSR_MCYCLE, CSR_MINSTRET):
+            return self.instret >> 32 if csr & 0x80 else self.instret & MASK
+        return 0
+
+    # decoding
+
+    def _decode(self, instruction: int, size: int = 4) -> Tuple[Execute, int]:
+        """Closure executing *instruction* and the register it writes.
+
+        *size* is the length of the instruction in memory, 2 if it was
+        expanded from a compressed one.
+        """
+        opcode = instruction & 0x7f
+        rd = (instruction >> 7) & 0x1f
+        fun3 = (instruction >> 12) & 0x7
+        rs1 = (instruction >> 15) & 0x1f
+        rs2 = (instruction >> 20) & 0x1f
+        fun7 = instruction >> 25
+        dest = rd or _X0_SINK
+        r = self.registers
+        memory = self.memory
+        offset = self._offset
+        invalidate = self._invalidate
+
+        def illegal() -> IssError:
+            return IssError(f"illegal instruction {instruction:#010x}")
+
+        if opcode == isa.OP_LUI:
+            value = imm_u(instruction)
+
+            def execute(pc):
+                r[dest] = value
+                return (pc + size) & MASK
+
+        elif opcode == isa.OP_AUIPC:
+            value = imm_u(instruction)
+
+            def execute(pc):
+                r[dest] = (pc + value) & MASK
+                return (pc + size) & MASK
+
+        elif opcode == isa.OP_JAL:
+            imm = imm_j(instruction)
+
+            def execute(pc):
+                r[dest] = (pc + size) & MASK
+                return (pc + imm) & MASK
+
+        elif opcode == isa.OP_JALR:
+            if fun3 != F3_JALR:
+                raise illegal()
+            imm = imm_i(instruction)
+
+            def execute(pc):
+                target = (r[rs1] + imm) & 0xfffffffe
+                r[dest] = (pc + size) & MASK
+                return target
+
+        elif opcode == isa.OP_BRANCH:
+            condition = _BRANCH.get(fun3)
+            if condition is None:
+                raise illegal()
+            imm = imm_b(instruction)
+
+            if fun3 == isa.F3_BRANCH_BNE:
+                # loop back edges, avoid the extra call
+                def execute(pc):
+                    if r[rs1] != r[rs2]:
+                        return (pc + imm) & MASK
+                    return (pc + size) & MASK
+            else:
+                def execute(pc):
+                    if condition(r[rs1], r[rs2]):
+                        return (pc + imm) & MASK
+                    return (pc + size) & MASK
+
+        elif opcode == isa.OP_LOAD:
+            imm = imm_i(instruction)
+            load = {F3_LOAD_LB: (_S8, 1), F3_LOAD_LH: (_S16, 2), F3_LOAD_LW: (_U32, 4),
+                    F3_LOAD_LBU: (None, 1), F3_LOAD_LHU: (_U16, 2)}.get(fun3)
+            if load is None:
+                raise illegal()
+            layout, width = load
+
+            if layout is None:
+                def execute(pc):
+                    r[dest] = memory[offset((r[rs1] + imm) & MASK, 1)]
+                    return (pc + size) & MASK
+            else:
+                def execute(pc):
+                    r[dest] = layout.unpack_from(memory, offset((r[rs1] + imm) & MASK, width))[0] & MASK
+                    return (pc + size) & MASK
+
+        elif opcode == isa.OP_STORE:
+            imm = imm_s(instruction)
+            store = {F3_STORE_SB: (0xff, 1), F3_STORE_SH: (0xffff, 2),
+                     F3_STORE_SW: (MASK, 4)}.get(fun3)
+            if store is None:
+                raise illegal()
+            mask, width = store
+            rd = 0
+
+            def execute(pc):
+                address = (r[rs1] + imm) & MASK
+                start = offset(address, width)
+                memory[start:start+width] = (r[rs2] & mask).to_bytes(width, "little")
+                invalidate(address, width)
+                return (pc + size) & MASK
+
+        elif opcode == isa.OP_IMM:
+            if fun3 in (isa.F3_OPIMM_SLLI, isa.F3_OPIMM_SRLI):
+                operation = _SHIFT_IMM.get((fun7, fun3))
+                imm = rs2
+            else:
+                operation = _IMM.get(fun3)
+                imm = imm_i(instruction)
+            if operation is None:
+                raise illegal()
+
+            if fun3 == isa.F3_OPIMM_ADDI:
+                # the most common instruction, avoid the extra call
+                def execute(pc):
+                    r[dest] = (r[rs1] + imm) & MASK
+                    return (pc + size) & MASK
+            else:
+                def execute(pc):
+                    r[dest] = operation(r[rs1], imm)
+                    return (pc + size) & MASK
+
+        elif opcode == isa.OP_REGREG:
+            operation = _REGREG.get((fun7, fun3))
+            if operation is None:
+                raise illegal()
+
+            def execute(pc):
+                r[dest] = operation(r[rs1], r[rs2])
+                return (pc + size) & MASK
+
+        elif opcode == isa.OP_FENCE:
+            rd = 0
+
+            def execute(pc):
+                return (pc + size) & MASK
+
+        elif opcode == isa.OP_ENV and fun3 in (F3_CSR_RW, F3_CSR_RS, F3_CSR_RC,
+                                               F3_CSR_RWI, F3_CSR_RSI, F3_CSR_RCI):
+            csr = instruction >> 20
+
+            def execute(pc):
+                r[dest] = self.csr_read(csr) & MASK
+                return (pc + size) & MASK
+
+        elif instruction in (ECALL, EBREAK):
+            rd = 0
+
+            def execute(pc):
+                return None
+
+        else:
+            raise illegal()
+
+        if opcode == isa.OP_BRANCH:
+            rd = 0
+        return execute, rd
+
+    def _fetch(self, pc: int) -> Tuple[int, Execute, int, int]:
+        fetched = self._fetched.get(pc)
+        if fetched is not None:
+            return fetched
+        if pc & (self._alignment - 1):
+            raise IssError(f"misaligned instruction fetch at {pc:#010x}")
+        if self.compressed:
+            parcel = _U16.unpack_from(self.memory, self._offset(pc, 2))[0]
+            if compressed_model.is_compressed(parcel):
+                decoded = self._decoded.get(parcel)
+                if decoded is None:
+                    instruction = compressed_model.expand(parcel)
+                    if instruction == compressed_model.ILLEGAL:
+                        raise IssError(f"illegal compressed instruction {parcel:#06x}")
+                    decoded = self._decoded[parcel] = (instruction, *self._decode(instruction, 2), 2)
+                fetched = self._fetched[pc] = decoded
+                return fetched
+        instruction = _U32.unpack_from(self.memory, self._offset(pc, 4))[0]
+        decoded = self._decoded.get(instruction)
+        if decoded is None:
+            decoded = self._decoded[instruction] = (instruction, *self._decode(instruction), 4)
+        fetched = self._fetched[pc] = decoded
+        return fetched
+
+    # execution
+
+    def step(self) -> Retire:
+        """Execute one instruction and return its retire record."""
+        if self.halted:
+            raise IssError("hart is halted")
+        pc = self.pc
+        instruction, execute, rd, size = self._fetch(pc)
+        next_pc = execute(pc)
+        self.instret += 1
+        if next_pc is None:
+            self.halted = True
+            next_pc = pc
+        self.pc = next_pc
+        return Retire(pc, instruction, rd, self.registers[rd] if rd else 0, next_pc, size)
+
+    def run(self, max_instructions: int) -> int:
+        """Execute until ECALL/EBREAK or *max_instructions*, returns the count."""
+        fetch = self._fetch
+        fetched = self._fetched
+        pc = self.pc
+        executed = 0
+        if self.halted:
+            return 0
+        while executed < max_instructions:
+            next_pc = (fetched.get(pc) or fetch(pc))[1](pc)
+            executed += 1
+            if next_pc is None:
+                self.halted = True
+                break
+            pc = next_pc
+        self.pc = pc
+        self.instret += executed
+        return executed
+
+    def trace(self, max_instructions: int) -> List[Retire]:
+        """Like run, but returns the retire record of every instruction."""
+        records = []
+        while len(records) < max_instructions and not self.halted:
+            records.append(self.step())
+        return records
+
+    @property
+    def x(self) -> List[int]:
+        """Architectural registers x0 to x31."""
+        return [0] + list(self.registers[1:32])
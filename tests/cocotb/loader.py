@@ -0,0 +1,207 @@
+"""Program images from ELF or Intel hex files for the memory models.
+
+The file is mapped into memory and never read word by word: ELF load
+segments are views into the mapping, Intel hex records are decoded into
+one buffer per contiguous range. ``Image.load_into`` copies every segment
+with a single slice assignment into anything with a ``load(data, address)``
+method, the instruction set simulator and ``LatencyMemory``. The core gets
+its memory from those models over the fetch and cache interfaces, so no
+simulator handle is written to initialize memory and the start of a
+simulation does not depend on the image size.
+"""
+import mmap
+import re
+import struct
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+_ELF_MAGIC = b"\x7fELF"
+_ELFCLASS32 = 1
+_ELFDATA2LSB = 1
+_EM_RISCV = 0xf3
+_PT_LOAD = 1
+
+# e_type .. e_shstrndx after e_ident
+_ELF_HEADER = struct.Struct("<HHIIIIIHHHHHH")
+# p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align
+_PROGRAM_HEADER = struct.Struct("<IIIIIIII")
+
+_HEX_RECORD = re.compile(rb"^:([0-9A-Fa-f]+)\s*$", re.MULTILINE)
+_HEX_DATA = 0x00
+_HEX_END = 0x01
+_HEX_SEGMENT = 0x02
+_HEX_START_SEGMENT = 0x03
+_HEX_LINEAR = 0x04
+_HEX_START_LINEAR = 0x05
+
+
+class ImageError(ValueError):
+    pass
+
+
+class Segment(NamedTuple):
+    """*data* goes to *address*, followed by *zeros* zero bytes (bss)."""
+    address: int
+    data: Union[memoryview, bytes]
+    zeros: int = 0
+
+
+class Image:
+    """Load segments of a program and its entry point.
+
+    Images read from files keep the file mapped until ``close``, use them
+    as context manager.
+    """
+
+    def __init__(self, segments: List[Segment], entry: Optional[int] = None,
+                 mapping: Optional[mmap.mmap] = None):
+        self.segments = segments
+        self.entry = entry
+        self._mapping = mapping
+
+    def span(self) -> Tuple[int, int]:
+        """Lowest address and the address after the highest byte."""
+        if not self.segments:
+            return 0, 0
+        return (min(segment.address for segment in self.segments),
+                max(segment.address + len(segment.data) + segment.zeros
+                    for segment in self.segments))
+
+    def load_into(self, memory):
+        """Copy all segments into *memory*, which has a ``load(data, address)`` method."""
+        for segment in self.segments:
+            memory.load(segment.data, segment.address)
+            if segment.zeros:
+                memory.load(bytes(segment.zeros), segment.address + len(segment.data))
+
+    def close(self):
+        # views into the mapping have to be released before it can be closed
+        for segment in self.segments:
+            if isinstance(segment.data, memoryview):
+                segment.data.release()
+        self.segments = []
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+    def __enter__(self) -> "Image":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _map(path: Union[str, Path]) -> mmap.mmap:
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _parse_elf(mapping: mmap.mmap) -> Image:
+    if len(mapping) < 16 + _ELF_HEADER.size:
+        raise ImageError("truncated ELF header")
+    if mapping[4] != _ELFCLASS32 or mapping[5] != _ELFDATA2LSB:
+        raise ImageError("only little endian 32 bit ELF files are supported")
+    (_, machine, _, entry, phoff, _, _, _,
+     phentsize, phnum, _, _, _) = _ELF_HEADER.unpack_from(mapping, 16)
+    if machine != _EM_RISCV:
+        raise ImageError(f"ELF machine {machine:#x} is not RISC-V")
+    if phnum and phentsize < _PROGRAM_HEADER.size:
+        raise ImageError(f"program header size {phentsize} is too small")
+    if phoff + phnum * phentsize > len(mapping):
+        raise ImageError("truncated program header table")
+
+    view = memoryview(mapping)
+    segments = []
+    for index in range(phnum):
+        (kind, offset, _, address, filesz,
+         memsz, _, _) = _PROGRAM_HEADER.unpack_from(mapping, phoff + index * phentsize)
+        if kind != _PT_LOAD or memsz == 0:
+            continue
+        if offset + filesz > len(mapping):
+            raise ImageError(f"segment {index} extends past the end of the file")
+        # load (physical) addresses, bare metal programs link with vaddr == paddr
+        segments.append(Segment(address, view[offset:offset+filesz], memsz - filesz))
+    view.release()
+    return Image(segments, entry, mapping)
+
+
+def _parse_hex(text: Union[bytes, mmap.mmap]) -> Image:
+    segments: List[Segment] = []
+    data = bytearray()
+    start = 0
+    upper = 0
+    entry = None
+
+    for number, match in enumerate(_HEX_RECORD.finditer(text), 1):
+        record = bytes.fromhex(match.group(1).decode())
+        if len(record) < 5 or len(record) != record[0] + 5:
+            raise ImageError(f"record {number}: bad length")
+        if sum(record) & 0xff:
+            raise ImageError(f"record {number}: bad checksum")
+        kind = record[3]
+        payload = record[4:-1]
+
+        if kind == _HEX_DATA:
+            address = upper + (record[1] << 8 | record[2])
+            if address != start + len(data):
+                if data:
+                    segments.append(Segment(start, bytes(data)))
+                data = bytearray()
+                start = address
+            data += payload
+        elif kind == _HEX_END:
+            break
+        elif kind == _HEX_SEGMENT:
+            upper = int.from_bytes(payload, "big") << 4
+        elif kind == _HEX_LINEAR:
+            upper = int.from_bytes(payload, "big") << 16
+        elif kind == _HEX_START_SEGMENT:
+            entry = (payload[0] << 8 | payload[1]) * 16 + (payload[2] << 8 | payload[3])
+        elif kind == _HEX_START_LINEAR:
+            entry = int.from_bytes(payload, "big")
+        else:
+            raise ImageError(f"record {number}: unknown type {kind:#04x}")
+
+    if data:
+        segments.append(Segment(start, bytes(data)))
+    return Image(segments, entry)
+
+
+def read_image(path: Union[str, Path]) -> Image:
+    """ELF or Intel hex file at *path*, told apart by the ELF magic."""
+    mapping = _map(path)
+    if mapping[:4] == _ELF_MAGIC:
+        return _parse_elf(mapping)
+    try:
+        return _parse_hex(mapping)
+    finally:
+        # hex data was copied out of the mapping
+        mapping.close()
+
+
+def write_hex(path: Union[str, Path], segments: Iterable[Segment],
+              entry: Optional[int] = None, record_bytes: int = 16):
+    """Write *segments* as an Intel hex file, bss is written as zeros."""
+    lines = []
+
+    def record(kind: int, address: int, payload: bytes):
+        raw = bytes([len(payload), address >> 8 & 0xff, address & 0xff, kind]) + payload
+        lines.append(":" + (raw + bytes([-sum(raw) & 0xff])).hex().upper())
+
+    upper = None
+    for segment in segments:
+        data = bytes(segment.data) + bytes(segment.zeros)
+        offset = 0
+        while offset < len(data):
+            address = segment.address + offset
+            # records must not cross a 64 KiB boundary
+            size = min(record_bytes, len(data) - offset, 0x10000 - (address & 0xffff))
+            if address >> 16 != upper:
+                upper = address >> 16
+                record(_HEX_LINEAR, 0, upper.to_bytes(2, "big"))
+            record(_HEX_DATA, address & 0xffff, data[offset:offset+size])
+            offset += size
+    if entry is not None:
+        record(_HEX_START_LINEAR, 0, entry.to_bytes(4, "big"))
+    record(_HEX_END, 0, b"")
+    Path(path).write_text("\n".join(lines) + "\n")
@@ -0,0 +1,203 @@
+"""Lockstep co-simulation of the core against the instruction set simulator.
+
+The harness serves instruction fetches and the line bursts of the caches
+from copies of the program. It watches the register file write port and
+the retired pc of the core. Every instruction the core retires is compared
+against the next retire record of the reference model right away, the
+first mismatch stops the simulation with the last few retirements of both
+sides. Counter CSRs other than instret depend on the timing of the core,
+the model reads the value the core wrote back for them. Those values are
+not compared, only successive reads of cycle and mcycle are checked to
+grow by at least the instructions retired in between.
+"""
+import struct
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+from cocotb.triggers import FallingEdge
+
+import iss
+from memory_model import LatencyMemory
+from perf import PerfCollector
+from utility import generic
+
+_U32 = struct.Struct("<I")
+
+
+class CoreRetire(NamedTuple):
+    """What the core did with one instruction, rd is 0 without a write."""
+    pc: int
+    rd: int
+    rd_value: int
+
+
+class LockstepMismatch(AssertionError):
+    pass
+
+
+def _format(expected: iss.Retire, observed: Optional[CoreRetire]) -> str:
+    line = f"{expected.pc:08x}: {expected.instruction:08x}  "
+    line += f"x{expected.rd:<2} = {expected.rd_value:08x}" if expected.rd else " " * 16
+    if observed is None:
+        return line
+    line += f"  | core {observed.pc:08x}  "
+    line += f"x{observed.rd:<2} = {observed.rd_value:08x}" if observed.rd else ""
+    return line
+
+
+def _mismatch(expected: iss.Retire, observed: CoreRetire) -> Optional[str]:
+    if observed.pc != expected.pc:
+        return f"pc {observed.pc:#010x}, expected {expected.pc:#010x}"
+    if observed.rd != expected.rd:
+        return f"write to x{observed.rd}, expected x{expected.rd}"
+    if expected.rd and observed.rd_value != expected.rd_value:
+        return (f"x{expected.rd} = {observed.rd_value:#010x}, "
+                f"expected {expected.rd_value:#010x}")
+    return None
+
+
+def _csr_writes(instruction: int) -> bool:
+    # csrrw always writes, set and clear only with a source other than x0 or 0
+    fun3 = (instruction >> 12) & 0x3
+    return fun3 == iss.F3_CSR_RW & 0x3 or (instruction >> 15) & 0x1f != 0
+
+
+class Lockstep:
+    """Runs the program in *model* memory on the core and on the model.
+
+    The core has to be out of reset when ``run`` is called. Memory of the
+    model is copied at construction, the core fetches from that copy and
+    its data cache refills from ``data_memory`` after *data_latency* cycles.
+    A core with an instruction cache refills it from ``instruction_memory``
+    after *instruction_latency* cycles instead.
+    Retired instructions are passed on to *perf* when given.
+    """
+
+    def __init__(self, dut, model: iss.Iss, window: int = 16, data_latency: int = 4,
+                 perf: Optional[PerfCollector] = None, instruction_latency: int = 4):
+        self.dut = dut
+        self.model = model
+        self.perf = perf
+        self.memory = bytes(model.memory)
+        self.base = model.base
+        self.data_memory = LatencyMemory(size=len(model.memory), latency=data_latency,
+                                         base=model.base, image=self.memory)
+        self.instruction_memory = LatencyMemory(size=len(model.memory), latency=instruction_latency,
+                                                base=model.base, image=self.memory)
+        self._data_server = None
+        self._instruction_server = None
+        self._observed = CoreRetire(0, 0, 0)
+        # value and instret of the last cycle read, None after a write to mcycle
+        self._cycle_read: Optional[Tuple[int, int]] = None
+        model.csr_read = self._csr_read
+        self.trace: Deque[Tuple[iss.Retire, CoreRetire]] = deque(maxlen=window)
+        self.retired = 0
+        self.cycles = 0
+
+        self._retire = dut.retire_valid
+        self._retire_pc = dut.retire_pc
+        self._address = dut.o_instruction_address
+        self._instruction = dut.i_instruction
+        self._write_enable = dut.register_file.i_write_enable
+        self._dest = dut.register_file.i_selectdest
+        self._data = dut.register_file.i_datadest
+
+    def _fetch(self, address: int):
+        address -= self.base
+        if 0 <= address <= len(self.memory) - 4:
+            self._instruction.value = _U32.unpack_from(self.memory, address)[0]
+        else:
+            # outside of memory, the model reports the error
+            self._instruction.value = 0
+
+    def _observe(self) -> CoreRetire:
+        rd = 0
+        rd_value = 0
+        if self._write_enable.value.is_resolvable and self._write_enable.value.integer:
+            # writes to x0 are dropped by the register file
+            rd = self._dest.value.integer
+            if rd:
+                value = self._data.value
+                rd_value = value.integer if value.is_resolvable else -1
+        return CoreRetire(self._retire_pc.value.integer, rd, rd_value)
+
+    def _csr_read(self, csr: int) -> int:
+        if csr & ~0x80 in (iss.CSR_INSTRET, iss.CSR_MINSTRET):
+            return self.model.read_counter(csr)
+        value = self._observed.rd_value
+        if csr in (iss.CSR_CYCLE, iss.CSR_MCYCLE):
+            self._check_cycle(value)
+        if csr & ~0x80 == iss.CSR_MCYCLE and _csr_writes(self.model.read_word(self.model.pc)):
+            self._cycle_read = None
+        return value
+
+    def _check_cycle(self, value: int):
+        if not self._observed.rd:
+            # not written back, the core value is unknown
+            return
+        instret = self.model.instret
+        if self._cycle_read is not None:
+            last, last_instret = self._cycle_read
+            elapsed = (value - last) & iss.MASK
+            if elapsed < instret - last_instret or elapsed >= 1 << 31:
+                raise self._report(f"cycle went from {last} to {value} over "
+                                   f"{instret - last_instret} instructions")
+        self._cycle_read = value, instret
+
+    def _report(self, reason: str) -> LockstepMismatch:
+        lines = [f"mismatch after {self.retired} instructions, {self.cycles} cycles: {reason}"]
+        lines += [_format(expected, observed) for expected, observed in self.trace]
+        return LockstepMismatch("\n".join(lines))
+
+    async def run(self, max_instructions: int, max_cycles: Optional[int] = None) -> int:
+        """Retire up to *max_instructions*, stops early at ecall/ebreak.
+
+        Returns the number of retired instructions.
+        """
+        if max_cycles is None:
+            max_cycles = 16 * max_instructions + 16
+        clock = self.dut.i_clock
+        stop = self.retired + max_instructions
+        if self._data_server is None:
+            dut = self.dut
+            self._data_server = self.data_memory.serve(
+                clock, dut.o_data_mem_request, dut.o_data_mem_address,
+                dut.i_data_mem_valid, dut.i_data_mem_data, generic("DCACHE_LINE_WORDS", 4),
+                write=dut.o_data_mem_write, write_data=dut.o_data_mem_data)
+        if self._instruction_server is None and generic("ICACHE_SETS", 0) > 0:
+            dut = self.dut
+            self._instruction_server = self.instruction_memory.serve(
+                clock, dut.o_instruction_mem_request, dut.o_instruction_mem_address,
+                dut.i_instruction_mem_valid, dut.i_instruction_mem_data,
+                generic("ICACHE_LINE_WORDS", 4))
+        fetched = None
+
+        while self.retired < stop and not self.model.halted:
+            await FallingEdge(clock)
+            self.cycles += 1
+            if self.cycles > max_cycles:
+                raise self._report(f"no retirement within {max_cycles} cycles")
+
+            address = self._address.value
+            if address.is_resolvable and address.integer != fetched:
+                fetched = address.integer
+                self._fetch(fetched)
+
+            if self._retire.value == 1:
+                observed = self._observed = self._observe()
+                try:
+                    expected = self.model.step()
+                except iss.IssError as error:
+                    raise self._report(f"reference model: {error}") from None
+                self.trace.append((expected, observed))
+                self.retired += 1
+                if self.perf is not None:
+                    self.perf.retire(expected)
+                reason = _mismatch(expected, observed)
+                if reason is not None:
+                    raise self._report(reason)
+        return self.retired
+
+    def window(self) -> List[str]:
+        """The last retirements, formatted like the mismatch report."""
+        return [_format(expected, observed) for expected, observed in self.trace]
@@ -0,0 +1,79 @@
+"""Python side memory for the caches, with a configurable access latency.
+
+The memory answers line refills over the burst interface of the caches:
+the requester holds ``request`` and ``address`` until it got all words of
+the line. *latency* cycles after the request was seen the words follow
+one per cycle with ``valid`` set. Requesters that write lines back set
+``write`` as well, the memory then takes one word per cycle from ``data``
+the requester drives.
+"""
+import struct
+from typing import Optional
+
+import cocotb
+from cocotb.triggers import FallingEdge
+
+_U32 = struct.Struct("<I")
+
+
+class LatencyMemory:
+
+    def __init__(self, size: int = 1 << 16, latency: int = 10, base: int = 0,
+                 image: Optional[bytes] = None):
+        self.memory = bytearray(size)
+        self.latency = latency
+        self.base = base
+        self.bursts = 0
+        self.busy_cycles = 0
+        if image is not None:
+            self.memory[:len(image)] = image
+
+    def load(self, image: bytes, address: Optional[int] = None):
+        """Copy *image* into memory at *address*, the memory base by default."""
+        offset = (self.base if address is None else address) - self.base
+        memoryview(self.memory)[offset:offset+len(image)] = image
+
+    def read_word(self, address: int) -> int:
+        offset = (address - self.base) % len(self.memory)
+        return _U32.unpack_from(self.memory, offset & ~0x3)[0]
+
+    def write_word(self, address: int, value: int):
+        offset = (address - self.base) % len(self.memory)
+        _U32.pack_into(self.memory, offset & ~0x3, value & 0xffffffff)
+
+    def serve(self, clock, request, address, valid, data, line_words: int,
+              write=None, write_data=None):
+        """Answer line refills on the given dut handles until the test ends.
+
+        *write* and *write_data* are the handles of requesters that also
+        write lines back.
+        """
+        return cocotb.start_soon(self._serve(clock, request, address, valid, data, line_words,
+                                             write, write_data))
+
+    async def _serve(self, clock, request, address, valid, data, line_words: int,
+                     write, write_data):
+        valid.value = 0
+        await FallingEdge(clock)
+        while True:
+            if request.value.binstr != "1":
+                await FallingEdge(clock)
+                continue
+
+            line = address.value.integer
+            self.bursts += 1
+            for _ in range(self.latency):
+                await FallingEdge(clock)
+                self.busy_cycles += 1
+            writing = write is not None and write.value.binstr == "1"
+            for word in range(line_words):
+                valid.value = 1
+                if writing:
+                    # the requester shows the word taken on the next edge
+                    self.write_word(line + 4 * word, write_data.value.integer)
+                else:
+                    data.value = self.read_word(line + 4 * word)
+                await FallingEdge(clock)
+                self.busy_cycles += 1
+            # the requester dropped the request on the edge taking the last word
+            valid.value = 0
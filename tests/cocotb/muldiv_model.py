@@ -0,0 +1,54 @@
+"""Vectorized model of the M extension, see multiply_divide_unit.vhdl."""
+import numpy as np
+from alu_model import (F3_MULDIV_MUL, F3_MULDIV_MULH, F3_MULDIV_MULHSU, F3_MULDIV_MULHU,
+                       F3_MULDIV_DIV, F3_MULDIV_DIVU, F3_MULDIV_REM, to_uint32)
+
+MIN_INT = np.uint32(1 << 31)
+ALL_ONES = np.uint32(0xffffffff)
+
+
+def _upper(product: np.ndarray) -> np.ndarray:
+    # bits 63 to 32 of an int64 or uint64 product
+    return (product.view(np.uint64) >> np.uint64(32)).astype(np.uint32)
+
+
+def evaluate(fun3, s1, s2) -> np.ndarray:
+    """Result of the M instruction *fun3* for whole arrays of operands.
+
+    Scalars are broadcast against the arrays, signed python ints are
+    interpreted as two's complement.
+    """
+    fun3, s1, s2 = np.broadcast_arrays(
+        *(np.atleast_1d(to_uint32(value)) for value in (fun3, s1, s2)))
+    signed_s1 = s1.view(np.int32).astype(np.int64)
+    signed_s2 = s2.view(np.int32).astype(np.int64)
+    unsigned_s1 = s1.astype(np.int64)
+    unsigned_s2 = s2.astype(np.int64)
+
+    zero = s2 == 0
+    overflow = (s1 == MIN_INT) & (s2 == ALL_ONES)
+    # keep numpy from dividing by zero, those rows are selected away
+    safe_signed = np.where(zero | overflow, 1, signed_s2)
+    safe_unsigned = np.where(zero, 1, unsigned_s2)
+    # division rounds towards zero, the remainder has the sign of the dividend
+    magnitude = np.abs(signed_s1) // np.abs(safe_signed)
+    quotient = np.where((signed_s1 < 0) != (safe_signed < 0), -magnitude, magnitude)
+    remainder = signed_s1 - quotient * safe_signed
+
+    return np.select(
+        [fun3 == F3_MULDIV_MUL,
+         fun3 == F3_MULDIV_MULH,
+         fun3 == F3_MULDIV_MULHSU,
+         fun3 == F3_MULDIV_MULHU,
+         fun3 == F3_MULDIV_DIV,
+         fun3 == F3_MULDIV_DIVU,
+         fun3 == F3_MULDIV_REM],
+        [s1 * s2,
+         _upper(signed_s1 * signed_s2),
+         _upper(signed_s1 * unsigned_s2),
+         _upper(s1.astype(np.uint64) * s2.astype(np.uint64)),
+         np.where(zero, ALL_ONES, np.where(overflow, MIN_INT, to_uint32(quotient))),
+         np.where(zero, ALL_ONES, (unsigned_s1 // safe_unsigned).astype(np.uint32)),
+         np.where(zero, s1, np.where(overflow, np.uint32(0), to_uint32(remainder)))],
+        # REMU
+        np.where(zero, s1, (unsigned_s1 % safe_unsigned).astype(np.uint32)))
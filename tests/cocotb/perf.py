@@ -0,0 +1,180 @@
+"""Performance report of a core simulation.
+
+The collector never samples per clock cycle from Python. Cycles come from
+the simulation time, the control unit phase is only read when it changes
+and the cycles spent in each phase go into an array indexed by the one hot
+phase value. Retired instructions are fed in by the lockstep harness, which
+reads the retirement anyway: the collector counts branches and appends the
+start of every basic block entered to an array, aggregated at the end.
+"""
+import json
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import cocotb
+import numpy as np
+from cocotb.triggers import Edge
+from cocotb.utils import get_sim_time
+
+import alu_model as isa
+import iss
+
+PHASES = {0b000000: "RESET", 0b000001: "FETCH", 0b000010: "MEMORY",
+          0b000100: "DECODE", 0b001000: "EXECUTE", 0b010000: "PC"}
+
+
+class Block(NamedTuple):
+    """Basic block starting at pc, how often it was entered and its instructions."""
+    pc: int
+    entries: int
+    instructions: int
+
+
+class PerfReport(NamedTuple):
+    cycles: int
+    instructions: int
+    # cycles per control unit phase, empty for the pipelined core
+    phases: Dict[str, int]
+    branches_taken: int
+    branches_not_taken: int
+    jumps: int
+    # blocks with the most retired instructions first
+    hot_blocks: List[Block]
+
+    @property
+    def cpi(self) -> float:
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+    def to_dict(self) -> dict:
+        report = self._asdict()
+        report["cpi"] = self.cpi
+        report["hot_blocks"] = [block._asdict() for block in self.hot_blocks]
+        return report
+
+    def format(self) -> str:
+        lines = [f"{self.cycles} cycles, {self.instructions} instructions, CPI {self.cpi:.3f}",
+                 f"branches {self.branches_taken} taken, {self.branches_not_taken} not taken, "
+                 f"{self.jumps} jumps"]
+        if self.phases:
+            lines.append("phases " + ", ".join(f"{name} {cycles}" for name, cycles in self.phases.items()))
+        for block in self.hot_blocks:
+            lines.append(f"  {block.pc:08x}: {block.instructions} instructions, {block.entries} entries")
+        return "\n".join(lines)
+
+
+class PerfCollector:
+    """Collects the report of one run, from ``start`` to ``stop``.
+
+    *phase* is the control unit phase signal, None for cores without one.
+    """
+
+    def __init__(self, clock_period_ns: float = 1.0, phase=None, hot_blocks: int = 10):
+        self.period = clock_period_ns
+        self.phase = phase
+        self.hot_blocks = hot_blocks
+
+        self._phase_time = np.zeros(64, dtype=np.float64)
+        self._phase_task = None
+        self._phase_since = 0.0
+        self._start = 0.0
+        self.instructions = 0
+        self.branches_taken = 0
+        self.branches_not_taken = 0
+        self.jumps = 0
+        # one entry per basic block entered, its start and its retired instructions
+        self._block_starts = array("I")
+        self._block_lengths = array("I")
+        self._block_length = 0
+
+    def start(self):
+        self._start = get_sim_time(units="ns")
+        if self.phase is not None:
+            self._phase_task = cocotb.start_soon(self._track_phase())
+
+    def _account_phase(self, value, now: float):
+        # the phase had *value* since the last change
+        if value.is_resolvable:
+            self._phase_time[value.integer & 0x3f] += now - self._phase_since
+        self._phase_since = now
+
+    async def _track_phase(self):
+        self._phase_since = self._start
+        value = self.phase.value
+        while True:
+            await Edge(self.phase)
+            self._account_phase(value, get_sim_time(units="ns"))
+            value = self.phase.value
+
+    def retire(self, record: iss.Retire):
+        """Account for one retired instruction of the reference model."""
+        self.instructions += 1
+        if self._block_length == 0:
+            self._block_starts.append(record.pc)
+        self._block_length += 1
+
+        opcode = record.instruction & 0x7f
+        sequential = record.next_pc == (record.pc + record.size) & iss.MASK
+        if opcode == isa.OP_BRANCH:
+            if sequential:
+                self.branches_not_taken += 1
+            else:
+                self.branches_taken += 1
+        elif opcode in (isa.OP_JAL, isa.OP_JALR):
+            self.jumps += 1
+        if not sequential or opcode in (isa.OP_BRANCH, isa.OP_JAL, isa.OP_JALR):
+            # the next instruction starts a new block
+            self._block_lengths.append(self._block_length)
+            self._block_length = 0
+
+    def stop(self) -> PerfReport:
+        now = get_sim_time(units="ns")
+        if self._phase_task is not None:
+            self._phase_task.kill()
+            self._phase_task = None
+            self._account_phase(self.phase.value, now)
+        if self._block_length:
+            self._block_lengths.append(self._block_length)
+            self._block_length = 0
+
+        phases = {}
+        if self.phase is not None:
+            phases = {name: int(round(self._phase_time[value] / self.period))
+                      for value, name in PHASES.items()}
+        return PerfReport(
+            cycles=int(round((now - self._start) / self.period)),
+            instructions=self.instructions,
+            phases=phases,
+            branches_taken=self.branches_taken,
+            branches_not_taken=self.branches_not_taken,
+            jumps=self.jumps,
+            hot_blocks=self._hot(),
+        )
+
+    def _hot(self) -> List[Block]:
+        if not self._block_starts:
+            return []
+        starts = np.frombuffer(self._block_starts, dtype=np.uint32)
+        lengths = np.frombuffer(self._block_lengths, dtype=np.uint32)
+        pcs, index, entries = np.unique(starts, return_inverse=True, return_counts=True)
+        instructions = np.bincount(index, weights=lengths, minlength=len(pcs))
+        order = np.argsort(-instructions, kind="stable")[:self.hot_blocks]
+        return [Block(int(pcs[i]), int(entries[i]), int(instructions[i])) for i in order]
+
+
+def variant() -> str:
+    """Generics of the running simulation, as the runners name variants."""
+    generics = sorted((name[len("GENERIC_"):], value) for name, value in os.environ.items()
+                      if name.startswith("GENERIC_"))
+    return "-".join(f"{name}={value}" for name, value in generics) or "default"
+
+
+def write_report(report: PerfReport, name: str, directory: Optional[Path] = None) -> Path:
+    """Write *report* as JSON to PERF_DIR, sim_build/perf by default."""
+    if directory is None:
+        directory = Path(os.environ.get("PERF_DIR", Path(__file__).resolve().parent / "sim_build" / "perf"))
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}-{variant()}.json"
+    path.write_text(json.dumps(report.to_dict(), indent=2) + "\n")
+    return path
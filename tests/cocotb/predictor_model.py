@@ -0,0 +1,122 @@
+"""Models of the branch predictors of the pipelined core.
+
+``BranchTargetBuffer`` mirrors branch_target_buffer.vhdl entry by entry.
+``evaluate`` replays the retire records of the instruction set simulator
+through the predictors and estimates the cycles lost to branches. It
+updates the buffer right after each branch, the core only does so when
+the branch leaves execute, which makes no difference for loops.
+"""
+from typing import Iterable, List, NamedTuple, Tuple
+
+import alu_model as isa
+import iss
+
+WEAKLY_TAKEN = 0b10
+
+# cycles lost by the pipeline for a correctly predicted taken branch
+STATIC_TAKEN_PENALTY = 1
+MISPREDICT_PENALTY = 2
+
+
+class Branch(NamedTuple):
+    pc: int
+    op_code: int
+    offset: int
+    taken: bool
+    target: int
+
+
+class PredictionStats(NamedTuple):
+    branches: int
+    correct: int
+    cycles_lost: int
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.branches if self.branches else 1.0
+
+
+class BranchTargetBuffer:
+
+    def __init__(self, entries: int = 16, compressed: bool = False):
+        if entries & (entries - 1):
+            raise ValueError(f"entries has to be a power of two, got {entries}")
+        self.entries = entries
+        # with compressed instructions two of them can share a word
+        self.offset_bits = 1 if compressed else 2
+        self.valid = [False] * entries
+        self.tags = [0] * entries
+        self.targets = [0] * entries
+        self.counters = [WEAKLY_TAKEN] * entries
+
+    def _index_tag(self, pc: int) -> Tuple[int, int]:
+        word = pc >> self.offset_bits
+        return word % self.entries, word // self.entries
+
+    def lookup(self, pc: int) -> Tuple[bool, int]:
+        """Predicted direction and the target of the entry for *pc*."""
+        index, tag = self._index_tag(pc)
+        hit = self.valid[index] and self.tags[index] == tag
+        return hit and self.counters[index] >= WEAKLY_TAKEN, self.targets[index]
+
+    def update(self, pc: int, taken: bool, target: int):
+        index, tag = self._index_tag(pc)
+        if self.valid[index] and self.tags[index] == tag:
+            if taken:
+                self.counters[index] = min(self.counters[index] + 1, 3)
+                self.targets[index] = target
+            else:
+                self.counters[index] = max(self.counters[index] - 1, 0)
+        elif taken:
+            self.valid[index] = True
+            self.tags[index] = tag
+            self.targets[index] = target
+            self.counters[index] = WEAKLY_TAKEN
+
+
+def branches(trace: Iterable[iss.Retire]) -> List[Branch]:
+    """The jumps and branches of a trace with their outcome."""
+    result = []
+    for record in trace:
+        op_code = record.instruction & 0x7f
+        if op_code == isa.OP_BRANCH:
+            offset = iss.imm_b(record.instruction)
+        elif op_code == isa.OP_JAL:
+            offset = iss.imm_j(record.instruction)
+        elif op_code == isa.OP_JALR:
+            offset = 0
+        else:
+            continue
+        taken = record.next_pc != (record.pc + 4) & iss.MASK
+        result.append(Branch(record.pc, op_code, offset, taken, record.next_pc))
+    return result
+
+
+def static_prediction(branch: Branch) -> bool:
+    """Backward taken, forward not taken, jumps taken, JALR not predicted."""
+    if branch.op_code == isa.OP_JAL:
+        return True
+    return branch.op_code == isa.OP_BRANCH and branch.offset < 0
+
+
+def evaluate(trace: Iterable[iss.Retire], btb_entries: int = 0,
+             static: bool = True) -> PredictionStats:
+    btb = BranchTargetBuffer(btb_entries) if btb_entries else None
+    count = correct = cycles_lost = 0
+    for branch in branches(trace):
+        count += 1
+        predicted, target, penalty = False, 0, 0
+        if btb is not None:
+            predicted, target = btb.lookup(branch.pc)
+        if not predicted and static and static_prediction(branch):
+            predicted, target, penalty = True, branch.target, STATIC_TAKEN_PENALTY
+
+        if predicted == branch.taken and (not predicted or target == branch.target):
+            correct += 1
+            cycles_lost += penalty
+        else:
+            cycles_lost += MISPREDICT_PENALTY
+
+        if btb is not None:
+            btb.update(branch.pc, branch.taken, branch.target)
+    return PredictionStats(count, correct, cycles_lost)
@@ -0,0 +1,32 @@
+"""Model of multiport_register_file.vhdl, one clock edge at a time."""
+from typing import List, Sequence, Tuple
+
+
+class RegisterFile:
+
+    def __init__(self, read_ports: int, write_ports: int, bypass: bool):
+        self.read_ports = read_ports
+        self.write_ports = write_ports
+        self.bypass = bypass
+        self.registers = [0] * 32
+        self.outputs: List[int] = [0] * read_ports
+
+    def _written(self, writes: Sequence[Tuple[bool, int, int]]) -> dict:
+        # register -> value, the highest port writing a register wins
+        written = {}
+        for enable, dest, data in writes:
+            if enable and dest != 0:
+                written[dest] = data
+        return written
+
+    def clock(self, selects: Sequence[int], writes: Sequence[Tuple[bool, int, int]],
+              enable: bool = True) -> List[int]:
+        """Read ports after a rising edge with *selects* and (enable, dest, data) *writes*."""
+        if not enable:
+            return self.outputs
+        written = self._written(writes)
+        self.outputs = [written[select] if self.bypass and select in written
+                        else self.registers[select] for select in selects]
+        for dest, data in written.items():
+            self.registers[dest] = data
+        return self.outputs
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Build every toplevel once and run the cocotb tests on all cores.
+
+The shared sources are imported into a single GHDL work library, so
+constants.vhdl and friends are analyzed once for all toplevels, and
+toplevels whose sources did not change are not rebuilt at all. The
+simulations then fan out per toplevel and test function to a process
+pool and the individual result files are merged into one JUnit report.
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from cocotb.runner import get_runner
+
+import build_cache
+
+PROJ_PATH = Path(__file__).resolve().parent
+SRC_PATH = PROJ_PATH.parent.parent / "src"
+BUILD_DIR = build_cache.BUILD_DIR
+BUILD_ARGS = ["--std=08"]
+
+# toplevel -> (test module, vhdl sources besides constants.vhdl)
+TOPLEVELS: Dict[str, tuple] = {
+    "alu": ("test_alu", ["alu.vhdl"]),
+    "decoder": ("test_decoder", ["decoder.vhdl"]),
+    "pc": ("test_pc", ["pc.vhdl"]),
+    "control_unit": ("test_control_unit", ["control_unit.vhdl"]),
+    "branch_predictor": ("test_branch_predictor", ["branch_predictor.vhdl"]),
+    "branch_target_buffer": ("test_branch_target_buffer", ["branch_target_buffer.vhdl"]),
+    "instruction_cache": ("test_instruction_cache", ["instruction_cache.vhdl"]),
+    "load_store_unit": ("test_load_store_unit", ["data_cache.vhdl", "load_store_unit.vhdl"]),
+    "csr_unit": ("test_csr_unit", ["csr_unit.vhdl"]),
+    "branch_unit": ("test_branch_unit", ["branch_unit.vhdl"]),
+    "multiport_register_file": ("test_multiport_register_file", ["multiport_registerfile.vhdl"]),
+    "multiply_divide_unit": ("test_multiply_divide_unit", ["multiply_divide_unit.vhdl"]),
+    "compressed_expander": ("test_compressed_expander", ["compressed_expander.vhdl"]),
+    "core": ("test_core", ["multiport_registerfile.vhdl", "registerfile.vhdl", "alu.vhdl", "decoder.vhdl", "pc.vhdl",
+                           "control_unit.vhdl", "branch_predictor.vhdl",
+                           "branch_target_buffer.vhdl", "instruction_cache.vhdl",
+                           "data_cache.vhdl",
+                           "load_store_unit.vhdl", "csr_unit.vhdl", "branch_unit.vhdl",
+                           "multiply_divide_unit.vhdl", "compressed_expander.vhdl", "core.vhdl"]),
+}
+
+# toplevel -> generic values to run the tests with, default is one run with the defaults
+VARIANTS: Dict[str, List[Dict[str, str]]] = {
+    "core": [{}, {"PIPELINED": "true"},
+             {"PIPELINED": "true", "STATIC_PREDICTION": "false"},
+             {"PIPELINED": "true", "BTB_ENTRIES": "16"},
+             {"PIPELINED": "true", "SHARED_ALU": "true"},
+             {"PIPELINED": "true", "RESOLVE_IN_DECODE": "true"},
+             {"PIPELINED": "true", "SINGLE_CYCLE_DIVIDE": "true"},
+             {"PIPELINED": "true", "COMPRESSED": "true"},
+             {"PIPELINED": "true", "COMPRESSED": "true", "BTB_ENTRIES": "16"},
+             {"PIPELINED": "true", "ICACHE_SETS": "16"},
+             {"PIPELINED": "true", "COMPRESSED": "true", "ICACHE_SETS": "4", "ICACHE_WAYS": "2"}],
+    "alu": [{}, {"SHARED_DATAPATH": "true"}],
+    "multiply_divide_unit": [{}, {"SINGLE_CYCLE_DIVIDE": "true"}],
+    "branch_target_buffer": [{"ENTRIES": "16", "COMPRESSED": "false"},
+                             {"ENTRIES": "16", "COMPRESSED": "true"}],
+    "instruction_cache": [{"LINE_WORDS": "4", "SETS": "16", "WAYS": "1"},
+                          {"LINE_WORDS": "4", "SETS": "16", "WAYS": "2"}],
+    "load_store_unit": [{"STORE_BUFFER_ENTRIES": "4", "LINE_WORDS": "4", "SETS": "16"}],
+    "csr_unit": [{"TIME_DIVIDER": "3"}],
+    "multiport_register_file": [{}, {"BYPASS": "true"},
+                                {"READ_PORTS": "4", "WRITE_PORTS": "2"},
+                                {"READ_PORTS": "4", "WRITE_PORTS": "2", "BYPASS": "true"}],
+}
+
+
+class Job(NamedTuple):
+    toplevel: str
+    test_module: str
+    testcase: Optional[str]
+    parameters: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def variant(self) -> str:
+        return self.toplevel + "".join(f"-{name}={value}" for name, value in self.parameters)
+
+    @property
+    def name(self) -> str:
+        return f"{self.variant}.{self.testcase or 'all'}"
+
+
+def vhdl_sources(toplevel: str) -> List[Path]:
+    _, sources = TOPLEVELS[toplevel]
+    return [SRC_PATH / "constants.vhdl"] + [SRC_PATH / source for source in sources]
+
+
+def testcases(test_module: str) -> List[str]:
+    """Names of the cocotb tests in *test_module*, found without importing it."""
+    tree = ast.parse((PROJ_PATH / f"{test_module}.py").read_text())
+    names = []
+    for node in tree.body:
+        if not isinstance(node, ast.AsyncFunctionDef):
+            continue
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if (isinstance(target, ast.Attribute) and target.attr == "test"
+                    and isinstance(target.value, ast.Name) and target.value.id == "cocotb"):
+                names.append(node.name)
+    return names
+
+
+def build(toplevels: List[str]):
+    # one work library for all toplevels, unchanged toplevels are skipped
+    # and ghdl -m only analyzes outdated units
+    for toplevel in toplevels:
+        build_cache.build(
+            vhdl_sources=vhdl_sources(toplevel),
+            hdl_toplevel=toplevel,
+            build_args=BUILD_ARGS,
+            build_dir=BUILD_DIR
+        )
+
+
+def _run(job: Job) -> Path:
+    log_file = BUILD_DIR / f"{job.name}.log"
+    results_xml = f"{job.name}.results.xml"
+
+    # keep the output of parallel simulations apart
+    with open(log_file, "w") as log:
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+
+        runner = get_runner("ghdl")
+        try:
+            return runner.test(hdl_toplevel=job.toplevel,
+                               hdl_toplevel_lang="vhdl",
+                               test_module=job.test_module,
+                               testcase=job.testcase,
+                               build_dir=BUILD_DIR,
+                               test_args=BUILD_ARGS,
+                               parameters=dict(job.parameters),
+                               # tests read the generics from the environment
+                               extra_env={f"GENERIC_{name}": value
+                                          for name, value in job.parameters},
+                               results_xml=results_xml)
+        except SystemExit:
+            # a crashed simulation is reported by its missing testcases
+            return BUILD_DIR / results_xml
+
+
+def merge_results(results: Dict[Job, Path], output: Path) -> Dict[str, List[int]]:
+    """Merge the per job result files into one JUnit file.
+
+    Returns number of tests and failures per toplevel and generic variant.
+    """
+    root = ET.Element("testsuites")
+    suites: Dict[str, ET.Element] = {}
+    summary: Dict[str, List[int]] = {}
+
+    for job, results_xml in sorted(results.items()):
+        suite = suites.get(job.variant)
+        if suite is None:
+            suite = ET.SubElement(root, "testsuite", name=job.variant)
+            suites[job.variant] = suite
+            summary[job.variant] = [0, 0]
+
+        cases = []
+        if results_xml.is_file():
+            cases = list(ET.parse(results_xml).iter("testcase"))
+        if not cases:
+            case = ET.Element("testcase", name=job.testcase or job.test_module,
+                              classname=job.test_module)
+            ET.SubElement(case, "error", message=f"simulation crashed, see {job.name}.log")
+            cases = [case]
+
+        for case in cases:
+            suite.append(case)
+            summary[job.variant][0] += 1
+            if case.find("failure") is not None or case.find("error") is not None:
+                summary[job.variant][1] += 1
+
+    for variant, suite in suites.items():
+        suite.set("tests", str(summary[variant][0]))
+        suite.set("failures", str(summary[variant][1]))
+
+    ET.ElementTree(root).write(output, encoding="utf-8", xml_declaration=True)
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("toplevels", nargs="*", default=list(TOPLEVELS),
+                        help="toplevels to test, default all")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of parallel simulations")
+    parser.add_argument("--per-module", action="store_true",
+                        help="one simulation per toplevel instead of per test function")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.toplevels)
+
+    jobs = []
+    for toplevel in args.toplevels:
+        test_module, _ = TOPLEVELS[toplevel]
+        for parameters in VARIANTS.get(toplevel, [{}]):
+            parameters = tuple(sorted(parameters.items()))
+            if args.per_module:
+                jobs.append(Job(toplevel, test_module, None, parameters))
+            else:
+                jobs += [Job(toplevel, test_module, testcase, parameters)
+                         for testcase in testcases(test_module)]
+
+    results: Dict[Job, Path] = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(_run, job): job for job in jobs}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    summary = merge_results(results, BUILD_DIR / "results.xml")
+    failed = 0
+    for variant, (num_tests, num_failed) in summary.items():
+        print(f"{variant:<24} {num_tests - num_failed:>4} passed {num_failed:>4} failed")
+        failed += num_failed
+    print(f"{len(jobs)} simulations in {time.perf_counter() - start:.1f}s, "
+          f"results in {BUILD_DIR / 'results.xml'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Seeded random stimulus for the cocotb tests.
+
+Values are drawn in batches from a NumPy Generator, a batch starts with
+the edge cases inside its range (the bounds, 0, 1, -1, 31, 32 and the
+32 bit extremes) so they are never left to chance. Every test gets its
+own generator, seeded from the run seed and the test name: the stimulus
+of a test does not depend on the tests that ran before it in the same
+simulation. The run seed is STIMULUS_SEED, or the RANDOM_SEED cocotb
+logs at startup, and is logged for every test.
+
+A failing row of a streamed test is reported with ``hint``. Running the
+test again with that seed and STIMULUS_REPLAY set as hinted makes
+``replay`` drop every other row, so only the failing vector is simulated.
+Outputs a row does not assign keep the value of an earlier row, for those
+the hint is ``first:row`` and the replay starts at the row that last
+assigned them.
+"""
+import logging
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import cocotb
+import numpy as np
+
+_EDGE_CASES = (0, 1, -1, 31, 32, -(1 << 31), (1 << 31) - 1, (1 << 32) - 1)
+
+_log = logging.getLogger("cocotb.stimulus")
+_current: Optional["Stimulus"] = None
+
+
+def run_seed() -> int:
+    seed = os.environ.get("STIMULUS_SEED")
+    if seed is not None:
+        return int(seed)
+    return cocotb.RANDOM_SEED if cocotb.RANDOM_SEED is not None else 0
+
+
+class Stimulus:
+    """Random values for the test *name*, reproducible from *seed*."""
+
+    def __init__(self, name: str, seed: Optional[int] = None):
+        self.name = name
+        self.seed = run_seed() if seed is None else seed
+        self.generator = np.random.default_rng([self.seed, zlib.crc32(name.encode())])
+
+    def integers(self, low: int, high: int, max_size: int = 100, min_size: int = 10) -> List[int]:
+        """Between *min_size* and *max_size* ints from *low* to *high* inclusive, edge cases first."""
+        size = int(self.generator.integers(min_size, max_size, endpoint=True))
+        edges = list(dict.fromkeys(value for value in (low, high) + _EDGE_CASES
+                                   if low <= value <= high))[:size]
+        values = self.generator.integers(low, high, size - len(edges), endpoint=True)
+        return edges + values.tolist()
+
+    def sized(self, bits: int, max_size: int = 100, min_size: int = 10) -> List[int]:
+        """Unsigned *bits* wide ints, see ``integers``."""
+        return self.integers(0, (1 << bits) - 1, max_size, min_size)
+
+    def words(self, count: int) -> np.ndarray:
+        """*count* uniformly random 32 bit words."""
+        return self.generator.integers(0, 1 << 32, count, dtype=np.uint32)
+
+
+def _test_name() -> str:
+    test = getattr(cocotb.regression_manager, "_test", None)
+    return getattr(test, "__qualname__", "") if test is not None else ""
+
+
+def for_test() -> Stimulus:
+    """Stimulus of the running cocotb test, created on first use."""
+    global _current
+    name = _test_name()
+    if _current is None or _current.name != name:
+        _current = Stimulus(name)
+        _log.info("%s: stimulus seed %d", name, _current.seed)
+    return _current
+
+
+def replay_rows() -> Optional[Tuple[int, int]]:
+    """First and failing row of STIMULUS_REPLAY, which is ``row`` or ``first:row``."""
+    value = os.environ.get("STIMULUS_REPLAY")
+    if value is None:
+        return None
+    first, _, row = value.rpartition(":")
+    return int(first or row), int(row)
+
+
+def replay_row() -> Optional[int]:
+    rows = replay_rows()
+    return None if rows is None else rows[1]
+
+
+def replay(stimuli: Dict[str, object]) -> Dict[str, object]:
+    """*stimuli* reduced to the rows of STIMULUS_REPLAY, unchanged without it.
+
+    Scalars are broadcast against the arrays and kept as they are.
+    """
+    rows = replay_rows()
+    if rows is None:
+        return stimuli
+    first, row = rows
+    return {name: values if np.ndim(values) == 0 else np.asarray(values)[first:row + 1]
+            for name, values in stimuli.items()}
+
+
+def hint(row: int, *assigned: np.ndarray) -> str:
+    """How to run *row* of the current test again.
+
+    *assigned* are masks of the rows that assign held outputs, indexed
+    like *row*. The replay starts at the oldest row whose outputs *row*
+    still holds.
+    """
+    if replay_rows() is not None:
+        return f"replayed row {replay_row()}"
+    first = row
+    for mask in assigned:
+        rows = np.flatnonzero(np.asarray(mask)[:row + 1])
+        if len(rows):
+            first = min(first, int(rows[-1]))
+    rows = f"{first}:{row}" if first < row else f"{row}"
+    return f"replay with STIMULUS_SEED={for_test().seed} STIMULUS_REPLAY={rows}"
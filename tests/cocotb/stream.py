@@ -0,0 +1,85 @@
+from typing import Dict, List
+import cocotb
+import numpy as np
+from cocotb.triggers import ReadOnly, RisingEdge
+
+# Marks samples of outputs that were not resolvable (U, X, Z, ...)
+UNRESOLVED = -1
+
+
+class StreamDriver:
+    """Applies one row of stimuli per clock cycle to a set of dut handles.
+
+    Rows are pre-packed into python ints before the first edge, a handle
+    is only written when its value differs from the previous row.
+    """
+
+    def __init__(self, clock, handles: Dict[str, object]):
+        self.clock = clock
+        self.handles = handles
+
+    def start(self, stimuli: Dict[str, object]):
+        names = list(stimuli)
+        columns = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(stimuli[name], dtype=np.int64))
+              for name in names))
+        rows = list(zip(*(column.tolist() for column in columns)))
+        handles = [self.handles[name] for name in names]
+        return cocotb.start_soon(self._drive(handles, rows))
+
+    async def _drive(self, handles: List[object], rows: List[tuple]):
+        previous = [None] * len(handles)
+        for row in rows:
+            for index, value in enumerate(row):
+                if value != previous[index]:
+                    handles[index].value = value
+            previous = row
+            await RisingEdge(self.clock)
+
+
+class StreamMonitor:
+    """Samples a set of dut handles once per clock cycle.
+
+    Sampling starts *latency* rising edges after start and happens in the
+    read only phase, so registered outputs of that edge are visible.
+    The monitor finishes on the rising edge after the last sample.
+    """
+
+    def __init__(self, clock, handles: Dict[str, object], latency: int = 1):
+        self.clock = clock
+        self.handles = handles
+        self.latency = latency
+        self.samples: Dict[str, np.ndarray] = {}
+
+    def start(self, count: int):
+        return cocotb.start_soon(self._collect(count))
+
+    async def _collect(self, count: int):
+        names = list(self.handles)
+        handles = [self.handles[name] for name in names]
+        columns = [[] for _ in names]
+
+        for _ in range(self.latency):
+            await RisingEdge(self.clock)
+        for _ in range(count):
+            await ReadOnly()
+            for handle, column in zip(handles, columns):
+                value = handle.value
+                column.append(value.integer if value.is_resolvable else UNRESOLVED)
+            # also leaves the read only phase after the last sample
+            await RisingEdge(self.clock)
+
+        self.samples = {name: np.asarray(column, dtype=np.int64)
+                        for name, column in zip(names, columns)}
+
+
+async def stream(clock, inputs: Dict[str, object], outputs: Dict[str, object],
+                 stimuli: Dict[str, object], latency: int = 1) -> Dict[str, np.ndarray]:
+    """Drive all rows of *stimuli* back to back and return the sampled outputs."""
+    count = max(np.size(column) for column in stimuli.values())
+    driver = StreamDriver(clock, inputs)
+    monitor = StreamMonitor(clock, outputs, latency)
+    driver_task = driver.start(stimuli)
+    await monitor.start(count)
+    await driver_task
+    return monitor.samples
@@ -1,17 +1,147 @@
-from typing import List, Optional
+import time
+from typing import Dict, List, NamedTuple, Tuple, Union
 from pathlib import Path
 import cocotb
-from utility import to_32_bit, to_32_bit_unsigned
-from cocotb.runner import get_runner
-from cocotb.triggers import FallingEdge, Timer, RisingEdge
+import numpy as np
+import alu_model
+import stimulus
+from alu_model import AluResult
+from stream import stream
+import build_cache
+from cocotb.triggers import Timer, RisingEdge
 from cocotb.clock import Clock
-from hypothesis.strategies import integers, lists, data
 
-def _generate_ints(min:Optional[int],
-                           max:Optional[int], max_numbers=100) -> List[int]:
-    integer_strat =integers(min_value=min, max_value=max)
-    list_strat = lists(integer_strat,min_size=10,max_size=max_numbers)
-    return list_strat.example()
+
+class Case(NamedTuple):
+    """Rows with every combination of values drawn for the operands."""
+    name: str
+    # a list of op codes is repeated over the rows
+    op_code: Union[int, List[int]]
+    fun3: int = 0
+    fun7: int = 0
+    # operand -> inclusive range of the drawn values
+    operands: Dict[str, Tuple[int, int]] = {}
+    max_numbers: int = 100
+
+
+_INT12 = (-((1<<11)-1), (1<<11)-1)
+_INT31 = (-((1<<30)-1), (1<<30)-1)
+_INT32 = (-((1<<31)-1), (1<<31)-1)
+_UINT31 = (0, (1<<31)-1)
+_UINT32 = (0, (1<<32)-1)
+_NEGATIVE12 = (-((1<<11)-1), -1)
+_SHIFT = (0, (1<<5)-1)
+# branch and jump offsets from the I-type limit to the end of their encodings
+_FAR_BRANCH_OFFSETS = [(1<<11, (1<<12)-2), (-(1<<12), -(1<<11))]
+_FAR_JAL_OFFSETS = [(1<<19, (1<<20)-2), (-(1<<20), -(1<<19))]
+
+CASES: List[Case] = [
+    Case("IMM_ADDI", alu_model.OP_IMM, alu_model.F3_OPIMM_ADDI, operands={"imm": _INT12, "s1": _INT31}),
+    Case("IMM_SLTI", alu_model.OP_IMM, alu_model.F3_OPIMM_SLTI, operands={"imm": _INT12, "s1": _INT31}),
+    Case("IMM_SLTIU_positive_immediate", alu_model.OP_IMM, alu_model.F3_OPIMM_SLTIU,
+         operands={"imm": (0, (1<<11)-1), "s1": _UINT31}),
+    Case("IMM_SLTIU_negative_immediate", alu_model.OP_IMM, alu_model.F3_OPIMM_SLTIU,
+         operands={"imm": _NEGATIVE12, "s1": _UINT31}),
+    Case("IMM_XORI", alu_model.OP_IMM, alu_model.F3_OPIMM_XORI, operands={"imm": _NEGATIVE12, "s1": _UINT31}),
+    Case("IMM_ORI", alu_model.OP_IMM, alu_model.F3_OPIMM_ORI, operands={"imm": _NEGATIVE12, "s1": _UINT31}),
+    Case("IMM_ANDI", alu_model.OP_IMM, alu_model.F3_OPIMM_ANDI, operands={"imm": _NEGATIVE12, "s1": _UINT31}),
+    Case("IMM_SLLI", alu_model.OP_IMM, alu_model.F3_OPIMM_SLLI, operands={"imm": _SHIFT, "s1": _INT32}),
+    Case("IMM_SRLI", alu_model.OP_IMM, alu_model.F3_OPIMM_SRLI, alu_model.F7_OPIMM_SRLI,
+         operands={"imm": _SHIFT, "s1": _INT32}),
+    Case("IMM_SRAI_for_positive_data", alu_model.OP_IMM, alu_model.F3_OPIMM_SRAI, alu_model.F7_OPIMM_SRAI,
+         operands={"imm": _SHIFT, "s1": _UINT31}),
+    Case("IMM_SRAI_for_negative_data", alu_model.OP_IMM, alu_model.F3_OPIMM_SRAI, alu_model.F7_OPIMM_SRAI,
+         operands={"imm": _SHIFT, "s1": (-(1<<31)+1, 0)}),
+    Case("LUI", alu_model.OP_LUI, operands={"imm": (0, (1<<20)-1)}),
+    Case("AUIPC", alu_model.OP_AUIPC, operands={"imm": (0, (1<<20)-1), "pc": _UINT31}),
+    Case("REGREG_ADD", alu_model.OP_REGREG, alu_model.F3_OP_ADD, alu_model.F7_OP_BASE,
+         operands={"s1": _INT31, "s2": _INT31}),
+    Case("REGREG_SUB", alu_model.OP_REGREG, alu_model.F3_OP_SUB, alu_model.F7_OP_ALT,
+         operands={"s1": _INT31, "s2": _INT31}),
+    Case("REGREG_SLT", alu_model.OP_REGREG, alu_model.F3_OP_SLT, alu_model.F7_OP_BASE,
+         operands={"s1": _INT31, "s2": _INT31}),
+    Case("REGREG_SLTU", alu_model.OP_REGREG, alu_model.F3_OP_SLTU, alu_model.F7_OP_BASE,
+         operands={"s1": _UINT32, "s2": _UINT32}),
+    Case("REGREG_OR", alu_model.OP_REGREG, alu_model.F3_OP_OR, alu_model.F7_OP_BASE,
+         operands={"s1": _UINT32, "s2": _UINT32}),
+    Case("REGREG_AND", alu_model.OP_REGREG, alu_model.F3_OP_AND, alu_model.F7_OP_BASE,
+         operands={"s1": _UINT32, "s2": _UINT32}),
+    Case("REGREG_XOR", alu_model.OP_REGREG, alu_model.F3_OP_XOR, alu_model.F7_OP_BASE,
+         operands={"s1": _UINT32, "s2": _UINT32}),
+    Case("REGREG_SLL", alu_model.OP_REGREG, alu_model.F3_OP_SLL, alu_model.F7_OP_BASE,
+         operands={"s1": _INT31, "s2": _SHIFT}),
+    Case("REGREG_SRL", alu_model.OP_REGREG, alu_model.F3_OP_SRL, alu_model.F7_OP_BASE,
+         operands={"s1": _INT31, "s2": _SHIFT}),
+    Case("REGREG_SRA", alu_model.OP_REGREG, alu_model.F3_OP_SRA, alu_model.F7_OP_ALT,
+         operands={"s1": _INT31, "s2": _SHIFT}),
+    Case("JAL", alu_model.OP_JAL, operands={"pc": _UINT31, "imm": (-(1<<19)+1, (1<<19)-1)}),
+    Case("JALR", alu_model.OP_JALR, operands={"pc": _UINT31, "imm": _INT12, "s1": _UINT31},
+         max_numbers=30),
+    Case("LOAD_STORE_address", [alu_model.OP_LOAD, alu_model.OP_STORE],
+         operands={"imm": (-(1<<11), (1<<11)-1), "s1": _UINT32}),
+] + [
+    Case(f"BRANCH_{name}", alu_model.OP_BRANCH, fun3,
+         operands={"pc": _UINT31, "imm": _INT12, "s1": _INT32, "s2": _INT32}, max_numbers=10)
+    for name, fun3 in [("BEQ", alu_model.F3_BRANCH_BEQ), ("BNE", alu_model.F3_BRANCH_BNE),
+                       ("BLT", alu_model.F3_BRANCH_BLT), ("BGE", alu_model.F3_BRANCH_BGE),
+                       ("BLTU", alu_model.F3_BRANCH_BLTU), ("BGEU", alu_model.F3_BRANCH_BGEU)]
+] + [
+    Case(f"JAL_far_{direction}", alu_model.OP_JAL, operands={"pc": _UINT31, "imm": offsets},
+         max_numbers=30)
+    for direction, offsets in zip(["forward", "backward"], _FAR_JAL_OFFSETS)
+] + [
+    Case(f"BRANCH_far_{direction}", alu_model.OP_BRANCH, alu_model.F3_BRANCH_BEQ,
+         operands={"pc": _UINT31, "imm": offsets, "s1": (0, 1)}, max_numbers=10)
+    for direction, offsets in zip(["forward", "backward"], _FAR_BRANCH_OFFSETS)
+]
+
+
+def _grid(*values: List[int]) -> List[np.ndarray]:
+    # every combination of the given operand lists, flattened
+    return [axis.ravel() for axis in
+            np.meshgrid(*(np.asarray(v, dtype=np.int64) for v in values),
+                        indexing="ij")]
+
+def _rows(case: Case, rng: stimulus.Stimulus) -> Dict[str, np.ndarray]:
+    """Stimuli of all rows of *case*, one column per ALU input."""
+    drawn = [rng.integers(low, high, max_size=case.max_numbers)
+             for low, high in case.operands.values()]
+    columns = dict(zip(case.operands, _grid(*drawn)))
+    count = len(next(iter(columns.values())))
+    rows = {"op_code": np.resize(np.asarray(case.op_code, dtype=np.int64), count),
+            "fun3": np.full(count, case.fun3, dtype=np.int64),
+            "fun7": np.full(count, case.fun7, dtype=np.int64)}
+    for operand in ["s1", "s2", "imm", "pc"]:
+        rows[operand] = columns.get(operand, np.zeros(count, dtype=np.int64))
+    return rows
+
+def _mismatches(expected: AluResult, observed: Dict[str, np.ndarray], first_row: int,
+                assigned: AluResult) -> List[str]:
+    """*assigned* are the unheld outputs of all rows, their masks start the replay hints."""
+    checks = [
+        ("o_data_result", expected.data_result, expected.data_result_valid,
+         assigned.data_result_valid),
+        ("o_should_write_result", expected.should_write_result,
+         np.ones_like(expected.should_write_result), None),
+        ("o_should_branch", expected.should_branch, expected.should_branch_valid,
+         assigned.should_branch_valid),
+        ("o_branch_target", expected.branch_target, expected.branch_target_valid,
+         assigned.branch_target_valid),
+    ]
+    failures = []
+    for name, values, valid, assigned_rows in checks:
+        values = values.astype(np.int64)
+        mismatch = valid & (observed[name] != values)
+        if mismatch.any():
+            row = int(np.argmax(mismatch))
+            held = [] if assigned_rows is None else [assigned_rows]
+            failures.append(f"{name} of {int(mismatch.sum())} rows, first row {first_row + row}: "
+                            f"expected {values[row]:#x}, got {observed[name][row]:#x}, "
+                            + stimulus.hint(first_row + row, *held))
+    return failures
+
+def _slice(result: AluResult, start: int, stop: int) -> AluResult:
+    return AluResult(*(column[start:stop] for column in result))
 
 
 async def _enable_and_wait(dut):
@@ -22,806 +152,78 @@ async def _enable_and_wait(dut):
     await RisingEdge(dut.i_clock)
 
 
-
-@cocotb.test()
-async def test_IMM_ADDI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1), ((1<<11)-1))
-    # generate 31 bit ints as data
-    data = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b000 #addi
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(immediate + dat)
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SLTI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1), ((1<<11)-1))
-    # generate 31 bit ints as data
-    data = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b010 #slti
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = 1 if dat<immediate else 0
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SLTIU_positive_immediate(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(0, ((1<<11)-1))
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b011 #sltiu
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = 1 if dat<immediate else 0
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SLTIU_negative_immediate(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1),-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b011 #sltiu
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            extended_imm = to_32_bit_unsigned(immediate)
-            expected_result = 1 if dat<extended_imm else 0
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_XORI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1),-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b100 #xori
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            extended_imm = to_32_bit(immediate)
-            dat32 = to_32_bit(dat)
-            expected_result = extended_imm ^ dat32
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_ORI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1),-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b110 #ori
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            extended_imm = to_32_bit(immediate)
-            dat32 = to_32_bit(dat)
-            expected_result = extended_imm | dat32
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_ANDI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(-((1<<11)-1),-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b111 #andi
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            extended_imm = to_32_bit(immediate)
-            dat32 = to_32_bit(dat)
-            expected_result = extended_imm & dat32
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SLLI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(0,(1<<5)-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(-((1<<31)-1), ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b001 #SLLI
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(dat << immediate)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SRLI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(0,(1<<5)-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(-((1<<31)-1), ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b101 #SRLI
-            dut.i_fun7.value=0b0
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(to_32_bit(dat) >> immediate)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SRAI_for_positive_data(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(0,(1<<5)-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(0, ((1<<31)-1))
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b101 #SRLI
-            dut.i_fun7.value= 1<<5
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(dat >> immediate)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_IMM_SRAI_for_negative_data(dut):
-    await _enable_and_wait(dut)
-
-    # generate 12 bit signed immediates
-    immediates = _generate_ints(0,(1<<5)-1)
-    # generate 31 bit ints as data
-    data = _generate_ints(-(1<<31)+1, 0)
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010011 #op imm
-            dut.i_fun3.value=0b101 #SRLI
-            dut.i_fun7.value= 1<<5
-            dut.i_data_s1.value=dat
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(dat >> immediate)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_LUI(dut):
-    await _enable_and_wait(dut)
-
-    # generate 20 bit immediates
-    immediates = _generate_ints(0,(1<<20)-1)
-
-    for immediate in immediates:
-        dut.i_op_code.value=0b0110111 #op lui
-        dut.i_data_immediate.value=immediate
-
-        await RisingEdge(dut.i_clock)
-        await RisingEdge(dut.i_clock)
-
-        assert dut.o_data_result.value == (immediate << 12)
-        assert dut.o_should_branch.value == 0
-        assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_AUIPC(dut):
-    await _enable_and_wait(dut)
-
-    # generate 20 bit immediates
-    immediates = _generate_ints(0,(1<<20)-1)
-    data = _generate_ints(0,(1<<31)-1)
-
-    for immediate in immediates:
-        for dat in data:
-            dut.i_op_code.value=0b0010111 #op auipc
-            dut.i_data_immediate.value=immediate
-            dut.i_program_counter.value = dat
-    
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit((immediate<<12) + dat)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-
-@cocotb.test()
-async def test_REGREG_ADD(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b000 #addi
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(s1+s2)
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_SUB(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b000 #addi
-            dut.i_fun7.value=0b0100000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(s1-s2)
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-            
-@cocotb.test()
-async def test_REGREG_SLT(dut):
-    await _enable_and_wait(dut)
-
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b010 #slt
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = 1 if s1<s2 else 0
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_SLTU(dut):
-    await _enable_and_wait(dut)
-
-    data_s1 = _generate_ints(0, ((1<<32)-1))
-    data_s2 = _generate_ints(0, ((1<<32)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b011 #slt
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = 1 if s1<s2 else 0
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-
-@cocotb.test()
-async def test_REGREG_OR(dut):
-    await _enable_and_wait(dut)
-
-    data_s1 = _generate_ints(0, ((1<<32)-1))
-    data_s2 = _generate_ints(0, ((1<<32)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b110 #or
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = s1 | s2
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_AND(dut):
-    await _enable_and_wait(dut)
-
-    data_s1 = _generate_ints(0, ((1<<32)-1))
-    data_s2 = _generate_ints(0, ((1<<32)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b111 #and
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = s1 & s2
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-
-@cocotb.test()
-async def test_REGREG_XOR(dut):
-    await _enable_and_wait(dut)
-
-    data_s1 = _generate_ints(0, ((1<<32)-1))
-    data_s2 = _generate_ints(0, ((1<<32)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b100 #xor
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = s1 ^ s2
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_SLL(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(0, ((1<<5)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b001 #sll
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(s1<<s2)
-            assert dut.o_data_result.value == expected_result
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_SRL(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(0, ((1<<5)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b101 #srl
-            dut.i_fun7.value=0b0000000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit((to_32_bit(s1))>>s2)
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_REGREG_SRA(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    data_s1 = _generate_ints(-((1<<30)-1), ((1<<30)-1))
-    data_s2 = _generate_ints(0, ((1<<5)-1))
-
-    for s1 in data_s1:
-        for s2 in data_s2:
-            dut.i_op_code.value=0b0110011 #op regreg
-            dut.i_fun3.value=0b101 #srl
-            dut.i_fun7.value=0b0100000
-            dut.i_data_s1.value=s1
-            dut.i_data_s2.value=s2
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            expected_result = to_32_bit(s1>>s2)
-            assert bin(dut.o_data_result.value) == bin(expected_result)
-            assert dut.o_should_branch.value == 0
-            assert dut.o_should_write_result.value == 1
-
-@cocotb.test()
-async def test_JAL(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data
-    program_counter = _generate_ints(0, (1<<31)-1)
-    immediates = _generate_ints(-(1<<19)+1, (1<<19)-1)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            dut.i_op_code.value=0b1101111 #op JAL
-            dut.i_program_counter.value=pc
-            dut.i_data_immediate.value=immediate
-
-            await RisingEdge(dut.i_clock)
-            await RisingEdge(dut.i_clock)
-
-            assert dut.o_data_result.value == pc + 4
-            assert dut.o_should_branch.value == 1
-            assert dut.o_should_write_result.value == 1
-            assert dut.o_branch_target.value == to_32_bit(pc+immediate)
-
 @cocotb.test()
-async def test_JALR(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1)
-    data_s1 = _generate_ints(0, (1<<31)-1)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data in data_s1:
-                dut.i_op_code.value=0b1100111 #op JALR
-                dut.i_program_counter.value=pc
-                dut.i_data_s1.value=data
-                dut.i_data_immediate.value=immediate
-    
-                await RisingEdge(dut.i_clock)
-                await RisingEdge(dut.i_clock)
-    
-                assert dut.o_data_result.value == pc + 4
-                assert dut.o_should_branch.value == 1
-                assert dut.o_should_write_result.value == 1
-                expected_result = to_32_bit(data+immediate) & 0xFFFFFFFE
-                assert dut.o_branch_target.value == expected_result
-
-@cocotb.test()
-async def test_BRANCH_BEQ(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b000 #op BEQ
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = data1 == data2
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
-
-@cocotb.test()
-async def test_BRANCH_BNE(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b001 #op BNE
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = data1 != data2
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
-
-@cocotb.test()
-async def test_BRANCH_BLT(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b100 #op BLT
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = data1 < data2
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
-
-@cocotb.test()
-async def test_BRANCH_BGE(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b101 #op BLT
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = data1 >= data2
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
-
-@cocotb.test()
-async def test_BRANCH_BLTU(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b110 #op BLT
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = to_32_bit_unsigned(data1) < to_32_bit_unsigned(data2)
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
-
-@cocotb.test()
-async def test_BRANCH_BGEU(dut):
-    await _enable_and_wait(dut)
-
-    # generate 31 bit ints as data and pc
-    program_counter = _generate_ints(0, (1<<31)-1, max_numbers=10 )
-    data = _generate_ints(-(1<<31)+1, (1<<31)-1, max_numbers=10)
-    immediates = _generate_ints(-(1<<11)+1, (1<<11)-1, max_numbers=10)
-
-    for pc in program_counter:
-        for immediate in immediates:
-            for data1 in data:
-                for data2 in data:
-                    dut.i_op_code.value=0b1100011 #op BRANCH
-                    dut.i_fun3.value=0b111 #op BLT
-                    dut.i_program_counter.value=pc
-                    dut.i_data_s1.value=data1
-                    dut.i_data_s2.value=data2
-                    dut.i_data_immediate.value=immediate
-        
-                    await RisingEdge(dut.i_clock)
-                    await RisingEdge(dut.i_clock)
-        
-                    should_branch = to_32_bit_unsigned(data1) >= to_32_bit_unsigned(data2)
-                    target = to_32_bit(pc + immediate)
-                    assert dut.o_should_branch.value == should_branch
-                    assert dut.o_should_write_result.value == 0
-                    if should_branch:
-                        assert dut.o_branch_target.value == target
+async def test_alu_regression(dut):
+    """Every case of CASES in one simulation, the failing cases are listed at the end."""
+    await _enable_and_wait(dut)
+    rng = stimulus.for_test()
+
+    # the cases run back to back, so the expected outputs of all rows are
+    # computed at once, outputs not assigned by an op keep their value
+    parts = [_rows(case, rng) for case in CASES]
+    stimuli = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    bounds = np.cumsum([0] + [len(part["op_code"]) for part in parts])
+    segments = [(case.name, start, stop) for case, start, stop in zip(CASES, bounds, bounds[1:])]
+    replayed = stimulus.replay_rows()
+    if replayed is not None:
+        # from the row the failing one holds outputs of, in the case of the failing row
+        first, row = replayed
+        stimuli = stimulus.replay(stimuli)
+        segments = [(name, 0, row - first + 1) for name, start, stop in segments
+                    if start <= row < stop]
+    evaluated = alu_model.evaluate(**stimuli)
+    expected = alu_model.hold(evaluated)
+
+    inputs = {"op_code": dut.i_op_code,
+              "fun3": dut.i_fun3,
+              "fun7": dut.i_fun7,
+              "s1": dut.i_data_s1,
+              "s2": dut.i_data_s2,
+              "imm": dut.i_data_immediate,
+              "pc": dut.i_program_counter}
+    outputs = {"o_data_result": dut.o_data_result,
+               "o_should_write_result": dut.o_should_write_result,
+               "o_should_branch": dut.o_should_branch,
+               "o_branch_target": dut.o_branch_target}
+
+    failed = {}
+    for name, start, stop in segments:
+        begin = time.perf_counter()
+        observed = await stream(dut.i_clock, inputs, outputs,
+                                {column: values[start:stop] for column, values in stimuli.items()})
+        failures = _mismatches(_slice(expected, start, stop), observed,
+                               start if replayed is None else first, evaluated)
+        dut._log.info("%-30s %6d rows %6.2fs %s", name, stop - start,
+                      time.perf_counter() - begin, "FAIL" if failures else "pass")
+        if failures:
+            failed[name] = failures
+
+    assert not failed, "\n".join(f"{name}: {failure}"
+                                  for name, failures in failed.items() for failure in failures)
 
 def test_alu():
     proj_path = Path(__file__).resolve().parent
     src_path = proj_path.parent.parent / "src"
 
-    vhdl_sources = [src_path / "alu.vhdl", 
+    vhdl_sources = [src_path / "alu.vhdl",
                     src_path / "constants.vhdl"]
 
-    runner = get_runner("ghdl")
-    runner.build(
+    runner = build_cache.build(
         vhdl_sources=vhdl_sources,
         hdl_toplevel="alu",
-        always=True,
         build_args=["--std=08"]
     )
 
-    runner.test(hdl_toplevel="alu",
-                test_module="test_alu,",
-                test_args=["--std=08"]
-                )
+    # both datapaths have to give the same outputs
+    for parameters in [{"SHARED_DATAPATH": "false"}, {"SHARED_DATAPATH": "true"}]:
+        name = "_".join(f"{key.lower()}_{value}" for key, value in parameters.items())
+        runner.test(hdl_toplevel="alu",
+                    test_module="test_alu,",
+                    test_args=["--std=08"],
+                    parameters=parameters,
+                    extra_env={f"GENERIC_{key}": value for key, value in parameters.items()},
+                    results_xml=f"results_{name}.xml"
+                    )
 
 if __name__ == "__main__":
     test_alu()
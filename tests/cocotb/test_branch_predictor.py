@@ -0,0 +1,73 @@
+from typing import List
+from pathlib import Path
+import cocotb
+import alu_model
+import build_cache
+import stimulus
+from utility import to_32_bit
+from cocotb.triggers import Timer
+
+def _generate_offsets(bits: int) -> List[int]:
+    # even offsets, the encodings have no bit 0
+    offsets = stimulus.for_test().integers(-(1<<(bits-2)), (1<<(bits-2))-1)
+    return [2*offset for offset in offsets]
+
+def _decoded_immediate(offset: int, bits: int) -> int:
+    # the decoder zero extends the encoded offset
+    return offset & ((1<<bits)-1)
+
+async def _apply(dut, op_code: int, immediate: int, pc: int):
+    dut.i_op_code.value = op_code
+    dut.i_data_immediate.value = immediate
+    dut.i_program_counter.value = pc
+    await Timer(1, units="ns")
+
+@cocotb.test()
+async def test_JAL_predicted_taken(dut):
+    pc = 0x1000
+    for offset in _generate_offsets(21):
+        await _apply(dut, alu_model.OP_JAL, _decoded_immediate(offset, 21), pc)
+        assert dut.o_predict_taken.value == 1
+        assert dut.o_predicted_target.value == to_32_bit(pc + offset)
+
+@cocotb.test()
+async def test_BRANCH_backward_taken_forward_not_taken(dut):
+    pc = 0x1000
+    for offset in _generate_offsets(13):
+        await _apply(dut, alu_model.OP_BRANCH, _decoded_immediate(offset, 13), pc)
+        assert dut.o_predict_taken.value == (1 if offset < 0 else 0)
+        assert dut.o_predicted_target.value == to_32_bit(pc + offset)
+
+@cocotb.test()
+async def test_other_instructions_not_taken(dut):
+    # backward offsets as a branch or JAL, zero extended like the decoder
+    # does and sign extended
+    for immediate in [0x1ffffe, 0xfffffffe]:
+        await _apply(dut, alu_model.OP_BRANCH, immediate, 0x1000)
+        assert dut.o_predict_taken.value == 1
+        for op_code in [alu_model.OP_JALR, alu_model.OP_IMM, alu_model.OP_REGREG,
+                        alu_model.OP_LUI, alu_model.OP_AUIPC, alu_model.OP_LOAD,
+                        alu_model.OP_STORE]:
+            await _apply(dut, op_code, immediate, 0x1000)
+            assert dut.o_predict_taken.value == 0, f"op code {op_code:#x}"
+
+def test_branch_predictor():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "branch_predictor.vhdl",
+                    src_path / "constants.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="branch_predictor",
+        build_args=["--std=08"]
+    )
+
+    runner.test(hdl_toplevel="branch_predictor",
+                test_module="test_branch_predictor,",
+                test_args=["--std=08"]
+                )
+
+if __name__ == "__main__":
+    test_branch_predictor()
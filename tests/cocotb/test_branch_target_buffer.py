@@ -0,0 +1,157 @@
+import random
+from pathlib import Path
+import cocotb
+import asm
+import build_cache
+import predictor_model
+from iss import Iss
+from predictor_model import BranchTargetBuffer
+from utility import generic_flag
+from cocotb.triggers import FallingEdge, ReadOnly, Timer, RisingEdge
+from cocotb.clock import Clock
+
+ENTRIES = 16
+COMPRESSED = generic_flag("COMPRESSED", False)
+
+async def _enable_and_wait(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_enable.value = 1
+    dut.i_reset.value = 1
+    dut.i_update.value = 0
+    dut.i_fetch_pc.value = 0
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await RisingEdge(dut.i_clock)
+
+async def _lookup_and_update(dut, model: BranchTargetBuffer, fetch_pc: int,
+                             update=None):
+    # lookup is combinational, the update happens on the next edge
+    await FallingEdge(dut.i_clock)
+    dut.i_fetch_pc.value = fetch_pc
+    dut.i_update.value = 0 if update is None else 1
+    if update is not None:
+        pc, taken, target = update
+        dut.i_update_pc.value = pc
+        dut.i_update_taken.value = int(taken)
+        dut.i_update_target.value = target
+    await ReadOnly()
+
+    expected_taken, expected_target = model.lookup(fetch_pc)
+    assert dut.o_predict_taken.value == int(expected_taken), f"fetch pc {fetch_pc:#x}"
+    if expected_taken:
+        assert dut.o_predicted_target.value == expected_target, f"fetch pc {fetch_pc:#x}"
+    if update is not None:
+        model.update(*update)
+    return expected_taken
+
+@cocotb.test()
+async def test_empty_buffer_predicts_not_taken(dut):
+    await _enable_and_wait(dut)
+    model = BranchTargetBuffer(ENTRIES, COMPRESSED)
+
+    for pc in range(0, 4*4*ENTRIES, 4):
+        assert not await _lookup_and_update(dut, model, pc)
+
+@cocotb.test()
+async def test_counters_saturate(dut):
+    await _enable_and_wait(dut)
+    model = BranchTargetBuffer(ENTRIES, COMPRESSED)
+
+    pc, target = 0x40, 0x10
+    outcomes = [True] * 4 + [False] * 5 + [True] * 2
+    for taken in outcomes:
+        await _lookup_and_update(dut, model, pc, (pc, taken, target))
+    await _lookup_and_update(dut, model, pc)
+
+@cocotb.test()
+async def test_halves_of_one_word(dut):
+    await _enable_and_wait(dut)
+    model = BranchTargetBuffer(ENTRIES, COMPRESSED)
+
+    # a taken branch in the upper half, a non-branch in the lower half
+    branch_pc, other_pc, target = 0x42, 0x40, 0x10
+    for _ in range(3):
+        await _lookup_and_update(dut, model, branch_pc, (branch_pc, True, target))
+        predicted = await _lookup_and_update(dut, model, other_pc)
+        # without compressed instructions both pcs fall into the same word
+        assert predicted != COMPRESSED
+    assert await _lookup_and_update(dut, model, branch_pc)
+
+@cocotb.test()
+async def test_random_updates_match_model(dut):
+    await _enable_and_wait(dut)
+    model = BranchTargetBuffer(ENTRIES, COMPRESSED)
+    rng = random.Random(10)
+
+    # more branches than entries, aliasing pcs evict each other
+    pcs = [4*rng.randrange(1 << 12) for _ in range(3*ENTRIES)]
+    for _ in range(2000):
+        pc = rng.choice(pcs)
+        update = (pc, rng.random() < 0.7, 4*rng.randrange(1 << 12))
+        await _lookup_and_update(dut, model, rng.choice(pcs), update)
+
+@cocotb.test()
+async def test_prediction_accuracy_on_loops(dut):
+    await _enable_and_wait(dut)
+    model = BranchTargetBuffer(ENTRIES, COMPRESSED)
+
+    # nested loops with a data dependent forward branch and a call
+    program = [
+        asm.addi(10, 0, 20),    # 0x00 outer counter
+        asm.addi(11, 0, 10),    # 0x04 outer: inner counter
+        asm.andi(12, 11, 1),    # 0x08 inner
+        asm.beq(12, 0, 8),      # 0x0c skip every other iteration
+        asm.addi(13, 13, 1),    # 0x10
+        asm.jal(1, 24),         # 0x14 call 0x2c
+        asm.addi(11, 11, -1),   # 0x18
+        asm.bne(11, 0, -20),    # 0x1c back to inner
+        asm.addi(10, 10, -1),   # 0x20
+        asm.bne(10, 0, -32),    # 0x24 back to outer
+        asm.ebreak(),           # 0x28
+        asm.addi(14, 14, 1),    # 0x2c
+        asm.jalr(0, 1, 0),      # 0x30 return
+    ]
+    iss = Iss(memory_size=1 << 12)
+    iss.load(asm.assemble(program))
+    trace = iss.trace(100000)
+    assert iss.halted
+
+    correct = 0
+    branches = predictor_model.branches(trace)
+    for branch in branches:
+        predicted = await _lookup_and_update(dut, model, branch.pc,
+                                             (branch.pc, branch.taken, branch.target))
+        correct += predicted == branch.taken
+
+    static = predictor_model.evaluate(trace, btb_entries=0)
+    dynamic = predictor_model.evaluate(trace, btb_entries=ENTRIES)
+    dut._log.info(f"{len(branches)} branches, btb direction accuracy {correct/len(branches):.1%}")
+    dut._log.info(f"static: accuracy {static.accuracy:.1%}, {static.cycles_lost} cycles lost")
+    dut._log.info(f"btb + static: accuracy {dynamic.accuracy:.1%}, {dynamic.cycles_lost} cycles lost")
+    assert dynamic.cycles_lost < static.cycles_lost
+
+def test_branch_target_buffer():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "branch_target_buffer.vhdl",
+                    src_path / "constants.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="branch_target_buffer",
+        build_args=["--std=08"]
+    )
+
+    for compressed in ["false", "true"]:
+        runner.test(hdl_toplevel="branch_target_buffer",
+                    test_module="test_branch_target_buffer,",
+                    test_args=["--std=08"],
+                    parameters={"ENTRIES": ENTRIES, "COMPRESSED": compressed},
+                    extra_env={"GENERIC_COMPRESSED": compressed},
+                    results_xml=f"results_compressed_{compressed}.xml"
+                    )
+
+if __name__ == "__main__":
+    test_branch_target_buffer()
@@ -0,0 +1,107 @@
+from typing import List
+from pathlib import Path
+import cocotb
+import alu_model
+import asm
+import build_cache
+import decoder_model
+import iss
+import stimulus
+from utility import to_32_bit
+from cocotb.triggers import Timer
+
+BRANCHES = {
+    alu_model.F3_BRANCH_BEQ: asm.beq,
+    alu_model.F3_BRANCH_BNE: asm.bne,
+    alu_model.F3_BRANCH_BLT: asm.blt,
+    alu_model.F3_BRANCH_BGE: asm.bge,
+    alu_model.F3_BRANCH_BLTU: asm.bltu,
+    alu_model.F3_BRANCH_BGEU: asm.bgeu,
+}
+
+def _generate_offsets(bits: int) -> List[int]:
+    # even offsets, the encodings have no bit 0
+    offsets = stimulus.for_test().integers(-(1<<(bits-2)), (1<<(bits-2))-1)
+    return [2*offset for offset in offsets]
+
+def _expected_condition(fun3: int, s1: int, s2: int) -> bool:
+    signed_less = iss.sign_extend(s1, 32) < iss.sign_extend(s2, 32)
+    return {alu_model.F3_BRANCH_BEQ: s1 == s2,
+            alu_model.F3_BRANCH_BNE: s1 != s2,
+            alu_model.F3_BRANCH_BLT: signed_less,
+            alu_model.F3_BRANCH_BGE: not signed_less,
+            alu_model.F3_BRANCH_BLTU: s1 < s2,
+            alu_model.F3_BRANCH_BGEU: s1 >= s2}[fun3]
+
+async def _apply(dut, instruction: int, s1: int, s2: int, pc: int):
+    # the inputs as the decoder drives them for instruction
+    decoded = decoder_model.decode(instruction)
+    dut.i_op_code.value = int(decoded.opcode[0])
+    dut.i_fun3.value = int(decoded.fun3[0])
+    dut.i_data_immediate.value = int(decoded.data_imm[0])
+    dut.i_data_s1.value = s1
+    dut.i_data_s2.value = s2
+    dut.i_program_counter.value = pc
+    await Timer(1, units="ns")
+
+@cocotb.test()
+async def test_JAL_always_taken(dut):
+    values = stimulus.for_test().sized(32, max_size=10, min_size=10)
+    for offset in _generate_offsets(21):
+        pc = values[offset % len(values)] & ~0b11
+        await _apply(dut, asm.jal(1, offset), 0, 0, pc)
+        assert dut.o_should_branch.value == 1
+        assert dut.o_branch_target.value == to_32_bit(pc + offset)
+
+@cocotb.test()
+async def test_JALR_target_from_register(dut):
+    values = stimulus.for_test().sized(32)
+    for offset in stimulus.for_test().integers(-(1<<11), (1<<11)-1):
+        for s1 in values:
+            await _apply(dut, asm.jalr(1, 2, offset), s1, 0, 0x1000)
+            assert dut.o_should_branch.value == 1
+            # JALR clears bit 0 of the target
+            assert dut.o_branch_target.value == to_32_bit(s1 + offset) & ~1
+
+@cocotb.test()
+async def test_BRANCH_conditions(dut):
+    pc = 0x1000
+    values = stimulus.for_test().sized(32, max_size=30)
+    offsets = _generate_offsets(13)
+    for fun3, encode in BRANCHES.items():
+        for s1 in values:
+            for row, s2 in enumerate(values):
+                offset = offsets[row % len(offsets)]
+                await _apply(dut, encode(2, 3, offset), s1, s2, pc)
+                assert dut.o_should_branch.value == _expected_condition(fun3, s1, s2), \
+                    f"fun3 {fun3:03b} s1 {s1:#x} s2 {s2:#x}"
+                assert dut.o_branch_target.value == to_32_bit(pc + offset)
+
+@cocotb.test()
+async def test_other_instructions_not_taken(dut):
+    # equal operands, a BEQ would be taken
+    for instruction in [asm.addi(1, 2, -1), asm.add(1, 2, 3), asm.lui(1, 0xfffff),
+                        asm.auipc(1, 0xfffff), asm.lw(1, 2, -4), asm.sw(1, 2, -4)]:
+        await _apply(dut, instruction, 0, 0, 0x1000)
+        assert dut.o_should_branch.value == 0
+
+def test_branch_unit():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "branch_unit.vhdl",
+                    src_path / "constants.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="branch_unit",
+        build_args=["--std=08"]
+    )
+
+    runner.test(hdl_toplevel="branch_unit",
+                test_module="test_branch_unit,",
+                test_args=["--std=08"]
+                )
+
+if __name__ == "__main__":
+    test_branch_unit()
@@ -0,0 +1,99 @@
+from pathlib import Path
+import cocotb
+import asm
+import build_cache
+import compressed_model
+import stimulus
+from cocotb.triggers import Timer
+
+async def _apply(dut, instruction: int):
+    dut.i_instruction.value = instruction
+    await Timer(1, units="ns")
+
+@cocotb.test()
+async def test_every_compressed_instruction(dut):
+    # the upper half is the start of the next instruction, it must not matter
+    upper = stimulus.for_test().words(1 << 14)
+    failures = []
+    for parcel in range(1 << 16):
+        if not compressed_model.is_compressed(parcel):
+            continue
+        await _apply(dut, (int(upper[parcel % len(upper)]) & 0xffff0000) | parcel)
+        expected = compressed_model.expand(parcel)
+        assert dut.o_compressed.value == 1
+        if dut.o_instruction.value.integer != expected:
+            failures.append(f"{parcel:#06x}: {dut.o_instruction.value.integer:#010x}, "
+                            f"expected {expected:#010x}")
+    assert not failures, "\n".join(failures[:20])
+
+@cocotb.test()
+async def test_encoders_expand_to_their_equivalents(dut):
+    pairs = [(asm.c_addi4spn(8, 1020), asm.addi(8, 2, 1020)),
+             (asm.c_lw(15, 9, 124), asm.lw(15, 9, 124)),
+             (asm.c_sw(8, 15, 64), asm.sw(8, 15, 64)),
+             (asm.c_addi(5, -32), asm.addi(5, 5, -32)),
+             (asm.c_jal(-2048), asm.jal(1, -2048)),
+             (asm.c_j(2046), asm.jal(0, 2046)),
+             (asm.c_li(31, 31), asm.addi(31, 0, 31)),
+             (asm.c_addi16sp(-512), asm.addi(2, 2, -512)),
+             (asm.c_lui(3, -1), asm.lui(3, 0xfffff)),
+             (asm.c_srli(10, 31), asm.srli(10, 10, 31)),
+             (asm.c_srai(11, 1), asm.srai(11, 11, 1)),
+             (asm.c_andi(12, -1), asm.andi(12, 12, -1)),
+             (asm.c_sub(8, 9), asm.sub(8, 8, 9)),
+             (asm.c_xor(10, 11), asm.xor(10, 10, 11)),
+             (asm.c_or(12, 13), asm.or_(12, 12, 13)),
+             (asm.c_and(14, 15), asm.and_(14, 14, 15)),
+             (asm.c_beqz(8, -256), asm.beq(8, 0, -256)),
+             (asm.c_bnez(15, 254), asm.bne(15, 0, 254)),
+             (asm.c_slli(1, 17), asm.slli(1, 1, 17)),
+             (asm.c_lwsp(6, 252), asm.lw(6, 2, 252)),
+             (asm.c_swsp(7, 128), asm.sw(7, 2, 128)),
+             (asm.c_jr(1), asm.jalr(0, 1, 0)),
+             (asm.c_mv(20, 21), asm.add(20, 0, 21)),
+             (asm.c_jalr(5), asm.jalr(1, 5, 0)),
+             (asm.c_add(22, 23), asm.add(22, 22, 23)),
+             (asm.c_ebreak(), asm.ebreak()),
+             (asm.c_nop(), asm.nop())]
+    for compressed, expected in pairs:
+        await _apply(dut, compressed)
+        assert dut.o_compressed.value == 1
+        assert dut.o_instruction.value == expected, f"{compressed:#06x}"
+
+@cocotb.test()
+async def test_reserved_encodings_are_illegal(dut):
+    # zero immediates, rd x0, RV64 only and floating point encodings
+    for parcel in [0x0000, 0x6081, 0x6101, 0x4002, 0x8002, 0x1006, 0x9c21,
+                   0x2000, 0x6000, 0xe000, 0x2002, 0xa002]:
+        await _apply(dut, parcel)
+        assert dut.o_compressed.value == 1
+        assert dut.o_instruction.value == compressed_model.ILLEGAL, f"{parcel:#06x}"
+
+@cocotb.test()
+async def test_32_bit_instructions_pass_unchanged(dut):
+    for word in stimulus.for_test().words(1000):
+        instruction = int(word) | 0b11
+        await _apply(dut, instruction)
+        assert dut.o_compressed.value == 0
+        assert dut.o_instruction.value == instruction
+
+def test_compressed_expander():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "constants.vhdl",
+                    src_path / "compressed_expander.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="compressed_expander",
+        build_args=["--std=08"]
+    )
+
+    runner.test(hdl_toplevel="compressed_expander",
+                test_module="test_compressed_expander,",
+                test_args=["--std=08"]
+                )
+
+if __name__ == "__main__":
+    test_compressed_expander()
@@ -2,10 +2,9 @@ from typing import List, Optional
 from pathlib import Path
 import cocotb
 from utility import to_32_bit, to_32_bit_unsigned
-from cocotb.runner import get_runner
+import build_cache
 from cocotb.triggers import FallingEdge, Timer, RisingEdge
 from cocotb.clock import Clock
-from hypothesis.strategies import integers, lists, data
 
 async def _enable_and_wait(dut):
     cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
@@ -56,6 +55,24 @@ async def test_reset(dut):
     await RisingEdge(dut.i_clock)
     assert dut.o_active_phase.value == 1 # fetch 2
 
+@cocotb.test()
+async def test_stall_holds_phase(dut):
+    dut.i_stall.value = 0
+    await _enable_and_wait(dut)
+
+    while dut.o_active_phase.value != 0b1000: # execute
+        await FallingEdge(dut.i_clock)
+
+    dut.i_stall.value = 1
+    for _ in range(0,5):
+        await FallingEdge(dut.i_clock)
+        assert dut.o_active_phase.value == 0b1000 # still execute
+
+    dut.i_stall.value = 0
+    for phase in [0b10000, 1, 0b100, 0b1000]: # pc, fetch, decode, execute
+        await FallingEdge(dut.i_clock)
+        assert dut.o_active_phase.value == phase
+
 def test_control_unit():
     proj_path = Path(__file__).resolve().parent
     src_path = proj_path.parent.parent / "src"
@@ -63,11 +80,9 @@ def test_control_unit():
     vhdl_sources = [src_path / "control_unit.vhdl", 
                     src_path / "constants.vhdl"]
 
-    runner = get_runner("ghdl")
-    runner.build(
+    runner = build_cache.build(
         vhdl_sources=vhdl_sources,
         hdl_toplevel="control_unit",
-        always=True,
         build_args=["--std=08"]
     )
 
@@ -0,0 +1,479 @@
+import random
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+import cocotb
+import build_cache
+import asm
+import loader
+import iss
+from iss import Iss
+from lockstep import Lockstep
+from perf import PerfCollector, PerfReport, write_report
+from utility import generic_flag
+from cocotb.triggers import Timer, RisingEdge
+from cocotb.clock import Clock
+
+_REGREG = [asm.add, asm.sub, asm.sll, asm.slt, asm.sltu, asm.xor, asm.srl, asm.sra, asm.or_, asm.and_]
+_IMM = [asm.addi, asm.slti, asm.sltiu, asm.xori, asm.ori, asm.andi]
+_SHIFT_IMM = [asm.slli, asm.srli, asm.srai]
+_MULDIV = [asm.mul, asm.mulh, asm.mulhsu, asm.mulhu, asm.div, asm.divu, asm.rem, asm.remu]
+_BRANCH = [asm.beq, asm.bne, asm.blt, asm.bge, asm.bltu, asm.bgeu]
+# (instruction, access size)
+_LOAD = [(asm.lb, 1), (asm.lbu, 1), (asm.lh, 2), (asm.lhu, 2), (asm.lw, 4)]
+_STORE = [(asm.sb, 1), (asm.sh, 2), (asm.sw, 4)]
+
+PIPELINED = generic_flag("PIPELINED", False)
+# the C extension, pipelined only
+COMPRESSED = generic_flag("COMPRESSED", False)
+DATA = 0x8000
+
+
+async def _reset(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_enable.value = 1
+    dut.i_reset.value = 1
+    dut.i_instruction.value = 0
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await RisingEdge(dut.i_clock)
+
+
+async def _run_lockstep(dut, name: str, program: List[int], max_instructions: int = 10000,
+                        image: Optional[loader.Image] = None,
+                        memory_size: int = 1 << 16) -> Tuple[Iss, PerfReport]:
+    """Run *program* at address 0, or *image* when given.
+
+    The performance report of the run is logged and written as *name*.
+    """
+    model = Iss(memory_size=memory_size, compressed=COMPRESSED)
+    if image is None:
+        model.load(asm.assemble(program))
+    else:
+        image.load_into(model)
+    await _reset(dut)
+
+    perf = PerfCollector(phase=None if PIPELINED else dut.active_phase)
+    lockstep = Lockstep(dut, model, perf=perf)
+    perf.start()
+    await lockstep.run(max_instructions)
+    report = perf.stop()
+    assert model.halted, "program did not reach ebreak:\n" + "\n".join(lockstep.window())
+    dut._log.info("%s\n%s", name, report.format())
+    write_report(report, name)
+    return model, report
+
+
+def _random_alu(rng: random.Random) -> int:
+    rd, rs1, rs2 = (rng.randrange(32) for _ in range(3))
+    kind = rng.randrange(5)
+    if kind == 0:
+        return rng.choice(_REGREG)(rd, rs1, rs2)
+    if kind == 1:
+        return rng.choice(_IMM)(rd, rs1, rng.randrange(-2048, 2048))
+    if kind == 2:
+        return rng.choice(_SHIFT_IMM)(rd, rs1, rng.randrange(32))
+    if kind == 3:
+        return asm.lui(rd, rng.randrange(1 << 20))
+    return asm.auipc(rd, rng.randrange(1 << 20))
+
+
+def _random_registers(rng: random.Random) -> List[int]:
+    program = []
+    for register in range(1, 32):
+        program += asm.li(register, rng.randrange(1 << 32))
+    return program
+
+
+def _random_access(rng: random.Random, base: int, span: int, recent: List[int]) -> int:
+    """Aligned load or store relative to the data pointer in *base*."""
+    if rng.randrange(2):
+        instruction, size = rng.choice(_LOAD)
+        rd = rng.randrange(1, base)
+        recent.insert(0, rd)
+        return instruction(rd, base, size * rng.randrange(span // size))
+    instruction, size = rng.choice(_STORE)
+    return instruction(rng.choice(recent[:3] + [rng.randrange(32)]), base, size * rng.randrange(span // size))
+
+
+def _size(instruction: int) -> int:
+    return 2 if isinstance(instruction, asm.Compressed) else 4
+
+
+def _random_compressed(rng: random.Random) -> int:
+    rd, rs2 = rng.randrange(1, 32), rng.randrange(1, 32)
+    # the three bit register fields only reach x8 to x15
+    short, short2 = rng.randrange(8, 16), rng.randrange(8, 16)
+    imm = rng.randrange(-32, 32)
+    kind = rng.randrange(6)
+    if kind == 0:
+        return rng.choice([asm.c_addi, asm.c_li])(rd, imm)
+    if kind == 1:
+        # rd x2 would be c.addi16sp, a zero immediate is reserved
+        return asm.c_lui(rng.choice([r for r in range(1, 32) if r != 2]), imm or 1)
+    if kind == 2:
+        return rng.choice([asm.c_mv, asm.c_add])(rd, rs2)
+    if kind == 3:
+        if rng.randrange(2):
+            return asm.c_slli(rd, rng.randrange(1, 32))
+        return rng.choice([asm.c_srli, asm.c_srai])(short, rng.randrange(1, 32))
+    if kind == 4:
+        return asm.c_andi(short, imm)
+    return rng.choice([asm.c_sub, asm.c_xor, asm.c_or, asm.c_and])(short, short2)
+
+
+@cocotb.test()
+async def test_random_alu_program(dut):
+    rng = random.Random(6)
+    program = _random_registers(rng)
+    program += [_random_alu(rng) for _ in range(300)]
+    program.append(asm.ebreak())
+    await _run_lockstep(dut, "random_alu_program", program)
+
+
+@cocotb.test()
+async def test_random_forward_branches(dut):
+    rng = random.Random(7)
+    program = _random_registers(rng)
+    for _ in range(100):
+        skip = rng.randrange(1, 4)
+        rs1, rs2 = rng.randrange(32), rng.choice([rng.randrange(32), 0])
+        program.append(rng.choice(_BRANCH)(rs1, rs2, 4 * (skip + 1)))
+        program += [_random_alu(rng) for _ in range(skip)]
+    program.append(asm.ebreak())
+    await _run_lockstep(dut, "random_forward_branches", program)
+
+
+@cocotb.test()
+async def test_dependency_chains(dut):
+    # every instruction reads one of the last few results, forwarding and stalls
+    rng = random.Random(8)
+    program = _random_registers(rng)
+    recent = [1, 2, 3, 4]
+    for _ in range(300):
+        rd = rng.randrange(1, 32)
+        rs1, rs2 = rng.choice(recent), rng.choice(recent + [rng.randrange(32)])
+        if rng.randrange(2):
+            program.append(rng.choice(_REGREG)(rd, rs1, rs2))
+        else:
+            program.append(rng.choice(_IMM)(rd, rs1, rng.randrange(-2048, 2048)))
+        recent = [rd] + recent[:3]
+    program.append(asm.ebreak())
+    await _run_lockstep(dut, "dependency_chains", program)
+
+
+@cocotb.test()
+async def test_multiply_divide(dut):
+    # results used right away, zero divisors and the signed overflow among the operands
+    rng = random.Random(11)
+    program = _random_registers(rng)
+    program += asm.li(1, 0) + asm.li(2, 1 << 31) + asm.li(3, -1)
+    recent = [1, 2, 3, 4]
+    for _ in range(200):
+        rd = rng.randrange(1, 32)
+        rs1, rs2 = rng.choice(recent), rng.choice(recent + [rng.randrange(32)])
+        if rng.randrange(2):
+            program.append(rng.choice(_MULDIV)(rd, rs1, rs2))
+        else:
+            program.append(rng.choice(_REGREG)(rd, rs1, rs2))
+        recent = [rd] + recent[:3]
+    program.append(asm.div(4, 2, 3))
+    program.append(asm.rem(5, 2, 1))
+    program.append(asm.ebreak())
+    await _run_lockstep(dut, "multiply_divide", program)
+
+
+@cocotb.test()
+async def test_loop_and_calls(dut):
+    # sum of 1..n in a counting loop, doubled by a subroutine
+    program = [
+        asm.addi(10, 0, 0),     # 0x00 sum
+        asm.addi(11, 0, 50),    # 0x04 n
+        asm.add(10, 10, 11),    # 0x08 loop: sum += n
+        asm.addi(11, 11, -1),   # 0x0c n -= 1
+        asm.bne(11, 0, -8),     # 0x10 until n == 0
+        asm.jal(1, 12),         # 0x14 call double
+        asm.jal(0, 16),         # 0x18 jump over double to end
+        asm.ebreak(),           # 0x1c never reached
+        asm.add(10, 10, 10),    # 0x20 double: sum += sum
+        asm.jalr(0, 1, 0),      # 0x24 return
+        asm.auipc(12, 0),       # 0x28 end
+        asm.lui(13, 0x12345),   # 0x2c
+        asm.ebreak(),           # 0x30
+    ]
+    _, report = await _run_lockstep(dut, "loop_and_calls", program)
+    assert (report.branches_taken, report.branches_not_taken, report.jumps) == (49, 1, 3)
+    assert report.hot_blocks[0] == (0x08, 49, 147)
+    assert report.cycles >= report.instructions
+
+
+@cocotb.test()
+async def test_far_branches_and_jumps(dut):
+    # offsets past the 12 bit branch and 20 bit jump immediates, in both directions
+    segments = [
+        loader.Segment(0x0, asm.assemble([
+            asm.addi(10, 0, 0),         # 0x000
+            asm.beq(0, 0, 4000),        # 0x004 forward to 0xfa4
+            asm.ebreak(),               # 0x008 never reached
+        ])),
+        loader.Segment(0x7a8, asm.assemble([
+            asm.addi(11, 10, 0),        # 0x7a8
+            asm.ebreak(),               # 0x7ac
+        ])),
+        loader.Segment(0xfa4, asm.assemble([
+            asm.addi(10, 10, 1),        # 0xfa4
+            asm.jal(1, 0x80100),        # 0xfa8 call 0x810a8
+            asm.bne(10, 0, -2052),      # 0xfac backward to 0x7a8
+            asm.ebreak(),               # 0xfb0 never reached
+        ])),
+        loader.Segment(0x810a8, asm.assemble([
+            asm.addi(10, 10, 2),        # 0x810a8
+            asm.jal(0, -0x80100),       # 0x810ac back to 0xfac
+        ])),
+    ]
+    model, report = await _run_lockstep(dut, "far_branches_and_jumps", [],
+                                        image=loader.Image(segments), memory_size=1 << 20)
+    assert (model.x[1], model.x[11]) == (0xfac, 3)
+    assert (report.branches_taken, report.jumps) == (2, 2)
+
+
+@cocotb.test()
+async def test_far_branch_loop(dut):
+    # resolved in decode or in execute, the loop spans more than the 12 bit offsets
+    program = [
+        asm.addi(10, 0, 0),         # 0x000 i
+        asm.addi(11, 0, 6),         # 0x004 n
+        asm.andi(12, 10, 1),        # 0x008 loop
+        asm.bne(12, 0, 2100),       # 0x00c odd i forward to 0x840
+        asm.addi(13, 13, 1),        # 0x010 even i
+        asm.jal(0, 2092),           # 0x014 to 0x840
+    ] + [asm.ebreak()] * ((0x840 - 0x18) // 4) + [
+        asm.addi(10, 10, 1),        # 0x840
+        asm.blt(10, 11, -2108),     # 0x844 backward to 0x008
+        asm.ebreak(),               # 0x848
+    ]
+    model, report = await _run_lockstep(dut, "far_branch_loop", program)
+    assert (model.x[10], model.x[13]) == (6, 3)
+    assert (report.branches_taken, report.branches_not_taken, report.jumps) == (8, 4, 3)
+
+
+@cocotb.test()
+async def test_random_loads_and_stores(dut):
+    # loads right before their use, stores of fresh results, all in a few lines
+    rng = random.Random(9)
+    program = _random_registers(rng)
+    program += asm.li(31, DATA)
+    recent = [1, 2, 3]
+    for _ in range(400):
+        if rng.randrange(3):
+            program.append(_random_access(rng, 31, 256, recent))
+        else:
+            rd = rng.randrange(1, 31)
+            program.append(rng.choice(_REGREG)(rd, rng.choice(recent[:3]), rng.randrange(32)))
+            recent.insert(0, rd)
+    program.append(asm.ebreak())
+    await _run_lockstep(dut, "random_loads_and_stores", program)
+
+
+@cocotb.test()
+async def test_stores_evict_dirty_lines(dut):
+    # stores over a range four times the data cache, read back in reverse
+    program = [
+        asm.lui(31, DATA >> 12),    # 0x00 data pointer
+        asm.addi(10, 0, 0),         # 0x04 i
+        asm.addi(11, 0, 1024),      # 0x08 n
+        asm.add(12, 31, 10),        # 0x0c store loop
+        asm.sw(10, 12, 0),          # 0x10 mem[i] = i
+        asm.addi(10, 10, 4),        # 0x14
+        asm.bne(10, 11, -12),       # 0x18
+        asm.addi(13, 0, 0),         # 0x1c sum
+        asm.addi(10, 10, -4),       # 0x20 load loop
+        asm.add(12, 31, 10),        # 0x24
+        asm.lw(14, 12, 0),          # 0x28
+        asm.add(13, 13, 14),        # 0x2c used right after the load
+        asm.bne(10, 0, -16),        # 0x30
+        asm.ebreak(),               # 0x34
+    ]
+    await _run_lockstep(dut, "stores_evict_dirty_lines", program)
+
+
+@cocotb.test()
+async def test_program_from_hex_image(dut):
+    # code and a table in separate segments, the sum goes to bss
+    table = [random.Random(10).randrange(1 << 32) for _ in range(64)]
+    program = [
+        asm.lui(31, DATA >> 12),    # 0x00 table
+        asm.addi(10, 0, 0),         # 0x04 sum
+        asm.addi(11, 31, 256),      # 0x08 end of table
+        asm.lw(12, 31, 0),          # 0x0c loop
+        asm.add(10, 10, 12),        # 0x10
+        asm.addi(31, 31, 4),        # 0x14
+        asm.bne(31, 11, -12),       # 0x18
+        asm.sw(10, 31, 0),          # 0x1c result after the table
+        asm.lw(13, 31, 0),          # 0x20
+        asm.ebreak(),               # 0x24
+    ]
+    segments = [loader.Segment(0, asm.assemble(program)),
+                loader.Segment(DATA, asm.assemble(table), zeros=4)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "program.hex"
+        loader.write_hex(path, segments, entry=0)
+        with loader.read_image(path) as image:
+            await _run_lockstep(dut, "program_from_hex_image", [], image=image)
+
+
+@cocotb.test(skip=not COMPRESSED)
+async def test_random_compressed_program(dut):
+    # every other instruction compressed, so many 32 bit ones cross a word
+    # boundary, forward branches of both sizes land on either halfword
+    rng = random.Random(12)
+    program = _random_registers(rng)
+    for _ in range(150):
+        skip = [_random_compressed(rng) if rng.randrange(2) else _random_alu(rng)
+                for _ in range(rng.randrange(1, 4))]
+        offset = sum(_size(instruction) for instruction in skip)
+        if rng.randrange(2):
+            program.append(rng.choice([asm.c_beqz, asm.c_bnez])(rng.randrange(8, 16), offset + 2))
+        else:
+            rs1, rs2 = rng.randrange(32), rng.choice([rng.randrange(32), 0])
+            program.append(rng.choice(_BRANCH)(rs1, rs2, offset + 4))
+        program += skip
+    program.append(asm.c_ebreak())
+    await _run_lockstep(dut, "random_compressed_program", program)
+
+
+@cocotb.test(skip=not COMPRESSED)
+async def test_compressed_loop_and_calls(dut):
+    # test_loop_and_calls in compressed code, the links are the next halfword
+    program = [
+        asm.c_li(10, 0),            # 0x00 sum
+        asm.addi(11, 0, 50),        # 0x02 n, crosses into the next word
+        asm.c_add(10, 11),          # 0x06 loop: sum += n
+        asm.c_addi(11, -1),         # 0x08 n -= 1
+        asm.c_bnez(11, -4),         # 0x0a until n == 0
+        asm.c_jal(12),              # 0x0c call double
+        asm.jal(0, 18),             # 0x0e return here, crosses, jump to end
+        asm.c_ebreak(),             # 0x12 never reached
+        asm.c_nop(),                # 0x14
+        asm.c_nop(),                # 0x16
+        asm.add(10, 10, 10),        # 0x18 double: sum += sum
+        asm.c_jr(1),                # 0x1c return
+        asm.c_nop(),                # 0x1e
+        asm.c_mv(8, 10),            # 0x20 end
+        asm.lui(9, DATA >> 12),     # 0x22 data pointer
+        asm.c_sw(8, 9, 4),          # 0x26
+        asm.c_lw(12, 9, 4),         # 0x28 used right after the load
+        asm.c_addi(12, 1),          # 0x2a
+        asm.c_mv(2, 9),             # 0x2c stack pointer
+        asm.c_swsp(12, 8),          # 0x2e
+        asm.c_lwsp(13, 8),          # 0x30
+        asm.auipc(14, 0),           # 0x32
+        asm.c_addi(14, 10),         # 0x36
+        asm.c_jalr(14),             # 0x38 call 0x3c
+        asm.c_ebreak(),             # 0x3a never reached
+        asm.c_ebreak(),             # 0x3c
+    ]
+    model, report = await _run_lockstep(dut, "compressed_loop_and_calls", program)
+    assert (model.x[10], model.x[13], model.x[1]) == (2550, 2551, 0x3a)
+    assert (report.branches_taken, report.branches_not_taken, report.jumps) == (49, 1, 4)
+
+
+@cocotb.test()
+async def test_counters(dut):
+    # instret is checked in lockstep, the model takes the other counters from
+    # the core and does not compare them, they are checked here
+    program = [
+        asm.csrr(5, iss.CSR_INSTRET),       # 0x00
+        asm.csrr(6, iss.CSR_HPMCOUNTER3),   # 0x04 taken branches
+        asm.addi(10, 0, 20),                # 0x08
+        asm.addi(10, 10, -1),               # 0x0c loop
+        asm.bne(10, 0, -4),                 # 0x10 taken 19 times
+        asm.csrr(7, iss.CSR_HPMCOUNTER3),   # 0x14
+        asm.csrr(8, iss.CSR_CYCLE),         # 0x18
+        asm.csrr(9, iss.CSR_INSTRET),       # 0x1c
+        asm.csrrwi(0, iss.CSR_MCYCLE, 0),   # 0x20
+        asm.csrr(11, iss.CSR_CYCLE),        # 0x24
+        asm.csrr(12, iss.CSR_INSTRETH),     # 0x28
+        asm.addi(13, 0, 0x55),              # 0x2c
+        asm.csrrw(14, iss.CSR_MHPMCOUNTER3, 13),    # 0x30 forwarded source
+        asm.csrrs(15, iss.CSR_MHPMCOUNTER3, 0),     # 0x34
+        asm.ebreak(),                       # 0x38
+    ]
+    model, _ = await _run_lockstep(dut, "counters", program)
+    x = model.x
+    assert x[7] - x[6] == 19
+    assert x[8] >= x[9] == 45
+    assert x[11] < 8, "cycle restarts after the write of mcycle"
+    assert x[15] == 0x55
+
+
+@cocotb.test()
+async def test_cycle_counter_grows(dut):
+    # lockstep checks every cycle read against the last one as well
+    program = [
+        asm.csrr(5, iss.CSR_CYCLE),         # 0x00
+        asm.addi(10, 0, 10),                # 0x04
+        asm.addi(10, 10, -1),               # 0x08 loop
+        asm.bne(10, 0, -4),                 # 0x0c taken 9 times
+        asm.csrr(6, iss.CSR_MCYCLE),        # 0x10
+        asm.csrr(7, iss.CSR_CYCLE),         # 0x14
+        asm.ebreak(),                       # 0x18
+    ]
+    model, _ = await _run_lockstep(dut, "cycle_counter", program)
+    x = model.x
+    assert x[6] - x[5] >= 22, "at least one cycle per instruction"
+    assert x[7] > x[6]
+
+
+def test_core():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "constants.vhdl",
+                    src_path / "multiport_registerfile.vhdl",
+                    src_path / "registerfile.vhdl",
+                    src_path / "alu.vhdl",
+                    src_path / "decoder.vhdl",
+                    src_path / "pc.vhdl",
+                    src_path / "control_unit.vhdl",
+                    src_path / "branch_predictor.vhdl",
+                    src_path / "branch_target_buffer.vhdl",
+                    src_path / "instruction_cache.vhdl",
+                    src_path / "data_cache.vhdl",
+                    src_path / "load_store_unit.vhdl",
+                    src_path / "csr_unit.vhdl",
+                    src_path / "branch_unit.vhdl",
+                    src_path / "multiply_divide_unit.vhdl",
+                    src_path / "compressed_expander.vhdl",
+                    src_path / "core.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="core",
+        build_args=["--std=08"]
+    )
+
+    variants = [{"PIPELINED": "false"},
+                {"PIPELINED": "true"},
+                {"PIPELINED": "true", "STATIC_PREDICTION": "false"},
+                {"PIPELINED": "true", "BTB_ENTRIES": "16"},
+                {"PIPELINED": "true", "SHARED_ALU": "true"},
+                {"PIPELINED": "true", "RESOLVE_IN_DECODE": "true"},
+                {"PIPELINED": "true", "SINGLE_CYCLE_DIVIDE": "true"},
+                {"PIPELINED": "true", "COMPRESSED": "true"},
+                {"PIPELINED": "true", "COMPRESSED": "true", "BTB_ENTRIES": "16"},
+                {"PIPELINED": "true", "ICACHE_SETS": "16"},
+                {"PIPELINED": "true", "COMPRESSED": "true", "ICACHE_SETS": "4", "ICACHE_WAYS": "2"}]
+    for parameters in variants:
+        name = "_".join(f"{key.lower()}_{value}" for key, value in parameters.items())
+        runner.test(hdl_toplevel="core",
+                    test_module="test_core,",
+                    test_args=["--std=08"],
+                    parameters=parameters,
+                    extra_env={f"GENERIC_{key}": value for key, value in parameters.items()},
+                    results_xml=f"results_{name}.xml"
+                    )
+
+if __name__ == "__main__":
+    test_core()
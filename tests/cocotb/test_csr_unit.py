@@ -0,0 +1,143 @@
+import random
+from pathlib import Path
+from typing import Dict
+import cocotb
+import build_cache
+import iss
+from utility import generic
+from cocotb.triggers import FallingEdge, ReadOnly, Timer
+from cocotb.clock import Clock
+
+TIME_DIVIDER = generic("TIME_DIVIDER", 1)
+
+_EVENTS: Dict[str, int] = {"i_retire": iss.CSR_INSTRET & 0x1f,
+                           "i_taken_branch": iss.HPM_TAKEN_BRANCHES,
+                           "i_mispredict": iss.HPM_MISPREDICTS,
+                           "i_stall": iss.HPM_STALLS,
+                           "i_cache_miss": iss.HPM_CACHE_MISSES}
+
+
+async def _enable_and_wait(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_reset.value = 1
+    dut.i_enable.value = 1
+    dut.i_access.value = 0
+    dut.i_address.value = 0
+    dut.i_fun3.value = 0
+    dut.i_source.value = 0
+    for event in _EVENTS:
+        getattr(dut, event).value = 0
+    await Timer(5, units="ns")  # wait a bit
+
+    await FallingEdge(dut.i_clock)
+    dut.i_reset.value = 0
+
+async def _read(dut, csr: int) -> int:
+    """Value of *csr* one cycle after the previous access."""
+    await FallingEdge(dut.i_clock)
+    dut.i_access.value = 0
+    dut.i_address.value = csr
+    await ReadOnly()
+    return dut.o_data.value.integer
+
+async def _read64(dut, csr: int) -> int:
+    # the low half is read one cycle later, fine for counters without events
+    high = await _read(dut, csr | 0x80)
+    return high << 32 | await _read(dut, csr)
+
+async def _access(dut, csr: int, fun3: int, source: int) -> int:
+    """Old value of *csr*, the access is done on the next edge."""
+    await FallingEdge(dut.i_clock)
+    dut.i_access.value = 1
+    dut.i_address.value = csr
+    dut.i_fun3.value = fun3
+    dut.i_source.value = source
+    await ReadOnly()
+    return dut.o_data.value.integer
+
+@cocotb.test()
+async def test_cycle_and_time_count(dut):
+    await _enable_and_wait(dut)
+
+    cycles = [await _read(dut, iss.CSR_CYCLE) for _ in range(20)]
+    assert cycles == list(range(cycles[0], cycles[0] + 20))
+    time = [await _read(dut, iss.CSR_TIME) for _ in range(8 * TIME_DIVIDER)]
+    assert time[-1] - time[0] in (7, 8)
+    assert all(later - earlier in (0, 1) for earlier, later in zip(time, time[1:]))
+
+@cocotb.test()
+async def test_events_are_counted(dut):
+    await _enable_and_wait(dut)
+    rng = random.Random(31)
+
+    counts = {event: 0 for event in _EVENTS}
+    for _ in range(500):
+        await FallingEdge(dut.i_clock)
+        for event in _EVENTS:
+            value = rng.randrange(2)
+            getattr(dut, event).value = value
+            counts[event] += value
+    await FallingEdge(dut.i_clock)
+    for event in _EVENTS:
+        getattr(dut, event).value = 0
+
+    for event, counter in _EVENTS.items():
+        assert await _read64(dut, 0xc00 | counter) == counts[event], event
+        assert await _read64(dut, 0xb00 | counter) == counts[event], event
+
+@cocotb.test()
+async def test_machine_bank_writes(dut):
+    await _enable_and_wait(dut)
+    hpm3 = iss.CSR_MHPMCOUNTER3
+
+    await _access(dut, hpm3, iss.F3_CSR_RW, 0xf0)
+    await _access(dut, hpm3 | 0x80, iss.F3_CSR_RW, 0x12345678)
+    assert await _read64(dut, iss.CSR_HPMCOUNTER3) == 0x12345678_000000f0
+    assert await _access(dut, hpm3, iss.F3_CSR_RS, 0x0f) == 0xf0
+    assert await _access(dut, hpm3, iss.F3_CSR_RC, 0x3c) == 0xff
+    assert await _read(dut, hpm3) == 0xc3
+    # set and clear without bits do not write
+    assert await _access(dut, hpm3, iss.F3_CSR_RSI, 0) == 0xc3
+    assert await _read(dut, hpm3) == 0xc3
+
+    # the write wins over the increment of the same cycle
+    await _access(dut, iss.CSR_MCYCLE, iss.F3_CSR_RW, 1000)
+    assert await _read(dut, iss.CSR_CYCLE) == 1000
+    assert await _read(dut, iss.CSR_CYCLE) == 1001
+
+@cocotb.test()
+async def test_read_only_and_unknown_csrs(dut):
+    await _enable_and_wait(dut)
+
+    await _access(dut, iss.CSR_HPMCOUNTER3, iss.F3_CSR_RW, 0xffffffff)
+    await _access(dut, iss.CSR_INSTRET, iss.F3_CSR_RS, 0xffffffff)
+    assert await _read(dut, iss.CSR_HPMCOUNTER3) == 0
+    assert await _read(dut, iss.CSR_INSTRET) == 0
+    # no mtime CSR, counters without events and other CSRs read zero
+    for csr in [0xb01, 0xc07, 0xc1f, 0x300, 0xf14]:
+        await _access(dut, csr, iss.F3_CSR_RW, 0xffffffff)
+        assert await _read(dut, csr) == 0, f"csr {csr:#x}"
+
+def test_csr_unit():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "constants.vhdl",
+                    src_path / "csr_unit.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="csr_unit",
+        build_args=["--std=08"]
+    )
+
+    parameters = {"TIME_DIVIDER": 3}
+    runner.test(hdl_toplevel="csr_unit",
+                test_module="test_csr_unit,",
+                test_args=["--std=08"],
+                parameters=parameters,
+                extra_env={f"GENERIC_{name}": str(value) for name, value in parameters.items()}
+                )
+
+if __name__ == "__main__":
+    test_csr_unit()
@@ -1,20 +1,28 @@
-from typing import List, Tuple
+import os
+from typing import Dict, List, Tuple
 from pathlib import Path
 import cocotb
-from cocotb.runner import get_runner
+import numpy as np
+import build_cache
+import decoder_model
+import stimulus
+from decoder_model import DecoderResult
+from stream import stream
 from cocotb.triggers import FallingEdge, Timer, RisingEdge
 from cocotb.clock import Clock
-from hypothesis.strategies import integers, lists, data
-import pytest
 
 rd_lsb=7
 r1_lsb=15
 r2_lsb=20
 
+# instructions per streamed chunk, the stream test runs STREAM_ROWS in total
+STREAM_CHUNK = 1 << 14
+STREAM_ROWS = int(os.environ.get("DECODER_STREAM_ROWS", 1 << 16))
+_OP_CODES = [0b0110111, 0b0010111, 0b1101111, 0b1100111, 0b1100011,
+             0b0000011, 0b0100011, 0b0010011, 0b0110011, 0b0001111, 0b1110011]
+
 def _generate_sized_ints(bits: int) -> List[int]:
-    integer_strat =integers(min_value=0, max_value=(1<<bits)-1)
-    list_strat = lists(integer_strat,min_size=10,max_size=100)
-    return list_strat.example()
+    return stimulus.for_test().sized(bits)
 
 def _map_to_instruction(immediate: int, mapping: List[Tuple[int,int]]):
     result = 0
@@ -22,6 +30,55 @@ def _map_to_instruction(immediate: int, mapping: List[Tuple[int,int]]):
         result = result + (((immediate>>initial) & 1)<<to)
     return result
 
+def _stream_instructions(rng: np.random.Generator, count: int) -> np.ndarray:
+    # walking ones in every field for each opcode, every opcode with zero
+    # fields, then random words with mostly known opcodes
+    walking = (np.uint32(1) << np.arange(7, 32, dtype=np.uint32))[None, :]
+    directed = np.concatenate([
+        (walking | np.asarray(_OP_CODES, dtype=np.uint32)[:, None]).ravel(),
+        np.arange(1 << 7, dtype=np.uint32)])
+    words = rng.integers(0, 1 << 32, max(count - len(directed), 0), dtype=np.uint32)
+    known = rng.random(len(words)) < 0.75
+    words[known] = (words[known] & np.uint32(~0x7f & 0xffffffff)
+                    | rng.choice(np.asarray(_OP_CODES, dtype=np.uint32), int(known.sum())))
+    return np.concatenate([directed, words])
+
+def _compare(expected: DecoderResult, observed: Dict[str, np.ndarray], instructions: np.ndarray,
+             first_row: int, assigned: np.ndarray):
+    """*assigned* marks the rows of the whole stream that assign the immediate."""
+    for name in ["opcode", "selectdest", "selecta", "selectb", "fun3", "fun7", "data_imm"]:
+        values = getattr(expected, name).astype(np.int64)
+        mismatch = observed[f"o_{name}"] != values
+        if name == "data_imm":
+            mismatch &= expected.data_imm_valid
+        row = int(np.argmax(mismatch))
+        assert not mismatch.any(), \
+            (f"o_{name} of {instructions[row]:#010x}: expected {values[row]:#x}, "
+             f"got {observed[f'o_{name}'][row]:#x}, "
+             + stimulus.hint(first_row + row, *([assigned] if name == "data_imm" else [])))
+
+@cocotb.test()
+async def test_streamed_instructions_match_field_table(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_enable.value=1
+    await RisingEdge(dut.i_clock)
+
+    inputs = {"instruction": dut.i_data_instruction}
+    outputs = {f"o_{name}": getattr(dut, f"o_{name}")
+               for name in ["opcode", "selectdest", "selecta", "selectb", "fun3", "fun7", "data_imm"]}
+    rng = stimulus.for_test().generator
+    instructions = stimulus.replay({"instruction": _stream_instructions(rng, STREAM_ROWS)})["instruction"]
+    decoded = decoder_model.decode(instructions)
+    for start in range(0, len(instructions), STREAM_CHUNK):
+        chunk = instructions[start:start + STREAM_CHUNK]
+        # a FENCE at the start of a chunk keeps the immediate of the chunk before
+        expected = decoder_model.hold(DecoderResult(*(column[start:start + STREAM_CHUNK]
+                                                      for column in decoded)))
+        observed = await stream(dut.i_clock, inputs, outputs, {"instruction": chunk})
+        _compare(expected, observed, chunk, start, decoded.data_imm_valid)
+
 @cocotb.test()
 async def test_op_code_forwarded_correctly(dut):
     cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
@@ -107,7 +164,7 @@ async def test_immediate_correct_for_lui_and_auipc(dut):
             assert dut.o_data_imm.value == immediate<<12
 
 @cocotb.test()
-async def test_immediate_correct_for_JALR_and_LOAD(dut):
+async def test_immediate_correct_for_JALR_LOAD_and_ENV(dut):
     cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
     await Timer(5, units="ns")  # wait a bit
 
@@ -117,7 +174,7 @@ async def test_immediate_correct_for_JALR_and_LOAD(dut):
     immediates = _generate_sized_ints(12)
 
     for immediate in immediates:
-        for op_code in [0b1100111,0b0000011]:   
+        for op_code in [0b1100111,0b0000011,0b1110011]:
             instr = op_code + (immediate<<20)
             dut.i_data_instruction.value=instr
 
@@ -288,11 +345,9 @@ def test_decoder():
     vhdl_sources = [src_path / "decoder.vhdl", 
                     src_path / "constants.vhdl"]
 
-    runner = get_runner("ghdl")
-    runner.build(
+    runner = build_cache.build(
         vhdl_sources=vhdl_sources,
         hdl_toplevel="decoder",
-        always=True,
         build_args=["--std=08"]
     )
 
@@ -0,0 +1,151 @@
+import random
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple
+import cocotb
+import build_cache
+from memory_model import LatencyMemory
+from utility import generic
+from cocotb.triggers import FallingEdge, ReadOnly, Timer, RisingEdge
+from cocotb.clock import Clock
+
+LINE_WORDS = generic("LINE_WORDS", 4)
+SETS = generic("SETS", 16)
+WAYS = generic("WAYS", 1)
+LATENCY = 8
+CACHE_BYTES = 4 * LINE_WORDS * SETS * WAYS
+
+
+class _CacheModel:
+    """Which fetches hit, LRU replacement like the rtl."""
+
+    def __init__(self):
+        self.sets: Dict[int, OrderedDict] = {}
+
+    def access(self, address: int) -> bool:
+        line = address // (4 * LINE_WORDS)
+        ways = self.sets.setdefault(line % SETS, OrderedDict())
+        if line in ways:
+            ways.move_to_end(line)
+            return True
+        if len(ways) == WAYS:
+            ways.popitem(last=False)
+        ways[line] = True
+        return False
+
+
+async def _enable_and_wait(dut, seed: int) -> LatencyMemory:
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    rng = random.Random(seed)
+    memory = LatencyMemory(size=1 << 16, latency=LATENCY,
+                           image=rng.randbytes(1 << 16))
+    dut.i_reset.value = 1
+    dut.i_request.value = 0
+    dut.i_address.value = 0
+    memory.serve(dut.i_clock, dut.o_mem_request, dut.o_mem_address,
+                 dut.i_mem_valid, dut.i_mem_data, LINE_WORDS)
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await RisingEdge(dut.i_clock)
+    return memory
+
+async def _fetch(dut, address: int) -> Tuple[int, int]:
+    """Instruction at address and the cycles waited for it."""
+    await FallingEdge(dut.i_clock)
+    dut.i_address.value = address
+    dut.i_request.value = 1
+    waited = 0
+    while True:
+        await ReadOnly()
+        if dut.o_ready.value.binstr == "1":
+            return dut.o_instruction.value.integer, waited
+        await FallingEdge(dut.i_clock)
+        waited += 1
+
+async def _fetch_and_check(dut, memory: LatencyMemory, model: _CacheModel,
+                           addresses: List[int]) -> int:
+    """Fetch all addresses, returns the number of refills."""
+    bursts = memory.bursts
+    for address in addresses:
+        hit = model.access(address)
+        instruction, waited = await _fetch(dut, address)
+        assert instruction == memory.read_word(address), f"address {address:#x}"
+        if hit:
+            assert waited == 0, f"address {address:#x} should hit"
+        else:
+            assert waited >= LATENCY + LINE_WORDS, f"address {address:#x} should miss"
+    return memory.bursts - bursts
+
+@cocotb.test()
+async def test_sequential_fetch_refills_each_line_once(dut):
+    memory = await _enable_and_wait(dut, seed=11)
+    model = _CacheModel()
+
+    addresses = list(range(0, 2 * CACHE_BYTES, 4))
+    refills = await _fetch_and_check(dut, memory, model, addresses)
+    assert refills == len(addresses) // LINE_WORDS
+
+@cocotb.test()
+async def test_loop_hits_after_first_iteration(dut):
+    memory = await _enable_and_wait(dut, seed=12)
+    model = _CacheModel()
+
+    body = list(range(0x100, 0x100 + CACHE_BYTES // 2, 4))
+    await _fetch_and_check(dut, memory, model, body)
+    for _ in range(3):
+        assert await _fetch_and_check(dut, memory, model, body) == 0
+
+@cocotb.test()
+async def test_random_fetch_matches_model(dut):
+    memory = await _enable_and_wait(dut, seed=13)
+    model = _CacheModel()
+    rng = random.Random(13)
+
+    # working set twice the cache size, with some locality
+    addresses = []
+    while len(addresses) < 1000:
+        start = 4 * rng.randrange(2 * CACHE_BYTES // 4)
+        addresses += range(start, start + 4 * rng.randrange(1, 8), 4)
+    await _fetch_and_check(dut, memory, model, addresses)
+
+@cocotb.test()
+async def test_reset_invalidates(dut):
+    memory = await _enable_and_wait(dut, seed=14)
+    model = _CacheModel()
+
+    await _fetch_and_check(dut, memory, model, [0x40])
+    await FallingEdge(dut.i_clock)
+    dut.i_reset.value = 1
+    await FallingEdge(dut.i_clock)
+    dut.i_reset.value = 0
+
+    bursts = memory.bursts
+    await _fetch(dut, 0x40)
+    assert memory.bursts == bursts + 1
+
+def test_instruction_cache():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "instruction_cache.vhdl",
+                    src_path / "constants.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="instruction_cache",
+        build_args=["--std=08"]
+    )
+
+    for ways in [1, 2]:
+        parameters = {"LINE_WORDS": 4, "SETS": 16, "WAYS": ways}
+        runner.test(hdl_toplevel="instruction_cache",
+                    test_module="test_instruction_cache,",
+                    test_args=["--std=08"],
+                    parameters=parameters,
+                    extra_env={f"GENERIC_{name}": str(value) for name, value in parameters.items()},
+                    results_xml=f"results_ways_{ways}.xml"
+                    )
+
+if __name__ == "__main__":
+    test_instruction_cache()
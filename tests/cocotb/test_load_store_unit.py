@@ -0,0 +1,190 @@
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+import cocotb
+import build_cache
+import iss
+from memory_model import LatencyMemory
+from utility import generic
+from cocotb.triggers import FallingEdge, ReadOnly, Timer, RisingEdge
+from cocotb.clock import Clock
+
+STORE_BUFFER_ENTRIES = generic("STORE_BUFFER_ENTRIES", 4)
+LINE_WORDS = generic("LINE_WORDS", 4)
+SETS = generic("SETS", 16)
+LATENCY = 8
+CACHE_BYTES = 4 * LINE_WORDS * SETS
+
+# fun3 -> (access size, sign extended)
+_LOADS = {iss.F3_LOAD_LB: (1, True), iss.F3_LOAD_LH: (2, True), iss.F3_LOAD_LW: (4, False),
+          iss.F3_LOAD_LBU: (1, False), iss.F3_LOAD_LHU: (2, False)}
+_STORES = {iss.F3_STORE_SB: 1, iss.F3_STORE_SH: 2, iss.F3_STORE_SW: 4}
+
+
+class _CacheModel:
+    """Misses and write backs of the direct mapped data cache."""
+
+    def __init__(self):
+        self.lines: Dict[int, Tuple[int, bool]] = {}
+        self.misses = 0
+        self.writebacks = 0
+
+    def access(self, address: int, write: bool):
+        line = address // (4 * LINE_WORDS)
+        cached, dirty = self.lines.get(line % SETS, (None, False))
+        if cached != line:
+            self.misses += 1
+            if cached is not None and dirty:
+                self.writebacks += 1
+            dirty = False
+        self.lines[line % SETS] = (line, dirty or write)
+
+
+async def _enable_and_wait(dut, seed: int) -> LatencyMemory:
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    rng = random.Random(seed)
+    memory = LatencyMemory(size=1 << 16, latency=LATENCY,
+                           image=rng.randbytes(1 << 16))
+    dut.i_reset.value = 1
+    dut.i_request.value = 0
+    dut.i_store.value = 0
+    dut.i_fun3.value = 0
+    dut.i_address.value = 0
+    dut.i_data.value = 0
+    memory.serve(dut.i_clock, dut.o_mem_request, dut.o_mem_address,
+                 dut.i_mem_valid, dut.i_mem_data, LINE_WORDS,
+                 write=dut.o_mem_write, write_data=dut.o_mem_data)
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await RisingEdge(dut.i_clock)
+    return memory
+
+async def _access(dut, store: bool, fun3: int, address: int, data: int = 0) -> Tuple[int, int]:
+    """Loaded value (0 for stores) and the cycles waited for it."""
+    await FallingEdge(dut.i_clock)
+    dut.i_request.value = 1
+    dut.i_store.value = int(store)
+    dut.i_fun3.value = fun3
+    dut.i_address.value = address
+    dut.i_data.value = data
+    waited = 0
+    while True:
+        await ReadOnly()
+        if dut.o_ready.value.binstr == "1":
+            value = 0 if store else dut.o_data.value.integer
+            break
+        await FallingEdge(dut.i_clock)
+        waited += 1
+    await FallingEdge(dut.i_clock)
+    dut.i_request.value = 0
+    return value, waited
+
+async def _drain(dut):
+    """Wait until the store buffer is empty."""
+    while True:
+        await ReadOnly()
+        if int(dut.count.value) == 0 and dut.o_mem_request.value.binstr == "0":
+            return
+        await FallingEdge(dut.i_clock)
+
+def _expected_load(reference: bytearray, fun3: int, address: int) -> int:
+    size, signed = _LOADS[fun3]
+    value = int.from_bytes(reference[address:address+size], "little", signed=signed)
+    return value & 0xffffffff
+
+def _random_access(rng: random.Random, span: int) -> Tuple[bool, int, int, int]:
+    store = rng.randrange(2) == 1
+    fun3 = rng.choice(list(_STORES if store else _LOADS))
+    size = _STORES[fun3] if store else _LOADS[fun3][0]
+    return store, fun3, size * rng.randrange(span // size), rng.randrange(1 << 32)
+
+@cocotb.test()
+async def test_random_accesses_match_memory(dut):
+    memory = await _enable_and_wait(dut, seed=21)
+    reference = bytearray(memory.memory)
+    rng = random.Random(21)
+
+    for _ in range(1000):
+        store, fun3, address, data = _random_access(rng, 4 * CACHE_BYTES)
+        value, _ = await _access(dut, store, fun3, address, data)
+        if store:
+            size = _STORES[fun3]
+            reference[address:address+size] = (data & ((1 << 8*size) - 1)).to_bytes(size, "little")
+        else:
+            assert value == _expected_load(reference, fun3, address), \
+                f"fun3 {fun3} at {address:#x}"
+
+@cocotb.test()
+async def test_sequential_loads_count_misses(dut):
+    memory = await _enable_and_wait(dut, seed=22)
+    model = _CacheModel()
+
+    addresses = list(range(0, 2 * CACHE_BYTES, 4)) * 2
+    for address in addresses:
+        model.access(address, write=False)
+        value, _ = await _access(dut, False, iss.F3_LOAD_LW, address)
+        assert value == memory.read_word(address)
+    await ReadOnly()
+    assert dut.o_cache_misses.value.integer == model.misses
+    assert dut.o_cache_misses.value.integer == memory.bursts
+    assert dut.o_cache_accesses.value.integer == len(addresses)
+    assert dut.o_cache_writebacks.value.integer == 0
+
+@cocotb.test()
+async def test_dirty_lines_are_written_back(dut):
+    memory = await _enable_and_wait(dut, seed=23)
+    model = _CacheModel()
+
+    # fill the cache with stores, then store to the conflicting lines
+    values = {}
+    for address in range(0, 2 * CACHE_BYTES, 4):
+        values[address] = address * 0x01010101 & 0xffffffff
+        model.access(address, write=True)
+        await _access(dut, True, iss.F3_STORE_SW, address, values[address])
+        await _drain(dut)
+    for address in range(0, CACHE_BYTES, 4):
+        assert memory.read_word(address) == values[address], f"address {address:#x}"
+    assert dut.o_cache_writebacks.value.integer == model.writebacks == SETS
+    assert dut.o_cache_misses.value.integer == model.misses
+
+@cocotb.test()
+async def test_stores_complete_without_waiting(dut):
+    await _enable_and_wait(dut, seed=24)
+
+    # every store misses, the buffer takes them until it is full
+    waits: List[int] = []
+    for line in range(STORE_BUFFER_ENTRIES + 2):
+        _, waited = await _access(dut, True, iss.F3_STORE_SW, 4 * LINE_WORDS * line, line)
+        waits.append(waited)
+    assert waits[:STORE_BUFFER_ENTRIES] == [0] * STORE_BUFFER_ENTRIES
+    assert waits[STORE_BUFFER_ENTRIES] > 0
+
+    # a load of a buffered word sees the store
+    value, _ = await _access(dut, False, iss.F3_LOAD_LW, 4 * LINE_WORDS * (STORE_BUFFER_ENTRIES + 1))
+    assert value == STORE_BUFFER_ENTRIES + 1
+
+def test_load_store_unit():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "constants.vhdl",
+                    src_path / "data_cache.vhdl",
+                    src_path / "load_store_unit.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="load_store_unit",
+        build_args=["--std=08"]
+    )
+
+    parameters = {"STORE_BUFFER_ENTRIES": 4, "LINE_WORDS": 4, "SETS": 16}
+    runner.test(hdl_toplevel="load_store_unit",
+                test_module="test_load_store_unit,",
+                test_args=["--std=08"],
+                parameters=parameters,
+                extra_env={f"GENERIC_{name}": str(value) for name, value in parameters.items()}
+                )
+
+if __name__ == "__main__":
+    test_load_store_unit()
@@ -0,0 +1,150 @@
+from typing import List
+from pathlib import Path
+import cocotb
+import numpy as np
+import alu_model
+import muldiv_model
+import stimulus
+import build_cache
+from utility import generic_flag
+from cocotb.triggers import FallingEdge, ReadOnly, Timer
+from cocotb.clock import Clock
+
+SINGLE_CYCLE_DIVIDE = generic_flag("SINGLE_CYCLE_DIVIDE", False)
+# cycles from the request to the latched result
+DIVIDE_CYCLES = 1 if SINGLE_CYCLE_DIVIDE else 18
+
+MULTIPLY = [alu_model.F3_MULDIV_MUL, alu_model.F3_MULDIV_MULH,
+            alu_model.F3_MULDIV_MULHSU, alu_model.F3_MULDIV_MULHU]
+DIVIDE = [alu_model.F3_MULDIV_DIV, alu_model.F3_MULDIV_DIVU,
+          alu_model.F3_MULDIV_REM, alu_model.F3_MULDIV_REMU]
+
+async def _enable_and_wait(dut):
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_enable.value = 1
+    dut.i_reset.value = 1
+    dut.i_request.value = 0
+    dut.i_fun3.value = 0
+    dut.i_data_s1.value = 0
+    dut.i_data_s2.value = 0
+    await Timer(5, units="ns")  # wait a bit
+
+    dut.i_reset.value = 0
+    await FallingEdge(dut.i_clock)
+
+def _operands() -> List[np.ndarray]:
+    # every combination of the drawn values, the edge cases included
+    values = stimulus.for_test().sized(32, max_size=40)
+    s1, s2 = np.meshgrid(values, values)
+    return [s1.ravel(), s2.ravel()]
+
+async def _execute(dut, fun3: int, s1: int, s2: int) -> int:
+    """Cycles until the result is latched, returns at the falling edge after it."""
+    dut.i_request.value = 1
+    dut.i_fun3.value = fun3
+    dut.i_data_s1.value = s1
+    dut.i_data_s2.value = s2
+    cycles = 0
+    while True:
+        await ReadOnly()
+        ready = dut.o_ready.value == 1
+        await FallingEdge(dut.i_clock)
+        cycles += 1
+        if ready:
+            return cycles
+        assert cycles < 2 * DIVIDE_CYCLES, f"no result for fun3 {fun3:03b}"
+
+@cocotb.test()
+async def test_multiplications_back_to_back(dut):
+    await _enable_and_wait(dut)
+    s1, s2 = _operands()
+    rows = stimulus.replay({"fun3": np.resize(MULTIPLY, len(s1)), "s1": s1, "s2": s2})
+    expected = muldiv_model.evaluate(rows["fun3"], rows["s1"], rows["s2"])
+
+    failures = []
+    for row, (fun3, a, b) in enumerate(zip(rows["fun3"].tolist(), rows["s1"].tolist(),
+                                           rows["s2"].tolist())):
+        assert await _execute(dut, fun3, a, b) == 1
+        if dut.o_data_result.value.integer != int(expected[row]):
+            failures.append(f"fun3 {fun3:03b} {a:#x} {b:#x}: {dut.o_data_result.value.integer:#x}, "
+                            f"expected {int(expected[row]):#x}, {stimulus.hint(row)}")
+    assert not failures, "\n".join(failures[:20])
+
+@cocotb.test()
+async def test_divisions(dut):
+    await _enable_and_wait(dut)
+    s1, s2 = _operands()
+    rows = stimulus.replay({"fun3": np.resize(DIVIDE, len(s1)), "s1": s1, "s2": s2})
+    expected = muldiv_model.evaluate(rows["fun3"], rows["s1"], rows["s2"])
+
+    failures = []
+    for row, (fun3, a, b) in enumerate(zip(rows["fun3"].tolist(), rows["s1"].tolist(),
+                                           rows["s2"].tolist())):
+        assert await _execute(dut, fun3, a, b) == DIVIDE_CYCLES
+        if dut.o_data_result.value.integer != int(expected[row]):
+            failures.append(f"fun3 {fun3:03b} {a:#x} {b:#x}: {dut.o_data_result.value.integer:#x}, "
+                            f"expected {int(expected[row]):#x}, {stimulus.hint(row)}")
+        # a new request starts with the next cycle
+        dut.i_request.value = 0
+        await FallingEdge(dut.i_clock)
+    assert not failures, "\n".join(failures[:20])
+
+@cocotb.test()
+async def test_division_by_zero_and_overflow(dut):
+    await _enable_and_wait(dut)
+    min_int, minus_one = 1 << 31, (1 << 32) - 1
+    for fun3 in DIVIDE:
+        for a, b in [(7, 0), (min_int, 0), (0, 0), (min_int, minus_one)]:
+            await _execute(dut, fun3, a, b)
+            assert dut.o_data_result.value == int(muldiv_model.evaluate(fun3, a, b)[0])
+            dut.i_request.value = 0
+            await FallingEdge(dut.i_clock)
+
+@cocotb.test(skip=SINGLE_CYCLE_DIVIDE)
+async def test_dropped_request_cancels_division(dut):
+    await _enable_and_wait(dut)
+    dut.i_request.value = 1
+    dut.i_fun3.value = alu_model.F3_MULDIV_DIVU
+    dut.i_data_s1.value = 1000
+    dut.i_data_s2.value = 3
+    for _ in range(5):
+        await FallingEdge(dut.i_clock)
+    dut.i_request.value = 0
+    await FallingEdge(dut.i_clock)
+
+    # the next division starts over with its own operands
+    assert await _execute(dut, alu_model.F3_MULDIV_REM, -1000 & 0xffffffff, 7) == DIVIDE_CYCLES
+    assert dut.o_data_result.value == int(muldiv_model.evaluate(alu_model.F3_MULDIV_REM, -1000, 7)[0])
+
+@cocotb.test()
+async def test_disabled_unit_holds(dut):
+    await _enable_and_wait(dut)
+    await _execute(dut, alu_model.F3_MULDIV_MUL, 6, 7)
+    dut.i_enable.value = 0
+    await _execute(dut, alu_model.F3_MULDIV_MUL, 8, 9)
+    assert dut.o_data_result.value == 42
+
+def test_multiply_divide_unit():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "constants.vhdl",
+                    src_path / "multiply_divide_unit.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="multiply_divide_unit",
+        build_args=["--std=08"]
+    )
+
+    for single_cycle in ["false", "true"]:
+        runner.test(hdl_toplevel="multiply_divide_unit",
+                    test_module="test_multiply_divide_unit,",
+                    test_args=["--std=08"],
+                    parameters={"SINGLE_CYCLE_DIVIDE": single_cycle},
+                    extra_env={"GENERIC_SINGLE_CYCLE_DIVIDE": single_cycle},
+                    results_xml=f"results_single_cycle_divide_{single_cycle}.xml"
+                    )
+
+if __name__ == "__main__":
+    test_multiply_divide_unit()
@@ -0,0 +1,128 @@
+from typing import List, Sequence, Tuple
+from pathlib import Path
+import cocotb
+import build_cache
+import stimulus
+from register_file_model import RegisterFile
+from utility import generic, generic_flag
+from cocotb.clock import Clock
+from cocotb.triggers import FallingEdge, RisingEdge, Timer
+
+READ_PORTS = generic("READ_PORTS", 2)
+WRITE_PORTS = generic("WRITE_PORTS", 1)
+BYPASS = generic_flag("BYPASS", False)
+
+Write = Tuple[bool, int, int]
+
+def _pack(values: Sequence[int], width: int) -> int:
+    # port p sits at bits width*p upwards
+    return sum(value << (width*port) for port, value in enumerate(values))
+
+def _unpack(value: int, width: int, ports: int) -> List[int]:
+    return [(value >> (width*port)) & ((1<<width)-1) for port in range(ports)]
+
+async def _enable_and_wait(dut) -> RegisterFile:
+    cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
+    dut.i_enable.value = 1
+    dut.i_select.value = 0
+    dut.i_write_enable.value = 0
+    dut.i_selectdest.value = 0
+    dut.i_datadest.value = 0
+    await Timer(5, units="ns")  # wait a bit
+    await FallingEdge(dut.i_clock)
+    return RegisterFile(READ_PORTS, WRITE_PORTS, BYPASS)
+
+async def _cycle(dut, model: RegisterFile, selects: Sequence[int], writes: Sequence[Write],
+                 enable: bool = True):
+    # drive on the falling edge, the reads are registered on the rising edge
+    dut.i_enable.value = int(enable)
+    dut.i_select.value = _pack(selects, 5)
+    dut.i_write_enable.value = _pack([int(write[0]) for write in writes], 1)
+    dut.i_selectdest.value = _pack([write[1] for write in writes], 5)
+    dut.i_datadest.value = _pack([write[2] for write in writes], 32)
+    await RisingEdge(dut.i_clock)
+    expected = model.clock(selects, writes, enable)
+    await FallingEdge(dut.i_clock)
+    actual = _unpack(dut.o_data.value.integer, 32, READ_PORTS)
+    assert actual == expected, f"selects {list(selects)} writes {list(writes)}"
+
+def _no_writes() -> List[Write]:
+    return [(False, 0, 0)] * WRITE_PORTS
+
+@cocotb.test()
+async def test_registers_start_at_zero(dut):
+    model = await _enable_and_wait(dut)
+    for register in range(32):
+        await _cycle(dut, model, [register] * READ_PORTS, _no_writes())
+
+@cocotb.test()
+async def test_register_0_cannot_be_overridden(dut):
+    model = await _enable_and_wait(dut)
+    await _cycle(dut, model, [0] * READ_PORTS, [(True, 0, 0xaaaaaaaa)] * WRITE_PORTS)
+    await _cycle(dut, model, [0] * READ_PORTS, _no_writes())
+    assert model.outputs == [0] * READ_PORTS
+
+@cocotb.test()
+async def test_highest_write_port_wins(dut):
+    model = await _enable_and_wait(dut)
+    values = stimulus.for_test().words(32*WRITE_PORTS).tolist()
+    for register in range(1, 32):
+        writes = [(True, register, values[register*WRITE_PORTS + port])
+                  for port in range(WRITE_PORTS)]
+        # the read in the writing cycle sees the new value only with BYPASS
+        await _cycle(dut, model, [register] * READ_PORTS, writes)
+        await _cycle(dut, model, [register] * READ_PORTS, _no_writes())
+        assert model.outputs == [writes[-1][2]] * READ_PORTS
+
+@cocotb.test()
+async def test_disabled_holds_reads_and_drops_writes(dut):
+    model = await _enable_and_wait(dut)
+    await _cycle(dut, model, [1] * READ_PORTS, [(True, 1, 0x11111111)] + _no_writes()[1:])
+    await _cycle(dut, model, [1] * READ_PORTS, _no_writes())
+    await _cycle(dut, model, [2] * READ_PORTS, [(True, 1, 0x22222222)] * WRITE_PORTS,
+                 enable=False)
+    await _cycle(dut, model, [1] * READ_PORTS, _no_writes())
+    assert model.outputs == [0x11111111] * READ_PORTS
+
+@cocotb.test()
+async def test_port_conflicts_match_model(dut):
+    model = await _enable_and_wait(dut)
+    generator = stimulus.for_test().generator
+    cycles = 2000
+    # a few registers only, so reads and writes of one register collide often
+    selects = generator.integers(0, 4, (cycles, READ_PORTS)).tolist()
+    dests = generator.integers(0, 4, (cycles, WRITE_PORTS)).tolist()
+    enables = (generator.integers(0, 4, (cycles, WRITE_PORTS)) != 0).tolist()
+    data = stimulus.for_test().words(cycles*WRITE_PORTS).reshape(cycles, WRITE_PORTS).tolist()
+    for cycle in range(cycles):
+        writes = list(zip(enables[cycle], dests[cycle], data[cycle]))
+        await _cycle(dut, model, selects[cycle], writes)
+
+def test_multiport_register_file():
+    proj_path = Path(__file__).resolve().parent
+    src_path = proj_path.parent.parent / "src"
+
+    vhdl_sources = [src_path / "multiport_registerfile.vhdl"]
+
+    runner = build_cache.build(
+        vhdl_sources=vhdl_sources,
+        hdl_toplevel="multiport_register_file",
+        build_args=["--std=08"]
+    )
+
+    variants = [{"READ_PORTS": "2", "WRITE_PORTS": "1", "BYPASS": "false"},
+                {"READ_PORTS": "2", "WRITE_PORTS": "1", "BYPASS": "true"},
+                {"READ_PORTS": "4", "WRITE_PORTS": "2", "BYPASS": "false"},
+                {"READ_PORTS": "4", "WRITE_PORTS": "2", "BYPASS": "true"}]
+    for parameters in variants:
+        name = "_".join(f"{key.lower()}_{value}" for key, value in parameters.items())
+        runner.test(hdl_toplevel="multiport_register_file",
+                    test_module="test_multiport_register_file,",
+                    test_args=["--std=08"],
+                    parameters=parameters,
+                    extra_env={f"GENERIC_{key}": value for key, value in parameters.items()},
+                    results_xml=f"results_{name}.xml"
+                    )
+
+if __name__ == "__main__":
+    test_multiport_register_file()
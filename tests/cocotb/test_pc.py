@@ -2,10 +2,10 @@ from typing import List, Optional
 from pathlib import Path
 import cocotb
 from utility import to_32_bit, to_32_bit_unsigned
-from cocotb.runner import get_runner
+import build_cache
+import stimulus
 from cocotb.triggers import FallingEdge, Timer, RisingEdge
 from cocotb.clock import Clock
-from hypothesis.strategies import integers, lists, data
 
 async def _enable_and_wait(dut):
     cocotb.start_soon(Clock(dut.i_clock, 1, units="ns").start())
@@ -39,9 +39,7 @@ async def test_INC_increments_correctly(dut):
 async def test_ASSIGN(dut):
     await _enable_and_wait(dut)
 
-    integer_strat =integers(min_value=0, max_value=(1<<32)-1)
-    list_strat = lists(integer_strat,min_size=10,max_size=10)
-    assign_values = list_strat.example()
+    assign_values = stimulus.for_test().integers(0, (1<<32)-1, max_size=10)
     dut.i_op_code.value=0b10
     for value in assign_values:
         dut.i_data.value = value
@@ -73,11 +71,9 @@ def test_pc():
     vhdl_sources = [src_path / "pc.vhdl", 
                     src_path / "constants.vhdl"]
 
-    runner = get_runner("ghdl")
-    runner.build(
+    runner = build_cache.build(
         vhdl_sources=vhdl_sources,
         hdl_toplevel="pc",
-        always=True,
         build_args=["--std=08"]
     )
 
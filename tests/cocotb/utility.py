@@ -1,6 +1,15 @@
+import os
 
 def to_32_bit(value:int):
     return value & 0xffffffff
 
 def to_32_bit_unsigned(value:int):
     return (value & 0xffffffff) + (1<<32)
+
+def generic(name:str, default:int) -> int:
+    # generics the runner passed to the toplevel, mirrored in the environment
+    return int(os.environ.get(f"GENERIC_{name}", default))
+
+def generic_flag(name:str, default:bool) -> bool:
+    # boolean generics are passed as "true" or "false"
+    return os.environ.get(f"GENERIC_{name}", str(default)).lower() == "true"
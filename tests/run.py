@@ -11,4 +11,8 @@ LIB = VU.add_library("lib")
 LIB.add_source_files(ROOT / "*.vhdl")
 LIB.add_source_files(ROOT.parent / "src" / "*.vhdl")
 
+TB_REGISTERFILE = LIB.test_bench("tb_registerfile")
+TB_REGISTERFILE.test("Write through on same cycle").add_config(
+    name="write_through", generic=dict(write_through=True))
+
 VU.main()
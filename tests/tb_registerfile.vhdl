@@ -10,7 +10,8 @@ use ieee.numeric_std.all;
 use ieee.std_logic_1164.all;
 
 entity tb_registerfile is
-  generic (runner_cfg : string := runner_cfg_default);
+  generic (runner_cfg : string := runner_cfg_default;
+           write_through : boolean := false);
 end entity;
 
 architecture tb of tb_registerfile is
@@ -30,6 +31,7 @@ architecture tb of tb_registerfile is
 
 begin
 	registerfile:	entity	work.register_file
+	generic map (BYPASS => write_through)
 	port map (
 			 i_clock=>i_clock,
 			 i_enable=>i_enable,
@@ -76,6 +78,19 @@ begin
 				i_selecta <= "00001";
 				wait for i_clk_period;
 				check_equal(to_string(o_dataa),x"aaaaaaaa");
+			elsif run("Write through on same cycle") then
+				i_enable <= '1';
+				i_selectdest <= "00001";
+				i_datadest <= x"aaaaaaaa";
+				i_write_enable <= '1';
+				i_selecta <= "00001";
+				i_selectb <= "00001";
+				wait for i_clk_period;
+				check_equal(to_string(o_dataa),x"aaaaaaaa");
+				check_equal(to_string(o_datab),x"aaaaaaaa");
+				i_selectdest <= "00000";
+				wait for i_clk_period;
+				check_equal(to_string(o_dataa),x"aaaaaaaa");
 			elsif run("Read Write test select A") then
 				i_enable <= '1';
 				i_write_enable<='1';